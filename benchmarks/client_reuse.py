@@ -0,0 +1,95 @@
+"""Measure the per-call overhead of creating boto3 clients against moto.
+
+Compares creating a new boto3 resource for every `get_item` (how models used to
+work) with the shared clients a `Table` now hands to its models.
+
+Run with `python -m benchmarks.client_reuse`.
+"""
+
+import os
+import time
+from datetime import datetime
+from typing import Callable
+
+import boto3
+from moto import mock_dynamodb
+
+from dynamodb_monotable.table import Table, TableSchema
+from test.testing_models import Workorder
+
+CALLS = 200
+
+
+def _create_table() -> Table:
+    # mirrors the `create_basic_table` fixture in test/conftest.py
+    client = boto3.client("dynamodb")
+    client.create_table(
+        TableName="test",
+        KeySchema=[
+            {"AttributeName": "hk", "KeyType": "HASH"},
+            {"AttributeName": "sk", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "hk", "AttributeType": "S"},
+            {"AttributeName": "sk", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+    return Table(
+        name="test",
+        schema=TableSchema(
+            **{
+                "indexes": {
+                    "primary": {
+                        "hash_key": {"name": "hk", "type": "S"},
+                        "sort_key": {"name": "sk", "type": "S"},
+                        "index_type": "primary",
+                    },
+                },
+                "models": [Workorder],
+            }
+        ),
+    )
+
+
+def _time_per_call(func: Callable[[], None]) -> float:
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        func()
+    return (time.perf_counter() - start) / CALLS * 1000
+
+
+def main() -> None:
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+    with mock_dynamodb():
+        table = _create_table()
+        model = table.get_model(Workorder)
+        model.create(
+            org_id=123, workorder_id=456, date_created=datetime.utcnow()
+        ).save()
+        key = {"hk": "#WORKORDER", "sk": "#ORG:123#WORKORDER:456"}
+
+        def new_resource_per_call() -> None:
+            boto3.resource("dynamodb").Table("test").get_item(Key=key)
+
+        def shared_client() -> None:
+            model.get_by_key(key["hk"], key["sk"])
+
+        # warm up both paths so imports and endpoint data are already loaded.
+        new_resource_per_call()
+        shared_client()
+
+        before = _time_per_call(new_resource_per_call)
+        after = _time_per_call(shared_client)
+
+    print(f"new resource per call: {before:.3f} ms/call")
+    print(f"shared table clients:  {after:.3f} ms/call")
+    print(f"speedup:               {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Measure the cost of creating items and deserializing query rows.
+
+Both paths look up the attributes of the model for every item, so they show
+the cost of the model metadata.
+
+Run with `python -m benchmarks.model_metadata`.
+"""
+
+import timeit
+from datetime import datetime
+
+from dynamodb_monotable.table import Table, TableSchema
+from test.testing_models import Workorder
+
+NUMBER = 20000
+
+
+def main() -> None:
+    # creating a table does not make any requests, so no mocking is needed.
+    table = Table(
+        name="test",
+        schema=TableSchema(
+            **{
+                "indexes": {
+                    "primary": {
+                        "hash_key": {"name": "hk", "type": "S"},
+                        "sort_key": {"name": "sk", "type": "S"},
+                        "index_type": "primary",
+                    },
+                },
+                "models": [Workorder],
+            }
+        ),
+    )
+    model = table.get_model(Workorder)
+    date_created = datetime.utcnow()
+    row = {
+        "hk": {"S": "#WORKORDER"},
+        "sk": {"S": "#ORG:123#WORKORDER:456"},
+        "org_id": {"N": "123"},
+        "workorder_id": {"N": "456"},
+        "date_created": {"S": date_created.isoformat()},
+    }
+
+    create = timeit.timeit(
+        lambda: model.create(org_id=123, workorder_id=456, date_created=date_created),
+        number=NUMBER,
+    )
+    deserialize = timeit.timeit(lambda: model._from_query_item(row), number=NUMBER)
+
+    print(f"create:          {create / NUMBER * 1e6:.2f} us/item")
+    print(f"deserialize row: {deserialize / NUMBER * 1e6:.2f} us/item")
+
+
+if __name__ == "__main__":
+    main()
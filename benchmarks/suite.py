@@ -0,0 +1,421 @@
+"""Benchmark the hot paths of models, in memory and against a real endpoint.
+
+Measures creating items with template resolution, deserializing the rows of
+a query page, `parse_query_args`, binding a prepared query and the save, get,
+query and batch get round trips. Every benchmark runs for models of each
+`--widths` (the number of extra attributes) and, where it applies, each of
+`--counts` items.
+
+The round trips run against moto by default, against the in-memory backend
+with `--memory`, or against DynamoDB Local when `--endpoint-url` is set, e.g.
+the one started by `docker/docker-compose.yml`.
+Results can be written to JSON with `--output`, and compared with an earlier
+run with `--compare`, which exits with an error if anything regressed by more
+than `--threshold`.
+
+Run with `python -m benchmarks.suite`, see `--help` for the options.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import uuid
+from contextlib import nullcontext
+from dataclasses import make_dataclass
+from datetime import datetime, timezone
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
+
+from moto import mock_dynamodb
+
+from dynamodb_monotable.attributes import IntAttribute, Param, StringAttribute
+from dynamodb_monotable.core.memory import MemoryBackend
+from dynamodb_monotable.core.queries import (
+    HASH_KEY_PARAM,
+    bind_query_args,
+    parse_query_args,
+    prepare_query_args,
+)
+from dynamodb_monotable.core.serializers import to_dynamodb
+from dynamodb_monotable.models import Item
+from dynamodb_monotable.table import Table, TableSchema
+
+DEFAULT_WIDTHS = (5, 20, 50)
+DEFAULT_COUNTS = (10, 100, 1000)
+
+# a benchmark returns the function to time and the operations each call does.
+Benchmark = Callable[..., Tuple[Callable[[], Any], int]]
+
+
+def wide_model(width: int) -> Type[Item]:
+    """Create a model with `width` string attributes as well as its keys."""
+    fields = [
+        ("hk", StringAttribute, StringAttribute(value=f"#WIDE{width}#${{bucket}}")),
+        ("sk", StringAttribute, StringAttribute(value="#ITEM:${item_id}")),
+        ("bucket", IntAttribute, IntAttribute(required=True)),
+        ("item_id", IntAttribute, IntAttribute(required=True)),
+        # a template over a plain attribute, so creating items resolves one more.
+        ("label", StringAttribute, StringAttribute(value="${item_id}:${field_0}")),
+    ]
+    fields.extend(
+        (f"field_{i}", StringAttribute, StringAttribute()) for i in range(width)
+    )
+    return make_dataclass(f"Wide{width}", fields, bases=(Item,))
+
+
+def item_values(width: int, bucket: int, item_id: int) -> Dict[str, Any]:
+    values = {f"field_{i}": f"value-{item_id}-{i:04d}" for i in range(width)}
+    return {"bucket": bucket, "item_id": item_id, **values}
+
+
+def table_schema(models: List[Type[Item]]) -> TableSchema:
+    return TableSchema(
+        **{
+            "indexes": {
+                "primary": {
+                    "hash_key": {"name": "hk", "type": "S"},
+                    "sort_key": {"name": "sk", "type": "S"},
+                    "index_type": "primary",
+                },
+            },
+            "models": models,
+        }
+    )
+
+
+def create_table(
+    models: List[Type[Item]],
+    endpoint_url: Optional[str] = None,
+    backend: Optional[MemoryBackend] = None,
+) -> Table:
+    table = Table(
+        name=f"benchmarks-{uuid.uuid4().hex[:8]}",
+        schema=table_schema(models),
+        client_config={"endpoint_url": endpoint_url} if endpoint_url else None,
+        backend=backend,
+    )
+    table.create_table()
+    return table
+
+
+def fill(model: Any, width: int, bucket: int, count: int) -> List[Tuple[str, str]]:
+    """Save `count` items to a bucket, returns their keys."""
+    keys = []
+    for item_id in range(count):
+        item = model.create(**item_values(width, bucket, item_id))
+        item.save()
+        keys.append((item.hk, item.sk))
+    return keys
+
+
+# benchmarks that make no requests.
+
+
+def bench_create(model: Any, width: int, **_) -> Tuple[Callable[[], Any], int]:
+    values = item_values(width, 1, 1)
+    return lambda: model.create(**values), 1
+
+
+def bench_deserialize(
+    model: Any, width: int, count: int, **_
+) -> Tuple[Callable[[], Any], int]:
+    rows = [
+        model.create(**item_values(width, 1, item_id))._serialize()
+        for item_id in range(count)
+    ]
+    # rows are in the format the client returns them.
+    rows = [to_dynamodb(row) for row in rows]
+    return lambda: model._page_items(rows), count
+
+
+def bench_parse_query_args(model: Any, **_) -> Tuple[Callable[[], Any], int]:
+    hash_key = model._meta.attributes_by_name["hk"]
+    sort_key = model._meta.attributes_by_name["sk"]
+    return (
+        lambda: parse_query_args(
+            hash_key=hash_key,
+            hash_key_value="#WIDE#1",
+            table_name="benchmarks",
+            key_condition=sort_key.begins_with("#ITEM:1"),
+            limit=100,
+        ),
+        1,
+    )
+
+
+def bench_bind_query_args(model: Any, **_) -> Tuple[Callable[[], Any], int]:
+    sort_key = model._meta.attributes_by_name["sk"]
+    args, placeholders = prepare_query_args(
+        hash_key=model._meta.attributes_by_name["hk"],
+        table_name="benchmarks",
+        key_condition=sort_key.begins_with(Param("prefix")),
+        limit=100,
+    )
+    values = {HASH_KEY_PARAM: "#WIDE#1", "prefix": "#ITEM:1"}
+    return lambda: bind_query_args(args, placeholders, values), 1
+
+
+# benchmarks that make requests.
+
+
+def bench_save(model: Any, width: int, **_) -> Tuple[Callable[[], Any], int]:
+    ids = iter(range(sys.maxsize))
+
+    def save() -> None:
+        model.create(**item_values(width, 0, next(ids))).save()
+
+    return save, 1
+
+
+def bench_get(model: Any, width: int, **_) -> Tuple[Callable[[], Any], int]:
+    (hash_key, sort_key), *_ = fill(model, width, 1, 1)
+    return lambda: model.get_by_key(hash_key, sort_key), 1
+
+
+def bench_query(
+    model: Any, width: int, count: int, **_
+) -> Tuple[Callable[[], Any], int]:
+    # every count has its own bucket, so earlier fills aren't returned.
+    (hash_key, _), *_ = fill(model, width, count, count)
+    return lambda: list(model.query(hash_key_value=hash_key)), count
+
+
+def bench_batch_get(
+    model: Any, width: int, count: int, **_
+) -> Tuple[Callable[[], Any], int]:
+    keys = fill(model, width, count, count)
+    return lambda: model.batch_get(keys), count
+
+
+IN_MEMORY: Dict[str, Tuple[Benchmark, bool]] = {
+    "create": (bench_create, False),
+    "deserialize": (bench_deserialize, True),
+    "parse_query_args": (bench_parse_query_args, False),
+    "bind_query_args": (bench_bind_query_args, False),
+}
+ROUND_TRIPS: Dict[str, Tuple[Benchmark, bool]] = {
+    "save": (bench_save, False),
+    "get": (bench_get, False),
+    "query": (bench_query, True),
+    "batch_get": (bench_batch_get, True),
+}
+
+
+def measure(func: Callable[[], Any], ops: int, min_time: float, repeat: int) -> Dict:
+    """Time `func`, calling it enough times for each repeat to last `min_time`."""
+    func()  # warm up, so one off imports and connections aren't counted.
+
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    timings = [elapsed]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append(time.perf_counter() - start)
+
+    per_op = [timing / (number * ops) * 1e6 for timing in timings]
+    return {
+        "calls": number,
+        "ops_per_call": ops,
+        "median_us": statistics.median(per_op),
+        "min_us": min(per_op),
+        "max_us": max(per_op),
+        "ops_per_second": 1e6 / statistics.median(per_op),
+    }
+
+
+def run(
+    benchmarks: Dict[str, Tuple[Benchmark, bool]],
+    models: Dict[int, Any],
+    counts: Tuple[int, ...],
+    backend: str,
+    min_time: float,
+    repeat: int,
+    selected: Optional[List[str]],
+) -> Iterator[Dict[str, Any]]:
+    for name, (benchmark, uses_count) in benchmarks.items():
+        if selected and name not in selected:
+            continue
+
+        for width, model in models.items():
+            for count in counts if uses_count else (None,):
+                params = {"width": width}
+                if count is not None:
+                    params["count"] = count
+
+                func, ops = benchmark(model=model, **params)
+                result = measure(func, ops, min_time, repeat)
+                yield {"name": name, "backend": backend, "params": params, **result}
+
+
+def compare(
+    results: List[Dict[str, Any]], baseline_path: str, threshold: float
+) -> List[str]:
+    """Compare the results with an earlier run, returns the regressions."""
+    with open(baseline_path) as baseline_file:
+        baseline = {
+            _result_id(result): result for result in json.load(baseline_file)["results"]
+        }
+
+    regressions = []
+    for result in results:
+        before = baseline.get(_result_id(result))
+        if before is None:
+            continue
+
+        change = result["median_us"] / before["median_us"] - 1
+        line = f"{_describe(result):<48} {before['median_us']:>10.2f} -> " + (
+            f"{result['median_us']:>10.2f} us/op ({change:+.1%})"
+        )
+        print(line)
+        if change > threshold:
+            regressions.append(line)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--widths", type=int, nargs="+", default=DEFAULT_WIDTHS)
+    parser.add_argument("--counts", type=int, nargs="+", default=DEFAULT_COUNTS)
+    parser.add_argument(
+        "--only", nargs="+", help="the names of the benchmarks to run, e.g. query"
+    )
+    parser.add_argument(
+        "--endpoint-url",
+        help="run the round trips against this endpoint instead of moto, e.g. "
+        "http://localhost:8000 for DynamoDB Local",
+    )
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="run the round trips against the in-memory backend instead of moto",
+    )
+    parser.add_argument(
+        "--skip-round-trips",
+        action="store_true",
+        help="only run the benchmarks that make no requests",
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="seconds each repeat lasts"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="a JSON file from an earlier run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="the slowdown, as a fraction, that counts as a regression",
+    )
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+    model_classes = {width: wide_model(width) for width in args.widths}
+    counts = tuple(args.counts)
+    run_args = dict(min_time=args.min_time, repeat=args.repeat, selected=args.only)
+    results = []
+
+    def report(result: Dict[str, Any]) -> None:
+        results.append(result)
+        print(
+            f"{_describe(result):<48} {result['median_us']:>10.2f} us/op "
+            f"{result['ops_per_second']:>12.0f} ops/s"
+        )
+
+    # creating a table does not make any requests, so no mocking is needed.
+    table = Table(name="benchmarks", schema=table_schema(list(model_classes.values())))
+    models = {width: table.get_model(cls) for width, cls in model_classes.items()}
+    for result in run(IN_MEMORY, models, counts, "memory", **run_args):
+        report(result)
+
+    if not args.skip_round_trips:
+        backend = "endpoint" if args.endpoint_url else "moto"
+        memory = MemoryBackend() if args.memory else None
+        if memory is not None:
+            backend = "memory-backend"
+
+        with _backend(args.endpoint_url or memory):
+            table = create_table(
+                list(model_classes.values()), args.endpoint_url, memory
+            )
+            try:
+                models = {
+                    width: table.get_model(cls) for width, cls in model_classes.items()
+                }
+                for result in run(ROUND_TRIPS, models, counts, backend, **run_args):
+                    report(result)
+            finally:
+                table.delete_table()
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(
+                {"environment": _environment(args), "results": results},
+                output_file,
+                indent=2,
+            )
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(
+                f"\n{len(regressions)} benchmarks regressed by over "
+                f"{args.threshold:.0%}:"
+            )
+            print("\n".join(regressions))
+            return 1
+    return 0
+
+
+def _backend(endpoint: Any) -> ContextManager:
+    # a real endpoint or the in-memory backend need no mocking.
+    return nullcontext() if endpoint else mock_dynamodb()
+
+
+def _result_id(result: Dict[str, Any]) -> Tuple:
+    return (result["name"], result["backend"], *sorted(result["params"].items()))
+
+
+def _describe(result: Dict[str, Any]) -> str:
+    params = " ".join(f"{name}={value}" for name, value in result["params"].items())
+    return f"{result['backend']}/{result['name']} [{params}]"
+
+
+def _environment(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "endpoint_url": args.endpoint_url,
+        "min_time": args.min_time,
+        "repeat": args.repeat,
+    }
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,8 @@
-from typing import Optional, Any, Tuple, Dict
+from typing import Optional, Any, Tuple, Dict, Sequence
 from abc import ABC, abstractmethod
 from datetime import datetime
-from uuid import uuid4
 
-
-class Condition:
-    def __init__(self, expression: str = "", values: Optional[Dict[str, Any]] = None):
-        self.expression = expression
-        self.values = values if values else {}
-
-    def __and__(a, b):
-        return Condition(f"{a.expression} AND {b.expression}", {**a.values, **b.values})
-
-    def __or__(a, b):
-        return Condition(f"{a.expression} OR {b.expression}", {**a.values, **b.values})
+from dynamodb_monotable.conditions import Condition, Function, Operand, Param, Size
 
 
 class AttributeDescriptor:
@@ -21,25 +10,43 @@ class AttributeDescriptor:
         self._name = name
 
     def __set__(self, instance, value):
+        # the dataclass __init__ sets the attribute itself when no value is given.
+        if value is self:
+            return
         instance.attribute_values[self._name] = value
 
+        # `save` only writes the attributes that changed since the item was read.
+        dirty_fields = getattr(instance, "_dirty_fields", None)
+        if dirty_fields is not None:
+            dirty_fields.add(self._name)
+            instance._increments.pop(self._name, None)
+
     def __get__(self, instance, owner):
-        return instance.attribute_values[self._name]
+        if instance is None:
+            return self
+        # return the attribute when there is no value, so conditions can be built.
+        return instance.attribute_values.get(self._name, self)
 
 
-class Attribute(ABC, AttributeDescriptor):
+class Attribute(ABC, AttributeDescriptor, Operand):
     def __init__(
         self,
         name: Optional[str] = None,
         value: Optional[Any] = None,
         required: bool = False,
         default: Optional[Any] = None,
+        shards: Optional[int] = None,
+        shard_by: Optional[Sequence[str]] = None,
     ):
         self.name = name
         self.value = value
         self.required = required
         self.default = default
 
+        # spreads the items over many partitions, see `ShardSpec`.
+        self.shards = shards
+        self.shard_by = tuple(shard_by) if shard_by else None
+
     @abstractmethod
     def serialize(self, value: Any) -> Any:
         raise NotImplementedError()
@@ -53,38 +60,36 @@ class Attribute(ABC, AttributeDescriptor):
     def dynamodb_type(self) -> str:
         raise NotImplementedError()
 
-    def begins_with(self, value: Any) -> Condition:
-        placeholder = f":{self.name}"
-        key_condition_expression_part = f"begins_with({self.name}, {placeholder})"
-        expression_attribute_values_part = {
-            f"{placeholder}": {self.dynamodb_type: self.serialize(value)}
-        }
+    def _condition_value(self, value: Any) -> Dict[str, Any]:
+        """Serialize a value in the format the dynamodb client expects."""
+        if isinstance(value, Param):
+            return Param(value.name, attribute=self)
+        serialized = self.serialize(value)
+        # the client sends numbers as strings so they don't lose precision.
+        if self.dynamodb_type == "N":
+            serialized = str(serialized)
+        return {self.dynamodb_type: serialized}
 
-        return Condition(
-            expression=key_condition_expression_part,
-            values=expression_attribute_values_part,
-        )
+    def begins_with(self, value: Any) -> Condition:
+        return Function("begins_with", self, self._condition_value(value))
 
-    def eq(self, value: Any) -> Condition:
-        placeholder = f":{uuid4().hex}"
-        expression = f"{self.name} = {placeholder}"
-        values = {f"{placeholder}": {self.dynamodb_type: self.serialize(value)}}
+    def contains(self, value: Any) -> Condition:
+        return Function("contains", self, self._condition_value(value))
 
-        return Condition(expression=expression, values=values)
+    def exists(self) -> Condition:
+        return Function("attribute_exists", self)
 
-    def gt(self, value: Any) -> Condition:
-        placeholder = f":{uuid4().hex}"
-        expression = f"{self.name} > {placeholder}"
-        values = {f"{placeholder}": {self.dynamodb_type: self.serialize(value)}}
+    def not_exists(self) -> Condition:
+        return Function("attribute_not_exists", self)
 
-        return Condition(expression=expression, values=values)
+    def size(self) -> Size:
+        """The size of the attribute, compare it with `eq`, `gt` and the like."""
+        return Size(self)
 
-    def lt(self, value: Any) -> Condition:
-        placeholder = f":{uuid4().hex}"
-        expression = f"{self.name} < {placeholder}"
-        values = {f"{placeholder}": {self.dynamodb_type: self.serialize(value)}}
+    # private api starts here.
 
-        return Condition(expression=expression, values=values)
+    def _render_operand(self, builder) -> str:
+        return builder.name(self.name)
 
 
 class StringAttribute(Attribute):
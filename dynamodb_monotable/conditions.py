@@ -0,0 +1,313 @@
+"""Conditions used as key conditions, filters and conditions on writes.
+
+A condition is a tree that is only turned into an expression when a request is
+built. Every attribute name is sent as a `#n` placeholder, so reserved words
+such as `name` or `count` can be used, and every distinct name and value is
+sent once however many times it appears in the request.
+"""
+
+import re
+from itertools import count
+from typing import Any, Dict, Iterator, List, Optional
+
+# the placeholders the builder generates, raw expressions can't use them.
+GENERATED_PLACEHOLDER = re.compile(r"(?<![\w#:])(?:#n|:v)\d+(?!\w)")
+
+
+class Param:
+    """A value left out of a condition, it is bound when a prepared query runs.
+
+    Args:
+        name: The name the value is passed by, see `Item.prepare_query`.
+        attribute: The attribute that serializes the value, set by the condition.
+    """
+
+    def __init__(self, name: str, attribute: Optional[Any] = None):
+        self.name = name
+        self.attribute = attribute
+
+    def bind(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        if self.name not in values:
+            raise ValueError(f"No value was given for the {self.name} parameter.")
+        return self.attribute._condition_value(values[self.name])
+
+
+class ExpressionBuilder:
+    """Gives the names and values in the expressions of a request placeholders.
+
+    Args:
+        names: The `ExpressionAttributeNames` the request already has.
+        values: The `ExpressionAttributeValues` the request already has.
+    """
+
+    def __init__(
+        self,
+        names: Optional[Dict[str, str]] = None,
+        values: Optional[Dict[str, Any]] = None,
+    ):
+        self.names: Dict[str, str] = dict(names or {})
+        self.values: Dict[str, Any] = dict(values or {})
+
+        self._name_placeholders = {name: key for key, name in self.names.items()}
+        self._value_placeholders: Dict[Any, str] = {}
+        self._name_counter = count()
+        self._value_counter = count()
+
+    def build(self, condition: "Condition") -> str:
+        """Render a condition, its names and values are added to the builder."""
+        return condition.render(self)
+
+    def name(self, name: str) -> str:
+        placeholder = self._name_placeholders.get(name)
+        if placeholder is None:
+            placeholder = self._placeholder("#n", self._name_counter, self.names)
+            self.names[placeholder] = name
+            self._name_placeholders[name] = placeholder
+        return placeholder
+
+    def add(self, names: Dict[str, str], values: Dict[str, Any]) -> None:
+        """Add the placeholders of a raw expression as they are.
+
+        Raises:
+            ValueError: If a placeholder already stands for another name or value.
+        """
+        for placeholders, added in ((self.names, names), (self.values, values)):
+            for placeholder, value in added.items():
+                if placeholders.get(placeholder, value) != value:
+                    raise ValueError(
+                        f"The placeholder {placeholder} is used for two values."
+                    )
+                placeholders[placeholder] = value
+
+        for placeholder, name in names.items():
+            self._name_placeholders.setdefault(name, placeholder)
+
+    def value(self, value: Any) -> str:
+        # params are bound later, so the ones with the same name share a value.
+        key = ("param", value.name) if isinstance(value, Param) else repr(value)
+        placeholder = self._value_placeholders.get(key)
+        if placeholder is None:
+            placeholder = self._placeholder(":v", self._value_counter, self.values)
+            self.values[placeholder] = value
+            self._value_placeholders[key] = placeholder
+        return placeholder
+
+    # private api starts here.
+
+    @staticmethod
+    def _placeholder(prefix: str, counter: Iterator[int], taken: Dict) -> str:
+        for index in counter:
+            if f"{prefix}{index}" not in taken:
+                return f"{prefix}{index}"
+
+
+class Condition:
+    """A condition on the attributes of an item.
+
+    Conditions are built with the methods of the attributes, such as
+    `Attribute.eq`, and combined with `&`, `|` and `~`. A raw expression can
+    be given with its placeholders instead, it can't use the `#n0` and `:v0`
+    style placeholders that are generated for the other conditions.
+
+    Args:
+        expression: A raw condition expression.
+        values: The values of the placeholders in the raw expression.
+        names: The attribute names of the placeholders in the raw expression.
+
+    Raises:
+        ValueError: If the raw expression uses a generated placeholder.
+    """
+
+    def __init__(
+        self,
+        expression: str = "",
+        values: Optional[Dict[str, Any]] = None,
+        names: Optional[Dict[str, str]] = None,
+    ):
+        placeholder = GENERATED_PLACEHOLDER.search(expression)
+        if placeholder:
+            raise ValueError(
+                f"{placeholder.group(0)} is reserved for generated placeholders, "
+                "use another name in raw expressions."
+            )
+
+        self._expression = expression
+        self._values = values if values else {}
+        self._names = names if names else {}
+
+    @property
+    def expression(self) -> str:
+        return ExpressionBuilder().build(self)
+
+    @property
+    def names(self) -> Dict[str, str]:
+        builder = ExpressionBuilder()
+        builder.build(self)
+        return builder.names
+
+    @property
+    def values(self) -> Dict[str, Any]:
+        builder = ExpressionBuilder()
+        builder.build(self)
+        return builder.values
+
+    def render(self, builder: ExpressionBuilder) -> str:
+        builder.add(self._names, self._values)
+        return self._expression
+
+    def __and__(self, other: "Condition") -> "Condition":
+        return And(self, other)
+
+    def __or__(self, other: "Condition") -> "Condition":
+        return Or(self, other)
+
+    def __invert__(self) -> "Condition":
+        return Not(self)
+
+
+class And(Condition):
+    """Holds when every one of the conditions holds."""
+
+    operator = "AND"
+
+    def __init__(self, *conditions: Condition):
+        # `a & b & c` is flattened, so it needs no parentheses.
+        self.conditions: List[Condition] = []
+        for condition in conditions:
+            if type(condition) is type(self):
+                self.conditions.extend(condition.conditions)
+            else:
+                self.conditions.append(condition)
+
+    def render(self, builder: ExpressionBuilder) -> str:
+        return f" {self.operator} ".join(
+            _group(condition, builder) for condition in self.conditions
+        )
+
+
+class Or(And):
+    """Holds when any of the conditions holds."""
+
+    operator = "OR"
+
+
+class Not(Condition):
+    def __init__(self, condition: Condition):
+        self.condition = condition
+
+    def render(self, builder: ExpressionBuilder) -> str:
+        return f"NOT {_group(self.condition, builder)}"
+
+
+class Comparison(Condition):
+    def __init__(self, operand: "Operand", operator: str, value: Any):
+        self.operand = operand
+        self.operator = operator
+        self.value = value
+
+    def render(self, builder: ExpressionBuilder) -> str:
+        left = self.operand._render_operand(builder)
+        return f"{left} {self.operator} {builder.value(self.value)}"
+
+
+class Between(Condition):
+    def __init__(self, operand: "Operand", low: Any, high: Any):
+        self.operand = operand
+        self.low = low
+        self.high = high
+
+    def render(self, builder: ExpressionBuilder) -> str:
+        left = self.operand._render_operand(builder)
+        return (
+            f"{left} BETWEEN {builder.value(self.low)} AND {builder.value(self.high)}"
+        )
+
+
+class In(Condition):
+    def __init__(self, operand: "Operand", values: List[Any]):
+        if not values:
+            raise ValueError("IN needs at least one value.")
+        self.operand = operand
+        self.options = values
+
+    def render(self, builder: ExpressionBuilder) -> str:
+        left = self.operand._render_operand(builder)
+        values = ", ".join(builder.value(value) for value in self.options)
+        return f"{left} IN ({values})"
+
+
+class Function(Condition):
+    """A function such as `begins_with(path, :value)` or `attribute_exists(path)`."""
+
+    def __init__(self, function: str, operand: "Operand", *values: Any):
+        self.function = function
+        self.operand = operand
+        self.arguments = values
+
+    def render(self, builder: ExpressionBuilder) -> str:
+        arguments = [self.operand._render_operand(builder)]
+        arguments.extend(builder.value(value) for value in self.arguments)
+        return f"{self.function}({', '.join(arguments)})"
+
+
+class Operand:
+    """The comparisons shared by attributes and the `size` of attributes."""
+
+    def eq(self, value: Any) -> Condition:
+        return Comparison(self, "=", self._condition_value(value))
+
+    def ne(self, value: Any) -> Condition:
+        return Comparison(self, "<>", self._condition_value(value))
+
+    def lt(self, value: Any) -> Condition:
+        return Comparison(self, "<", self._condition_value(value))
+
+    def lte(self, value: Any) -> Condition:
+        return Comparison(self, "<=", self._condition_value(value))
+
+    def gt(self, value: Any) -> Condition:
+        return Comparison(self, ">", self._condition_value(value))
+
+    def gte(self, value: Any) -> Condition:
+        return Comparison(self, ">=", self._condition_value(value))
+
+    def between(self, low: Any, high: Any) -> Condition:
+        """Holds when the value is between `low` and `high`, inclusive."""
+        return Between(self, self._condition_value(low), self._condition_value(high))
+
+    def is_in(self, *values: Any) -> Condition:
+        return In(self, [self._condition_value(value) for value in values])
+
+    # private api starts here.
+
+    def _condition_value(self, value: Any) -> Any:
+        raise NotImplementedError()
+
+    def _render_operand(self, builder: ExpressionBuilder) -> str:
+        raise NotImplementedError()
+
+
+class Size(Operand):
+    """The size of an attribute, e.g. the length of a string."""
+
+    def __init__(self, operand: Operand):
+        self.operand = operand
+
+    # private api starts here.
+
+    def _condition_value(self, value: Any) -> Any:
+        if isinstance(value, Param):
+            return Param(value.name, attribute=self)
+        return {"N": str(int(value))}
+
+    def _render_operand(self, builder: ExpressionBuilder) -> str:
+        return f"size({self.operand._render_operand(builder)})"
+
+
+def _group(condition: Condition, builder: ExpressionBuilder) -> str:
+    """Render a condition inside another, `AND`s, `OR`s and raw expressions are
+    put in parentheses."""
+    expression = condition.render(builder)
+    if isinstance(condition, And) or type(condition) is Condition:
+        return f"({expression})"
+    return expression
@@ -0,0 +1,224 @@
+"""Holds the runner that backfills new attributes onto the items already in a table."""
+
+import json
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from botocore.exceptions import ClientError
+
+from dynamodb_monotable.resolvers import REPLACEMENT_PATTERN
+from dynamodb_monotable.core.cache import item_size
+from dynamodb_monotable.core.ratelimit import TokenBucket
+from dynamodb_monotable.core.scan import parse_scan_args, segment_pages
+from dynamodb_monotable.core.serializers import from_dynamodb, to_dynamodb
+
+
+class Backfill:
+    """Scans a table and writes the attributes that are missing or out of date.
+
+    Every row of the model is read with a parallel scan, its template
+    attributes are resolved again and missing attributes are given their
+    default. Only the attributes that changed are written, with an
+    `UpdateItem` that fails if the item has since been deleted. The key
+    attributes are never changed.
+
+    The progress of each segment is saved to `checkpoint_path` after every
+    page, so a backfill that crashed carries on from where it stopped when
+    it is run again. A finished backfill does nothing when run again, delete
+    the checkpoint to run it from the start.
+
+    Args:
+        model: The model to backfill, as returned by `Table.get_model`.
+        checkpoint_path: The file the progress is saved to.
+        segments: The number of segments to split the table into.
+        workers: The number of segments to backfill at once.
+        max_wcu: The write capacity units to use each second, or None for no limit.
+        page_size: The number of rows to read in each scan request.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        checkpoint_path: str,
+        segments: int = 8,
+        workers: int = 4,
+        max_wcu: Optional[float] = None,
+        page_size: Optional[int] = None,
+    ):
+        self.model = model
+        self.checkpoint_path = checkpoint_path
+        self.segments = segments
+        self.workers = workers
+        self.page_size = page_size
+
+        self._limiter = TokenBucket(max_wcu) if max_wcu else None
+        self._lock = threading.Lock()
+        self._checkpoint = self._load_checkpoint()
+        self._stats = {"scanned": 0, "updated": 0}
+
+    def run(self) -> Dict[str, int]:
+        """Backfill every segment that isn't done yet.
+
+        Returns:
+            The number of rows of the model that were `scanned` and `updated`
+            by this run.
+        """
+        pending = [
+            segment
+            for segment in range(self.segments)
+            if not self._segment_state(segment)["done"]
+        ]
+        if pending:
+            workers = min(self.workers, len(pending))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # consume the results so errors in the workers are raised.
+                list(executor.map(self._backfill_segment, pending))
+        return dict(self._stats)
+
+    def changes(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Find the attributes of a row, from the dynamodb client, that need writing."""
+        model = self.model
+        meta = model._meta
+        key_names = model._key_names()
+
+        item = model._from_query_item(row)
+        stored = item.attribute_values
+
+        # templates are resolved from scratch, apart from the keys.
+        values = {
+            name: value
+            for name, value in stored.items()
+            if name not in meta.templates or name in key_names
+        }
+        for name, default in meta.defaults.items():
+            if name not in values and default is not None:
+                values[name] = default
+        meta.template_plan.resolve(values)
+
+        changes = {}
+        for name, value in values.items():
+            if name in key_names or value is None:
+                continue
+            # a template that is still missing some of its values can't be written.
+            if isinstance(value, str) and REPLACEMENT_PATTERN.search(value):
+                continue
+            if name not in row or stored.get(name) != value:
+                changes[name] = value
+        return changes
+
+    # private api starts here.
+
+    def _backfill_segment(self, segment: int) -> None:
+        model = self.model
+        client = model._client()
+        dispatch = model._scan_dispatch()
+        scan_args = parse_scan_args(
+            table_name=model.table_config["table_name"], limit=self.page_size
+        )
+
+        state = self._segment_state(segment)
+        pages = segment_pages(
+            model._scan,
+            scan_args,
+            segment,
+            self.segments,
+            exclusive_start_key=state["last_evaluated_key"],
+        )
+        for page in pages:
+            scanned = updated = 0
+            for row in page["Items"]:
+                if dispatch is not None and dispatch(row) is None:
+                    continue
+
+                scanned += 1
+                changes = self.changes(row)
+                if changes and self._update(client, row, changes):
+                    updated += 1
+
+            self._save_progress(segment, page.get("LastEvaluatedKey"), scanned, updated)
+
+    def _update(self, client, row: Dict[str, Any], changes: Dict[str, Any]) -> bool:
+        """Write the changed attributes, returns False if the item was deleted."""
+        model = self.model
+        key_names = model._key_names()
+        attributes = model._meta.attributes_by_name
+
+        serialized = to_dynamodb(
+            {name: attributes[name].serialize(value) for name, value in changes.items()}
+        )
+        names = {f"#key{i}": name for i, name in enumerate(key_names)}
+        values = {}
+        assignments = []
+        for i, (name, value) in enumerate(serialized.items()):
+            names[f"#attr{i}"] = name
+            values[f":attr{i}"] = value
+            assignments.append(f"#attr{i} = :attr{i}")
+
+        if self._limiter is not None:
+            # an update is charged for the bigger of the old and new item.
+            stored = from_dynamodb(row)
+            size = max(item_size(stored), item_size({**stored, **changes}))
+            self._limiter.acquire(math.ceil(size / 1024))
+
+        try:
+            client.update_item(
+                TableName=model.table_config["table_name"],
+                Key={name: row[name] for name in key_names},
+                UpdateExpression=f"SET {', '.join(assignments)}",
+                ConditionExpression=" AND ".join(
+                    f"attribute_exists(#key{i})" for i in range(len(key_names))
+                ),
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values,
+            )
+        except ClientError as error:
+            if error.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise
+
+        # the cached item is out of date now, as it is after a save.
+        model._uncache(from_dynamodb({name: row[name] for name in key_names}))
+        return True
+
+    def _segment_state(self, segment: int) -> Dict[str, Any]:
+        return self._checkpoint["segments"].get(
+            str(segment), {"last_evaluated_key": None, "done": False}
+        )
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        if not os.path.exists(self.checkpoint_path):
+            return {"segments_total": self.segments, "segments": {}}
+
+        with open(self.checkpoint_path) as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+
+        if checkpoint["segments_total"] != self.segments:
+            raise ValueError(
+                f"The checkpoint was created with {checkpoint['segments_total']} "
+                f"segments, the backfill has to be resumed with the same number."
+            )
+        return checkpoint
+
+    def _save_progress(
+        self,
+        segment: int,
+        last_evaluated_key: Optional[Dict[str, Any]],
+        scanned: int,
+        updated: int,
+    ) -> None:
+        with self._lock:
+            self._stats["scanned"] += scanned
+            self._stats["updated"] += updated
+            self._checkpoint["segments"][str(segment)] = {
+                "last_evaluated_key": last_evaluated_key,
+                "done": not last_evaluated_key,
+            }
+
+            # write to a temporary file first, so a crash never leaves half a file.
+            temporary_path = f"{self.checkpoint_path}.tmp"
+            with open(temporary_path, "w") as checkpoint_file:
+                json.dump(self._checkpoint, checkpoint_file)
+            os.replace(temporary_path, self.checkpoint_path)
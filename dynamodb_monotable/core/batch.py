@@ -0,0 +1,454 @@
+"""Holds the core logic for batch requests."""
+
+import asyncio
+import random
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+from dynamodb_monotable.exceptions import BatchRetriesExhausted
+from dynamodb_monotable.core.serializers import to_dynamodb, from_dynamodb
+from dynamodb_monotable.core.cache import ItemCache, cache_key, item_size
+from dynamodb_monotable.core.metrics import (
+    NULL_RECORD,
+    Metrics,
+    OperationRecord,
+    capacity_args,
+    measure,
+)
+
+T = TypeVar("T")
+
+BATCH_GET_SIZE = 100
+BATCH_WRITE_SIZE = 25
+
+
+def chunk(items: Sequence[T], size: int) -> Iterator[Sequence[T]]:
+    """Split the items into chunks of at most `size` items."""
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def backoff_delay(attempt: int, base: float = 0.05, cap: float = 5.0) -> float:
+    """Exponential backoff with full jitter, in seconds."""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def batch_get_chunk(
+    get_resource: Callable[[], Any],
+    table_name: str,
+    keys: List[Dict[str, Any]],
+    consistent_read: bool = False,
+    max_attempts: int = 8,
+    record: OperationRecord = NULL_RECORD,
+    **params: Any,
+) -> List[Dict[str, Any]]:
+    """Fetch up to 100 keys with `BatchGetItem`, retrying any unprocessed keys.
+
+    Args:
+        get_resource: Returns the dynamodb resource to use on the current thread.
+        table_name: The name of the table to fetch the items from.
+        keys: The keys of the items to fetch.
+        consistent_read: Whether to use strongly consistent reads.
+        max_attempts: The number of requests to make before giving up.
+        record: Records the responses and retries of the requests.
+        params: Extra parameters of the requests, e.g. `ReturnConsumedCapacity`.
+    """
+
+    items = []
+    request = {table_name: {"Keys": keys, "ConsistentRead": consistent_read}}
+
+    for attempt in range(max_attempts):
+        if attempt:
+            record.retried()
+            time.sleep(backoff_delay(attempt))
+
+        response = get_resource().batch_get_item(RequestItems=request, **params)
+        record.response(response)
+        items.extend(response["Responses"].get(table_name, []))
+
+        request = response.get("UnprocessedKeys")
+        if not request:
+            return items
+
+    raise BatchRetriesExhausted(
+        f"{len(request[table_name]['Keys'])} keys were still unprocessed "
+        f"after {max_attempts} attempts."
+    )
+
+
+def batch_write_chunk(
+    get_resource: Callable[[], Any],
+    table_name: str,
+    requests: List[Dict[str, Any]],
+    max_attempts: int = 8,
+    record: OperationRecord = NULL_RECORD,
+    **params: Any,
+) -> None:
+    """Send up to 25 write requests with `BatchWriteItem`, retrying unprocessed ones.
+
+    Args:
+        get_resource: Returns the dynamodb resource to use on the current thread.
+        table_name: The name of the table to write the items to.
+        requests: `PutRequest` or `DeleteRequest` write requests.
+        max_attempts: The number of requests to make before giving up.
+        record: Records the responses and retries of the requests.
+        params: Extra parameters of the requests, e.g. `ReturnConsumedCapacity`.
+    """
+
+    request = {table_name: requests}
+
+    for attempt in range(max_attempts):
+        if attempt:
+            record.retried()
+            time.sleep(backoff_delay(attempt))
+
+        response = get_resource().batch_write_item(RequestItems=request, **params)
+        record.response(response)
+
+        request = response.get("UnprocessedItems")
+        if not request:
+            return
+
+    raise BatchRetriesExhausted(
+        f"{len(request[table_name])} items were still unprocessed "
+        f"after {max_attempts} attempts."
+    )
+
+
+async def abatch_get_chunk(
+    client,
+    table_name: str,
+    keys: List[Dict[str, Any]],
+    consistent_read: bool = False,
+    max_attempts: int = 8,
+    record: OperationRecord = NULL_RECORD,
+    **params: Any,
+) -> List[Dict[str, Any]]:
+    """The asyncio version of `batch_get_chunk`, using an `aiobotocore` client."""
+
+    items = []
+    request = {
+        table_name: {
+            "Keys": [to_dynamodb(key) for key in keys],
+            "ConsistentRead": consistent_read,
+        }
+    }
+
+    for attempt in range(max_attempts):
+        if attempt:
+            record.retried()
+            await asyncio.sleep(backoff_delay(attempt))
+
+        response = await client.batch_get_item(RequestItems=request, **params)
+        record.response(response)
+        items.extend(
+            from_dynamodb(item) for item in response["Responses"].get(table_name, [])
+        )
+
+        request = response.get("UnprocessedKeys")
+        if not request:
+            return items
+
+    raise BatchRetriesExhausted(
+        f"{len(request[table_name]['Keys'])} keys were still unprocessed "
+        f"after {max_attempts} attempts."
+    )
+
+
+async def abatch_write_chunk(
+    client,
+    table_name: str,
+    requests: List[Dict[str, Any]],
+    max_attempts: int = 8,
+    record: OperationRecord = NULL_RECORD,
+    **params: Any,
+) -> None:
+    """The asyncio version of `batch_write_chunk`, using an `aiobotocore` client."""
+
+    request = {table_name: [_request_to_dynamodb(request) for request in requests]}
+
+    for attempt in range(max_attempts):
+        if attempt:
+            record.retried()
+            await asyncio.sleep(backoff_delay(attempt))
+
+        response = await client.batch_write_item(RequestItems=request, **params)
+        record.response(response)
+
+        request = response.get("UnprocessedItems")
+        if not request:
+            return
+
+    raise BatchRetriesExhausted(
+        f"{len(request[table_name])} items were still unprocessed "
+        f"after {max_attempts} attempts."
+    )
+
+
+def _request_to_dynamodb(request: Dict[str, Any]) -> Dict[str, Any]:
+    if "PutRequest" in request:
+        return {"PutRequest": {"Item": to_dynamodb(request["PutRequest"]["Item"])}}
+    return {"DeleteRequest": {"Key": to_dynamodb(request["DeleteRequest"]["Key"])}}
+
+
+class _WriteBuffer:
+    """Groups write requests into batches of 25, keyed by their primary key."""
+
+    def __init__(
+        self,
+        table_name: str,
+        key_names: List[str],
+        parallelism: int,
+        cache: Optional[ItemCache] = None,
+        metrics: Optional[Metrics] = None,
+    ):
+        self._table_name = table_name
+        self._key_names = key_names
+        self._parallelism = parallelism
+        self._cache = cache
+        self._metrics = metrics
+        self._batch: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+
+    def _put_request(self, item) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        if item.create_state is False:
+            raise ValueError("Item must be created before saving.")
+
+        serialized_item = item._serialize()
+        return serialized_item, {"PutRequest": {"Item": serialized_item}}
+
+    def _delete_request(self, item) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        key = {name: item.attribute_values[name] for name in self._key_names}
+        return key, {"DeleteRequest": {"Key": key}}
+
+    def _key(self, item: Dict[str, Any]) -> Tuple[Any, ...]:
+        return tuple(item[name] for name in self._key_names)
+
+    def _buffer(self, item: Dict[str, Any], request: Dict[str, Any]) -> bool:
+        """Add a request to the batch, returns True once the batch is full."""
+        self._batch[self._key(item)] = request
+        return len(self._batch) >= BATCH_WRITE_SIZE
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        requests, self._batch = list(self._batch.values()), {}
+        return requests
+
+    @staticmethod
+    def _record_batch(record: OperationRecord, requests: List[Dict[str, Any]]) -> None:
+        record.items = len(requests)
+        record.bytes = sum(
+            item_size(request["PutRequest"]["Item"])
+            for request in requests
+            if "PutRequest" in request
+        )
+
+    def _uncache(self, requests: List[Dict[str, Any]]) -> None:
+        """Remove the written items from the cache, once they have been written."""
+        if self._cache is None:
+            return
+
+        for request in requests:
+            if "PutRequest" in request:
+                item = request["PutRequest"]["Item"]
+            else:
+                item = request["DeleteRequest"]["Key"]
+            self._cache.delete(cache_key(self._table_name, self._key_names, item))
+
+
+class BatchWriter(_WriteBuffer):
+    """Buffers writes and flushes them with `BatchWriteItem` on the registry's
+    threads, see `ClientRegistry.map`.
+
+    Items are grouped into batches of 25, and `parallelism` full batches are
+    sent at once. Writing the same primary key twice within a batch replaces
+    the earlier write, as dynamodb rejects batches that contain duplicate
+    keys. A key that is already in a batch waiting to be sent is only
+    buffered again once that batch has been written, so the writes to a key
+    land in order. Use it as a context manager so the remaining items are
+    flushed, and any errors raised, on exit.
+
+    Args:
+        clients: The client registry of the table.
+        client_config: The config used to create the clients.
+        table_name: The name of the table to write the items to.
+        key_names: The names of the primary key attributes of the table.
+        parallelism: The number of batches to send at once.
+        cache: The cache of the table, written items are removed from it.
+        metrics: Records every `BatchWriteItem` request, see `Metrics`.
+    """
+
+    def __init__(
+        self,
+        clients,
+        client_config: Dict[str, Any],
+        table_name: str,
+        key_names: List[str],
+        parallelism: int = 8,
+        cache: Optional[ItemCache] = None,
+        metrics: Optional[Metrics] = None,
+    ):
+        super().__init__(table_name, key_names, parallelism, cache, metrics)
+        self._clients = clients
+        self._client_config = client_config
+
+        self._ready: List[List[Dict[str, Any]]] = []
+        self._ready_keys: Set[Tuple[Any, ...]] = set()
+
+    def put(self, item) -> None:
+        """Buffer a created item to be put into the table."""
+        self._add(*self._put_request(item))
+
+    def delete(self, item) -> None:
+        """Buffer the deletion of an item from the table."""
+        self._add(*self._delete_request(item))
+
+    def flush(self) -> None:
+        """Send every buffered write and wait for all of them to complete."""
+        self._send_batch()
+        self._send_ready()
+
+    def __enter__(self) -> "BatchWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.flush()
+
+    # private api starts here.
+
+    def _add(self, item: Dict[str, Any], request: Dict[str, Any]) -> None:
+        # batches that are sent together can land in any order.
+        if self._key(item) in self._ready_keys:
+            self._send_ready()
+        if self._buffer(item, request):
+            self._send_batch()
+
+    def _send_batch(self) -> None:
+        if not self._batch:
+            return
+
+        self._ready_keys.update(self._batch)
+        self._ready.append(self._take_batch())
+        if len(self._ready) >= self._parallelism:
+            self._send_ready()
+
+    def _send_ready(self) -> None:
+        """Send the full batches at once and wait for them to be written."""
+        batches, self._ready = self._ready, []
+        self._ready_keys = set()
+        self._clients.map(self._write, batches, max_workers=self._parallelism)
+
+    def _write(self, requests: List[Dict[str, Any]]) -> None:
+        with measure(self._metrics, "batch_write_item", self._table_name) as record:
+            with record.phase("network"):
+                batch_write_chunk(
+                    lambda: self._clients.resource(self._client_config),
+                    self._table_name,
+                    requests,
+                    record=record,
+                    **capacity_args(self._metrics),
+                )
+            self._record_batch(record, requests)
+        self._uncache(requests)
+
+
+class AsyncBatchWriter(_WriteBuffer):
+    """The asyncio version of `BatchWriter`, batches are sent as asyncio tasks.
+
+    Usage:
+        async with table.abatch_writer(parallelism=8) as writer:
+            await writer.put(item)
+    """
+
+    def __init__(
+        self,
+        clients,
+        client_config: Dict[str, Any],
+        table_name: str,
+        key_names: List[str],
+        parallelism: int = 8,
+        cache: Optional[ItemCache] = None,
+        metrics: Optional[Metrics] = None,
+    ):
+        super().__init__(table_name, key_names, parallelism, cache, metrics)
+        self._clients = clients
+        self._client_config = client_config
+
+        self._pending: List[asyncio.Task] = []
+        self._pending_keys: Set[Tuple[Any, ...]] = set()
+
+    async def put(self, item) -> None:
+        """Buffer a created item to be put into the table."""
+        await self._add(*self._put_request(item))
+
+    async def delete(self, item) -> None:
+        """Buffer the deletion of an item from the table."""
+        await self._add(*self._delete_request(item))
+
+    async def flush(self) -> None:
+        """Send every buffered write and wait for all of them to complete."""
+        await self._send_batch()
+        await self._wait_pending()
+
+    async def __aenter__(self) -> "AsyncBatchWriter":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            await self.flush()
+            return
+
+        for task in self._pending:
+            task.cancel()
+        self._pending = []
+        self._pending_keys = set()
+
+    # private api starts here.
+
+    async def _add(self, item: Dict[str, Any], request: Dict[str, Any]) -> None:
+        # batches in flight at the same time can land in any order.
+        if self._key(item) in self._pending_keys:
+            await self._wait_pending()
+        if self._buffer(item, request):
+            await self._send_batch()
+
+    async def _send_batch(self) -> None:
+        if not self._batch:
+            return
+
+        self._pending_keys.update(self._batch)
+        requests = self._take_batch()
+
+        if len(self._pending) >= self._parallelism:
+            await self._pending.pop(0)
+
+        self._pending.append(asyncio.ensure_future(self._write(requests)))
+
+    async def _wait_pending(self) -> None:
+        pending, self._pending = self._pending, []
+        self._pending_keys = set()
+        await asyncio.gather(*pending)
+
+    async def _write(self, requests: List[Dict[str, Any]]) -> None:
+        client = await self._clients.aclient(self._client_config)
+        with measure(self._metrics, "batch_write_item", self._table_name) as record:
+            with record.phase("network"):
+                await abatch_write_chunk(
+                    client,
+                    self._table_name,
+                    requests,
+                    record=record,
+                    **capacity_args(self._metrics),
+                )
+            self._record_batch(record, requests)
+        self._uncache(requests)
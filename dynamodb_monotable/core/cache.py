@@ -0,0 +1,128 @@
+"""Holds the read-through cache that models use for items fetched by key."""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+CacheKey = Tuple[Hashable, ...]
+
+
+def cache_key(table_name: str, key_names: List[str], item: Dict[str, Any]) -> CacheKey:
+    """Create the cache key of an item, or of the key of an item."""
+    return (table_name, *(item[name] for name in key_names))
+
+
+def item_size(item: Dict[str, Any]) -> int:
+    """Roughly estimate the size of an item in bytes, like dynamodb does."""
+    return sum(len(name) + len(str(value)) for name, value in item.items())
+
+
+class ItemCache(ABC):
+    """The interface of a cache of serialized items, keyed by their primary key.
+
+    Implement it to plug in another cache, such as one shared between processes.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    def get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        """Get an item, or None if it isn't cached."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def set(self, key: CacheKey, item: Dict[str, Any]) -> None:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def delete(self, key: CacheKey) -> None:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def clear(self) -> None:
+        raise NotImplementedError()
+
+
+class LRUCache(ItemCache):
+    """An in process cache that evicts the least recently used items.
+
+    Args:
+        max_entries: The maximum number of items to hold.
+        max_bytes: The maximum estimated size of all of the items, see `item_size`.
+        ttl: The number of seconds an item is kept for, or None to keep it
+            until it is evicted.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: Optional[float] = 60.0,
+    ):
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[CacheKey, Tuple[float, int, Dict[str, Any]]]" = (
+            OrderedDict()
+        )
+        self._size = 0
+
+    def get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, _, item = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item
+
+    def set(self, key: CacheKey, item: Dict[str, Any]) -> None:
+        size = item_size(item)
+        if size > self.max_bytes:
+            self.delete(key)
+            return
+
+        expires_at = (
+            time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        )
+        with self._lock:
+            self._remove(key)
+            self._items[key] = (expires_at, size, item)
+            self._size += size
+
+            while len(self._items) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._items)))
+
+    def delete(self, key: CacheKey) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    # private api starts here.
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._items.pop(key, None)
+        if entry is not None:
+            self._size -= entry[1]
@@ -0,0 +1,281 @@
+"""Holds the registry that shares boto3 clients between models."""
+
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import boto3
+from botocore.config import Config
+
+from dynamodb_monotable.core.ratelimit import RateLimiter
+
+try:
+    from aiobotocore.session import get_session as get_async_session
+except ImportError:  # pragma: no cover
+    get_async_session = None
+
+ConfigKey = Tuple[Tuple[str, str], ...]
+
+
+def _config_key(client_config: Dict[str, Any]) -> ConfigKey:
+    """Turn a client config into something we can use as a dict key."""
+    return tuple(sorted((key, repr(value)) for key, value in client_config.items()))
+
+
+class Backend(ABC):
+    """Hands out the clients of a table in place of boto3, see `MemoryBackend`.
+
+    The clients have to support the low level client api, and the resource
+    the boto3 dynamodb resource api, for the requests the models make.
+    """
+
+    @abstractmethod
+    def client(self):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def resource(self):
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def aclient(self):
+        raise NotImplementedError()
+
+
+class ClientRegistry:
+    """Lazily creates boto3 clients and resources and shares them between calls.
+
+    Creating a client loads the endpoint data and opens a new connection pool,
+    so we only do it once per `client_config`. Clients are thread safe and are
+    shared by every thread. Resources are not, so we keep one per thread.
+
+    The asyncio clients, which need the optional `aiobotocore` dependency, are
+    bound to the event loop they were created on, so we keep one per loop.
+    They have to be closed with `aclose` before the loop is closed.
+
+    Requests that are sent concurrently go through `map`, which runs them on
+    threads that live as long as the registry, so the resources those threads
+    create are reused by the following calls.
+
+    Args:
+        max_pool_connections: The size of the HTTP connection pool of each client.
+        tcp_keepalive: Whether to send TCP keep-alive packets on idle connections.
+        backend: Hands out the clients instead of boto3 when provided.
+        rate_limiter: Sends every request through the limiter when provided,
+            which takes over retrying them from botocore.
+    """
+
+    def __init__(
+        self,
+        max_pool_connections: int = 10,
+        tcp_keepalive: bool = True,
+        backend: Optional[Backend] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        self.max_pool_connections = max_pool_connections
+        self.tcp_keepalive = tcp_keepalive
+        self.backend = backend
+        self.rate_limiter = rate_limiter
+
+        self._lock = threading.Lock()
+        self._session = None
+        self._clients: Dict[ConfigKey, Any] = {}
+        self._local = threading.local()
+        self._async_session = None
+        self._async_clients: Dict[Tuple[int, ConfigKey], Any] = {}
+        self._async_locks: Dict[int, asyncio.Lock] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # set on the threads that are running the calls of a `map`.
+        self._mapping = threading.local()
+
+    def client(self, client_config: Dict[str, Any]):
+        """Get the shared dynamodb client for the provided config."""
+        if self.backend is not None:
+            return self._limited(self.backend.client())
+
+        key = _config_key(client_config)
+        try:
+            return self._clients[key]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if key not in self._clients:
+                self._clients[key] = self._limited(
+                    self._get_session().client(
+                        "dynamodb", **self._build_kwargs(client_config)
+                    )
+                )
+            return self._clients[key]
+
+    def resource(self, client_config: Dict[str, Any]):
+        """Get the dynamodb resource for the provided config, for this thread."""
+        if self.backend is not None:
+            return self._limited(self.backend.resource())
+
+        key = _config_key(client_config)
+        resources = getattr(self._local, "resources", None)
+        if resources is None:
+            resources = self._local.resources = {}
+
+        if key not in resources:
+            # sessions are not thread safe, so resources are created under the lock.
+            with self._lock:
+                resources[key] = self._limited(
+                    self._get_session().resource(
+                        "dynamodb", **self._build_kwargs(client_config)
+                    )
+                )
+        return resources[key]
+
+    def table(self, client_config: Dict[str, Any], table_name: str):
+        """Get a dynamodb `Table` resource for the provided config, for this thread."""
+        return self.resource(client_config).Table(table_name)
+
+    async def aclient(self, client_config: Dict[str, Any]):
+        """Get the shared `aiobotocore` client for the config, for this event loop."""
+        if self.backend is not None:
+            return self._async_limited(await self.backend.aclient())
+
+        loop_id = id(asyncio.get_running_loop())
+        key = (loop_id, _config_key(client_config))
+        try:
+            return self._async_limited(self._async_clients[key])
+        except KeyError:
+            pass
+
+        if get_async_session is None:
+            raise ImportError(
+                "aiobotocore is required for the asyncio api, "
+                "install it with `pip install dynamodb-monotable[asyncio]`."
+            )
+
+        lock = self._async_locks.setdefault(loop_id, asyncio.Lock())
+        async with lock:
+            if key not in self._async_clients:
+                if self._async_session is None:
+                    self._async_session = get_async_session()
+
+                client = self._async_session.create_client(
+                    "dynamodb", **self._build_kwargs(client_config)
+                )
+                self._async_clients[key] = await client.__aenter__()
+            return self._async_limited(self._async_clients[key])
+
+    def map(
+        self,
+        func: Callable[[Any], Any],
+        items: Sequence[Any],
+        max_workers: Optional[int] = None,
+    ) -> List[Any]:
+        """Call `func` on every item concurrently, returns the results in order.
+
+        The calling thread takes part, so a single item is run without
+        switching threads. The first error is raised once every running call
+        has finished, the items that weren't started by then are dropped.
+        Calls to `map` made by `func` run their items on the current thread,
+        as waiting for the pool from one of its own threads could deadlock.
+
+        Args:
+            func: The function to call on each item.
+            items: The items to call it on.
+            max_workers: The maximum number of calls to run at once, at most
+                `max_pool_connections`.
+        """
+        workers = min(
+            len(items),
+            max_workers or self.max_pool_connections,
+            self.max_pool_connections,
+        )
+        if workers <= 1 or getattr(self._mapping, "active", False):
+            return [func(item) for item in items]
+
+        results: List[Any] = [None] * len(items)
+        indexes = iter(range(len(items)))
+        lock = threading.Lock()
+        failed = threading.Event()
+
+        def run() -> None:
+            self._mapping.active = True
+            try:
+                while not failed.is_set():
+                    with lock:
+                        index = next(indexes, None)
+                    if index is None:
+                        return
+                    try:
+                        results[index] = func(items[index])
+                    except BaseException:
+                        failed.set()
+                        raise
+            finally:
+                self._mapping.active = False
+
+        futures = [self._get_executor().submit(run) for _ in range(workers - 1)]
+        try:
+            run()
+        finally:
+            for future in futures:
+                # the caller's own error takes precedence over the workers'.
+                future.exception()
+        for future in futures:
+            future.result()
+        return results
+
+    async def aclose(self) -> None:
+        """Close the asyncio clients that were created on this event loop."""
+        loop_id = id(asyncio.get_running_loop())
+        for key in [key for key in self._async_clients if key[0] == loop_id]:
+            await self._async_clients.pop(key).__aexit__(None, None, None)
+        self._async_locks.pop(loop_id, None)
+
+    def clear(self) -> None:
+        """Drop every client. New ones are created on the next call."""
+        with self._lock:
+            self._session = None
+            self._clients = {}
+            self._local = threading.local()
+
+    # private api starts here.
+
+    def _get_session(self) -> boto3.session.Session:
+        if self._session is None:
+            self._session = boto3.session.Session()
+        return self._session
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_pool_connections,
+                        thread_name_prefix="dynamodb-monotable",
+                    )
+        return self._executor
+
+    def _limited(self, client):
+        if self.rate_limiter is None:
+            return client
+        return self.rate_limiter.wrap(client)
+
+    def _async_limited(self, client):
+        if self.rate_limiter is None:
+            return client
+        return self.rate_limiter.wrap_async(client)
+
+    def _build_kwargs(self, client_config: Dict[str, Any]) -> Dict[str, Any]:
+        config = Config(
+            max_pool_connections=self.max_pool_connections,
+            tcp_keepalive=self.tcp_keepalive,
+        )
+        if self.rate_limiter is not None:
+            # the limiter retries throttled requests, after slowing down.
+            config = config.merge(Config(retries={"total_max_attempts": 1}))
+
+        # config passed in by the user takes precedence over ours.
+        if client_config.get("config"):
+            config = config.merge(client_config["config"])
+
+        return {**client_config, "config": config}
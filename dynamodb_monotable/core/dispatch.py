@@ -0,0 +1,155 @@
+"""Holds the logic for finding which model a row from the table belongs to."""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from dynamodb_monotable.conditions import Condition
+from dynamodb_monotable.resolvers import CompiledTemplate
+
+
+class PrefixTrie:
+    """Maps string prefixes to values, and finds the prefixes of a string."""
+
+    def __init__(self):
+        self._root: Dict[str, Any] = {}
+        self._values = object()
+
+    def insert(self, prefix: str, value: Any) -> None:
+        node = self._root
+        for character in prefix:
+            node = node.setdefault(character, {})
+        node.setdefault(self._values, []).append(value)
+
+    def matches(self, key: str) -> List[Any]:
+        """Get the values of every inserted prefix of `key`, longest prefix first."""
+        node = self._root
+        found = list(node.get(self._values, []))
+        for character in key:
+            node = node.get(character)
+            if node is None:
+                break
+            found = node.get(self._values, []) + found
+        return found
+
+
+def _raw_value(attribute_value: Dict[str, Any]) -> Any:
+    """Get the value out of a typed value such as `{"S": "value"}`."""
+    return next(iter(attribute_value.values()))
+
+
+class ModelDispatcher:
+    """Finds the model a row returned by the dynamodb client belongs to.
+
+    When the table has a `type_attribute`, every model must give that
+    attribute a constant value which is used to look the model up. Otherwise
+    models are found by the literal prefix of their sort key template, longest
+    prefix first, and the whole template is matched to confirm the model.
+
+    Args:
+        models: The models of the table, as returned by `Table.get_model`.
+        sort_key_name: The name of the sort key of the table.
+        type_attribute: The name of the attribute that holds the item type.
+
+    Raises:
+        ValueError: If a model doesn't have a constant value for the type attribute.
+    """
+
+    def __init__(
+        self,
+        models: List[Any],
+        sort_key_name: Optional[str] = None,
+        type_attribute: Optional[str] = None,
+    ):
+        self._type_attribute = type_attribute
+        self._sort_key_name = sort_key_name
+        self._models_by_type: Dict[str, Any] = {}
+        self._trie = PrefixTrie()
+
+        templates = []
+        for model in models:
+            if type_attribute:
+                self._models_by_type[self._type_value(model, type_attribute)] = model
+            elif sort_key_name:
+                attribute = model._meta.attributes_by_name.get(sort_key_name)
+                if attribute is not None and isinstance(attribute.value, str):
+                    templates.append(
+                        (CompiledTemplate(sort_key_name, attribute.value), model)
+                    )
+
+        # "#ORG:${org_id}#WO:${wo_id}" also matches the keys of the items under a
+        # work order, so the most specific templates have to be tried first.
+        templates.sort(key=lambda entry: -sum(map(len, entry[0].literals)))
+        for template, model in templates:
+            prefix = (
+                template.literals[0] if template.placeholders else template.template
+            )
+            self._trie.insert(prefix, (template, model))
+
+    def dispatch(self, item: Dict[str, Any]) -> Optional[Any]:
+        """Get the model for a row, or None if it doesn't belong to any model."""
+        if self._type_attribute:
+            if self._type_attribute not in item:
+                return None
+            return self._models_by_type.get(_raw_value(item[self._type_attribute]))
+
+        if self._sort_key_name not in item:
+            return None
+
+        sort_key = _raw_value(item[self._sort_key_name])
+        candidates: List[Tuple[CompiledTemplate, Any]] = self._trie.matches(sort_key)
+        for template, model in candidates:
+            if template.placeholders:
+                values = template.parse(sort_key)
+                if values is not None and self._deserializes(model, values):
+                    return model
+            elif template.template == sort_key:
+                return model
+        return None
+
+    def projection(self) -> List[str]:
+        """The names of the attributes `dispatch` needs to find the model of a row."""
+        if self._type_attribute:
+            return [self._type_attribute]
+        return [self._sort_key_name] if self._sort_key_name else []
+
+    def type_condition(self, model: Any) -> Optional[Condition]:
+        """A condition that only holds for the rows of the model, it can only be
+        built when the table has a type attribute."""
+        if not self._type_attribute:
+            return None
+        attribute = model._meta.attributes_by_name[self._type_attribute]
+        return attribute.eq(self._type_value(model, self._type_attribute))
+
+    # private api starts here.
+
+    @staticmethod
+    def _deserializes(model: Any, values: Dict[str, str]) -> bool:
+        """Check the values parsed out of a key are valid for the model, a
+        placeholder at the end of a template also matches the keys of rows
+        nested under it, e.g. `1#NOTE:a` for a work order id."""
+        attributes = model._meta.attributes_by_name
+        for name, value in values.items():
+            attribute = attributes.get(name)
+            if attribute is None:
+                continue
+            try:
+                attribute.deserialize(value)
+            except (TypeError, ValueError):
+                return False
+        return True
+
+    @staticmethod
+    def _type_value(model: Any, type_attribute: str) -> str:
+        attribute = model._meta.attributes_by_name.get(type_attribute)
+        if attribute is None or not isinstance(attribute.value, str):
+            raise ValueError(
+                f"{model.__class__.__name__} must define {type_attribute} "
+                "with a constant value."
+            )
+
+        template = CompiledTemplate(type_attribute, attribute.value)
+        if template.placeholders:
+            raise ValueError(
+                f"The {type_attribute} of {model.__class__.__name__} must be a "
+                "constant, not a template."
+            )
+        return attribute.value
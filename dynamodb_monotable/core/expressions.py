@@ -0,0 +1,624 @@
+"""Parses and evaluates dynamodb expressions, used by the in-memory backend.
+
+Condition, key condition, filter, projection and update expressions are
+supported. Items are in the format of the low level client, such as
+`{"name": {"S": "value"}}`.
+"""
+
+import re
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from boto3.dynamodb.types import TypeDeserializer
+
+Path = Tuple[Union[str, int], ...]
+Node = Tuple[Any, ...]
+AttributeValue = Dict[str, Any]
+
+_deserializer = TypeDeserializer()
+
+_TOKEN_PATTERN = re.compile(
+    r"\s*(?:"
+    r"(?P<name>#[A-Za-z0-9_]+)"
+    r"|(?P<value>:[A-Za-z0-9_]+)"
+    r"|(?P<identifier>[A-Za-z_][A-Za-z0-9_]*)"
+    r"|(?P<index>\[\s*\d+\s*\])"
+    r"|(?P<operator><>|<=|>=|=|<|>)"
+    r"|(?P<punctuation>[(),.+\-])"
+    r")"
+)
+
+COMPARATORS = ("=", "<>", "<", "<=", ">", ">=")
+CONDITION_FUNCTIONS = (
+    "attribute_exists",
+    "attribute_not_exists",
+    "attribute_type",
+    "begins_with",
+    "contains",
+)
+UPDATE_CLAUSES = ("SET", "REMOVE", "ADD", "DELETE")
+
+
+class ExpressionError(ValueError):
+    """An expression is invalid, the backend raises it as a `ValidationException`."""
+
+    pass
+
+
+def parse_condition(
+    expression: str,
+    names: Optional[Dict[str, str]] = None,
+    values: Optional[Dict[str, AttributeValue]] = None,
+) -> Node:
+    """Parse a condition, key condition or filter expression."""
+    parser = _Parser(expression, names, values)
+    node = parser.condition()
+    parser.end()
+    return node
+
+
+def parse_projection(
+    expression: str, names: Optional[Dict[str, str]] = None
+) -> List[Path]:
+    """Parse a projection expression into the paths it selects."""
+    parser = _Parser(expression, names, None)
+    paths = [parser.path()[1]]
+    while parser.accept(","):
+        paths.append(parser.path()[1])
+    parser.end()
+    return paths
+
+
+def parse_update(
+    expression: str,
+    names: Optional[Dict[str, str]] = None,
+    values: Optional[Dict[str, AttributeValue]] = None,
+) -> List[Tuple[str, Path, Optional[Node]]]:
+    """Parse an update expression into its `(clause, path, value)` actions."""
+    parser = _Parser(expression, names, values)
+    actions: List[Tuple[str, Path, Optional[Node]]] = []
+    seen: Set[str] = set()
+
+    while not parser.done():
+        clause = parser.keyword(*UPDATE_CLAUSES)
+        if clause is None or clause in seen:
+            raise ExpressionError(f"Invalid update expression: {expression}")
+        seen.add(clause)
+
+        while True:
+            path = parser.path()[1]
+            if clause == "SET":
+                parser.expect("=")
+                actions.append((clause, path, parser.update_value()))
+            elif clause == "REMOVE":
+                actions.append((clause, path, None))
+            else:
+                actions.append((clause, path, parser.operand()))
+
+            if not parser.accept(","):
+                break
+
+    if not actions:
+        raise ExpressionError("The update expression is empty.")
+    return actions
+
+
+def key_conditions(node: Node) -> List[Node]:
+    """Split a key condition into the conditions joined by its `AND`s."""
+    if node[0] == "and":
+        return key_conditions(node[1]) + key_conditions(node[2])
+    return [node]
+
+
+def evaluate(node: Node, item: Dict[str, AttributeValue]) -> bool:
+    """Check whether a parsed condition holds for an item."""
+    kind = node[0]
+    if kind == "and":
+        return evaluate(node[1], item) and evaluate(node[2], item)
+    if kind == "or":
+        return evaluate(node[1], item) or evaluate(node[2], item)
+    if kind == "not":
+        return not evaluate(node[1], item)
+    if kind == "compare":
+        return compare(node[1], operand(node[2], item), operand(node[3], item))
+    if kind == "between":
+        value = operand(node[1], item)
+        return compare(">=", value, operand(node[2], item)) and compare(
+            "<=", value, operand(node[3], item)
+        )
+    if kind == "in":
+        value = operand(node[1], item)
+        return any(compare("=", value, operand(o, item)) for o in node[2])
+    return _function(node[1], [operand(arg, item) for arg in node[2]], node[2])
+
+
+def operand(node: Node, item: Dict[str, AttributeValue]) -> Optional[AttributeValue]:
+    """Get the value of an operand, None when it refers to a missing attribute."""
+    kind = node[0]
+    if kind == "value":
+        return node[1]
+    if kind == "path":
+        return get_path(item, node[1])
+    if kind == "size":
+        value = operand(node[1], item)
+        if value is None:
+            return None
+        ((value_type, raw),) = value.items()
+        if value_type in ("S", "B", "L", "M", "SS", "NS", "BS"):
+            return {"N": str(len(raw))}
+        raise ExpressionError(f"size() is not supported for {value_type} values.")
+    if kind == "if_not_exists":
+        value = get_path(item, node[1][1])
+        return value if value is not None else operand(node[2], item)
+    if kind == "list_append":
+        first, second = operand(node[1], item), operand(node[2], item)
+        if first is None or second is None or "L" not in first or "L" not in second:
+            raise ExpressionError("list_append() needs two lists.")
+        return {"L": first["L"] + second["L"]}
+    if kind == "arithmetic":
+        first, second = operand(node[2], item), operand(node[3], item)
+        if first is None or second is None or "N" not in first or "N" not in second:
+            raise ExpressionError(
+                "An operand in the update expression has an incorrect data type."
+            )
+        result = Decimal(first["N"]) + (
+            Decimal(second["N"]) if node[1] == "+" else -Decimal(second["N"])
+        )
+        return {"N": format_number(result)}
+    raise ExpressionError(f"Unsupported operand {kind}.")
+
+
+def compare(
+    operator: str,
+    first: Optional[AttributeValue],
+    second: Optional[AttributeValue],
+) -> bool:
+    """Compare two values like dynamodb, a missing value is never equal."""
+    if operator in ("=", "<>"):
+        equal = (
+            first is not None
+            and second is not None
+            and _deserializer.deserialize(first) == _deserializer.deserialize(second)
+        )
+        return equal if operator == "=" else not equal
+
+    first_key, second_key = scalar(first), scalar(second)
+    # only values of the same scalar type can be ordered.
+    if first_key is None or second_key is None or first_key[0] != second_key[0]:
+        return False
+    if operator == "<":
+        return first_key < second_key
+    if operator == "<=":
+        return first_key <= second_key
+    if operator == ">":
+        return first_key > second_key
+    return first_key >= second_key
+
+
+def scalar(value: Optional[AttributeValue]) -> Optional[Tuple[str, Any]]:
+    """Get a value that sorts like dynamodb sorts a string, number or binary."""
+    if not value:
+        return None
+    ((value_type, raw),) = value.items()
+    if value_type == "S":
+        # comparing code points sorts strings the same as their utf-8 bytes.
+        return value_type, raw
+    if value_type == "N":
+        return value_type, Decimal(raw)
+    if value_type == "B":
+        return value_type, bytes(raw)
+    return None
+
+
+def format_number(number: Decimal) -> str:
+    """Format a number the way dynamodb returns it, without an exponent."""
+    text = format(number.normalize(), "f")
+    return text if text != "-0" else "0"
+
+
+def copy_value(value: AttributeValue) -> AttributeValue:
+    """Copy a value, only its lists and maps need copying as the rest is immutable."""
+    ((value_type, raw),) = value.items()
+    if value_type == "M":
+        return {"M": {name: copy_value(v) for name, v in raw.items()}}
+    if value_type == "L":
+        return {"L": [copy_value(v) for v in raw]}
+    if value_type in ("SS", "NS", "BS"):
+        return {value_type: list(raw)}
+    return {value_type: raw}
+
+
+def get_path(item: Dict[str, AttributeValue], path: Path) -> Optional[AttributeValue]:
+    """Get the value at a document path, or None if it doesn't exist."""
+    value: Any = {"M": item}
+    for segment in path:
+        if isinstance(segment, int):
+            values = value.get("L")
+            if values is None or segment >= len(values):
+                return None
+        else:
+            values = value.get("M")
+            if values is None or segment not in values:
+                return None
+        value = values[segment]
+    return value
+
+
+def project(
+    item: Dict[str, AttributeValue], paths: Sequence[Path]
+) -> Dict[str, AttributeValue]:
+    """Keep only the attributes selected by a projection."""
+    projected: Dict[str, Any] = {}
+    for path in paths:
+        value = get_path(item, path)
+        if value is None:
+            continue
+
+        container: Any = projected
+        for segment, next_segment in zip(path, path[1:]):
+            child = {"L": []} if isinstance(next_segment, int) else {"M": {}}
+            if isinstance(container, dict):
+                child = container.setdefault(segment, child)
+            else:
+                # selected list elements are returned in order, without gaps.
+                container.append(child)
+            container = child["L"] if "L" in child else child["M"]
+
+        if isinstance(container, dict):
+            container[path[-1]] = value
+        else:
+            container.append(value)
+    return projected
+
+
+def apply_update(
+    item: Dict[str, AttributeValue],
+    actions: List[Tuple[str, Path, Optional[Node]]],
+) -> Tuple[Dict[str, AttributeValue], Set[str]]:
+    """Apply the actions of an update expression to a copy of an item.
+
+    Returns:
+        The updated item and the names of the top level attributes it changed.
+    """
+    # every value is computed from the item as it was before the update.
+    values = [
+        operand(value, item) if value is not None else None for _, _, value in actions
+    ]
+    updated = {name: copy_value(value) for name, value in item.items()}
+    changed = set()
+
+    for (clause, path, _), value in zip(actions, values):
+        changed.add(path[0])
+        if clause == "SET":
+            _set_path(updated, path, value)
+        elif clause == "REMOVE":
+            _remove_path(updated, path)
+        elif clause == "ADD":
+            _set_path(updated, path, _add(get_path(updated, path), value))
+        else:
+            remaining = _delete(get_path(updated, path), value)
+            if remaining is None:
+                _remove_path(updated, path)
+            else:
+                _set_path(updated, path, remaining)
+    return updated, changed
+
+
+# private api starts here.
+
+
+class _Parser:
+    """A recursive descent parser over the tokens of an expression."""
+
+    def __init__(
+        self,
+        expression: str,
+        names: Optional[Dict[str, str]],
+        values: Optional[Dict[str, AttributeValue]],
+    ):
+        self.expression = expression
+        self.names = names or {}
+        self.values = values or {}
+        self.tokens = _tokenize(expression)
+        self.position = 0
+
+    def done(self) -> bool:
+        return self.position >= len(self.tokens)
+
+    def peek(self, offset: int = 0) -> Optional[Tuple[str, str]]:
+        position = self.position + offset
+        return self.tokens[position] if position < len(self.tokens) else None
+
+    def take(self) -> Tuple[str, str]:
+        token = self.peek()
+        if token is None:
+            raise ExpressionError(f"Unexpected end of expression: {self.expression}")
+        self.position += 1
+        return token
+
+    def accept(self, text: str) -> bool:
+        token = self.peek()
+        if token is not None and token[0] in ("operator", "punctuation"):
+            if token[1] == text:
+                self.position += 1
+                return True
+        return False
+
+    def expect(self, text: str) -> None:
+        if not self.accept(text):
+            raise ExpressionError(f"Expected {text!r} in expression: {self.expression}")
+
+    def keyword(self, *words: str) -> Optional[str]:
+        token = self.peek()
+        if token is not None and token[0] == "identifier":
+            if token[1].upper() in words:
+                self.position += 1
+                return token[1].upper()
+        return None
+
+    def end(self) -> None:
+        if not self.done():
+            raise ExpressionError(
+                f"Unexpected {self.peek()[1]!r} in expression: {self.expression}"
+            )
+
+    def is_function(self, *functions: str) -> bool:
+        token, following = self.peek(), self.peek(1)
+        return (
+            token is not None
+            and token[0] == "identifier"
+            and token[1] in functions
+            and following == ("punctuation", "(")
+        )
+
+    def condition(self) -> Node:
+        node = self.conjunction()
+        while self.keyword("OR"):
+            node = ("or", node, self.conjunction())
+        return node
+
+    def conjunction(self) -> Node:
+        node = self.negation()
+        while self.keyword("AND"):
+            node = ("and", node, self.negation())
+        return node
+
+    def negation(self) -> Node:
+        following = self.peek(1)
+        # `not` is only a keyword when it isn't compared like an attribute name.
+        if following is None or following[0] != "operator":
+            if self.keyword("NOT"):
+                return ("not", self.negation())
+        return self.comparison()
+
+    def comparison(self) -> Node:
+        if self.accept("("):
+            node = self.condition()
+            self.expect(")")
+            return node
+
+        if self.is_function(*CONDITION_FUNCTIONS):
+            name = self.take()[1]
+            return ("function", name, self.arguments())
+
+        left = self.operand()
+        token = self.peek()
+        if token is not None and token[0] == "operator":
+            self.take()
+            return ("compare", token[1], left, self.operand())
+        if self.keyword("BETWEEN"):
+            low = self.operand()
+            if not self.keyword("AND"):
+                raise ExpressionError(f"BETWEEN needs an AND: {self.expression}")
+            return ("between", left, low, self.operand())
+        if self.keyword("IN"):
+            return ("in", left, self.arguments())
+        raise ExpressionError(f"Invalid condition: {self.expression}")
+
+    def arguments(self) -> List[Node]:
+        self.expect("(")
+        arguments = [self.operand()]
+        while self.accept(","):
+            arguments.append(self.operand())
+        self.expect(")")
+        return arguments
+
+    def operand(self) -> Node:
+        token = self.peek()
+        if token is not None and token[0] == "value":
+            self.take()
+            if token[1] not in self.values:
+                raise ExpressionError(
+                    f"The expression attribute value {token[1]} is not defined."
+                )
+            return ("value", self.values[token[1]])
+
+        if self.is_function("size"):
+            self.take()
+            arguments = self.arguments()
+            return ("size", arguments[0])
+        if self.is_function("if_not_exists"):
+            self.take()
+            arguments = self.arguments()
+            if len(arguments) != 2 or arguments[0][0] != "path":
+                raise ExpressionError("if_not_exists() needs a path and a value.")
+            return ("if_not_exists", arguments[0], arguments[1])
+        if self.is_function("list_append"):
+            self.take()
+            arguments = self.arguments()
+            if len(arguments) != 2:
+                raise ExpressionError("list_append() needs two operands.")
+            return ("list_append", arguments[0], arguments[1])
+        return self.path()
+
+    def update_value(self) -> Node:
+        node = self.operand()
+        for operator in ("+", "-"):
+            if self.accept(operator):
+                return ("arithmetic", operator, node, self.operand())
+        return node
+
+    def path(self) -> Node:
+        segments: List[Union[str, int]] = [self.name()]
+        while True:
+            token = self.peek()
+            if token is not None and token[0] == "index":
+                self.take()
+                segments.append(int(token[1].strip("[] ")))
+            elif self.accept("."):
+                segments.append(self.name())
+            else:
+                return ("path", tuple(segments))
+
+    def name(self) -> str:
+        kind, text = self.take()
+        if kind == "identifier":
+            return text
+        if kind == "name":
+            if text not in self.names:
+                raise ExpressionError(
+                    f"The expression attribute name {text} is not defined."
+                )
+            return self.names[text]
+        raise ExpressionError(f"Expected an attribute name, got {text!r}.")
+
+
+def _tokenize(expression: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = _TOKEN_PATTERN.match(expression, position)
+        if match is None or match.end() == position:
+            raise ExpressionError(
+                f"Invalid syntax at {expression[position:]!r} in: {expression}"
+            )
+        tokens.append((match.lastgroup, match.group(match.lastgroup)))
+        position = match.end()
+    return tokens
+
+
+def _function(
+    name: str, arguments: List[Optional[AttributeValue]], nodes: List[Node]
+) -> bool:
+    if name in ("attribute_exists", "attribute_not_exists"):
+        if nodes[0][0] != "path":
+            raise ExpressionError(f"{name}() needs an attribute path.")
+        return (arguments[0] is not None) == (name == "attribute_exists")
+
+    value, argument = arguments[0], arguments[1]
+    if value is None or argument is None:
+        return False
+    ((value_type, raw),) = value.items()
+
+    if name == "attribute_type":
+        return argument.get("S") == value_type
+    if name == "begins_with":
+        ((argument_type, prefix),) = argument.items()
+        if value_type != argument_type or value_type not in ("S", "B"):
+            return False
+        return raw.startswith(prefix)
+
+    # contains
+    if value_type == "S":
+        return "S" in argument and argument["S"] in raw
+    if value_type in ("SS", "NS", "BS"):
+        element = _deserializer.deserialize(argument)
+        return element in _deserializer.deserialize(value)
+    if value_type == "L":
+        return any(compare("=", element, argument) for element in raw)
+    return False
+
+
+def _set_path(
+    item: Dict[str, AttributeValue], path: Path, value: Optional[AttributeValue]
+) -> None:
+    if value is None:
+        raise ExpressionError(
+            "The provided expression refers to an attribute that does not exist."
+        )
+
+    container: Any = item
+    for segment in path[:-1]:
+        try:
+            child = container[segment]
+        except (KeyError, IndexError, TypeError):
+            raise ExpressionError(
+                "The document path provided in the update expression is invalid."
+            )
+        container = child["L"] if "L" in child else child.get("M")
+        if container is None:
+            raise ExpressionError(
+                "The document path provided in the update expression is invalid."
+            )
+
+    segment = path[-1]
+    if isinstance(segment, int):
+        if not isinstance(container, list):
+            raise ExpressionError(f"{segment} can only index a list.")
+        # setting past the end of a list appends to it.
+        if segment >= len(container):
+            container.append(value)
+        else:
+            container[segment] = value
+    else:
+        container[segment] = value
+
+
+def _remove_path(item: Dict[str, AttributeValue], path: Path) -> None:
+    parent = get_path(item, path[:-1]) if len(path) > 1 else {"M": item}
+    if parent is None:
+        return
+
+    segment = path[-1]
+    if isinstance(segment, int):
+        if "L" in parent and segment < len(parent["L"]):
+            parent["L"].pop(segment)
+    elif "M" in parent:
+        parent["M"].pop(segment, None)
+
+
+def _add(
+    current: Optional[AttributeValue], value: Optional[AttributeValue]
+) -> AttributeValue:
+    if value is None:
+        raise ExpressionError("ADD needs a value.")
+    ((value_type, raw),) = value.items()
+
+    if value_type == "N":
+        if current is None:
+            return value
+        if "N" not in current:
+            raise ExpressionError("ADD can only add a number to a number.")
+        return {"N": format_number(Decimal(current["N"]) + Decimal(raw))}
+
+    if value_type in ("SS", "NS", "BS"):
+        if current is None:
+            return value
+        if value_type not in current:
+            raise ExpressionError("ADD can only add a set to a set of the same type.")
+        merged = list(current[value_type])
+        merged.extend(element for element in raw if element not in merged)
+        return {value_type: merged}
+
+    raise ExpressionError("ADD only supports numbers and sets.")
+
+
+def _delete(
+    current: Optional[AttributeValue], value: Optional[AttributeValue]
+) -> Optional[AttributeValue]:
+    if value is None:
+        raise ExpressionError("DELETE needs a value.")
+    ((value_type, raw),) = value.items()
+    if value_type not in ("SS", "NS", "BS"):
+        raise ExpressionError("DELETE only supports sets.")
+    if current is None:
+        return None
+    if value_type not in current:
+        raise ExpressionError(
+            "DELETE can only remove a set from a set of the same type."
+        )
+
+    remaining = [element for element in current[value_type] if element not in raw]
+    # dynamodb doesn't store empty sets, the attribute is removed instead.
+    return {value_type: remaining} if remaining else None
@@ -0,0 +1,191 @@
+"""Holds the loader that batches individual gets into `BatchGetItem` requests."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from dynamodb_monotable.core.batch import (
+    BATCH_GET_SIZE,
+    abatch_get_chunk,
+    batch_get_chunk,
+)
+from dynamodb_monotable.core.cache import item_size
+from dynamodb_monotable.core.metrics import (
+    Metrics,
+    OperationRecord,
+    capacity_args,
+    measure,
+)
+
+ItemKey = Tuple[Any, ...]
+
+
+class _Batch:
+    """The keys waiting to be fetched together, and a future for each of them."""
+
+    def __init__(self):
+        self.keys: Dict[ItemKey, Dict[str, Any]] = {}
+        self.futures: Dict[ItemKey, Any] = {}
+
+
+class ItemLoader:
+    """Collects gets by key that happen close together and sends one batch request.
+
+    In threaded code the first caller of a batch waits `window` seconds for
+    other threads to add their keys, then sends the request on its own thread
+    while the others wait for their item. In asyncio code the batch is sent
+    once `window` seconds have passed, with a window of 0 every get made
+    within one tick of the event loop is sent together. A batch is sent
+    straight away once it holds 100 keys.
+
+    Args:
+        clients: The registry to get the dynamodb clients from.
+        client_config: The config used to create the clients.
+        table_name: The name of the table to fetch the items from.
+        key_names: The names of the primary key attributes of the table.
+        window: The number of seconds to wait for more keys before sending a batch.
+        metrics: Records every `BatchGetItem` request, see `Metrics`.
+    """
+
+    def __init__(
+        self,
+        clients: Any,
+        client_config: Dict[str, Any],
+        table_name: str,
+        key_names: List[str],
+        window: float = 0.002,
+        metrics: Optional[Metrics] = None,
+    ):
+        self.clients = clients
+        self.client_config = client_config
+        self.table_name = table_name
+        self.key_names = key_names
+        self.window = window
+        self.metrics = metrics
+
+        self._lock = threading.Lock()
+        self._batches: Dict[bool, _Batch] = {}
+        self._async_batches: Dict[Tuple[int, bool], _Batch] = {}
+
+    def load(
+        self, key: Dict[str, Any], consistent_read: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Get the item with the key, or None if it doesn't exist."""
+        with self._lock:
+            batch = self._batches.get(consistent_read)
+            is_leader = batch is None
+            if is_leader:
+                batch = self._batches[consistent_read] = _Batch()
+
+            future = self._add(batch, key, Future)
+            is_full = len(batch.keys) >= BATCH_GET_SIZE
+            if is_full:
+                self._batches.pop(consistent_read, None)
+
+        if is_full:
+            self._dispatch(batch, consistent_read)
+        elif is_leader:
+            time.sleep(self.window)
+            with self._lock:
+                # the batch may have filled up and been sent by another thread.
+                is_current = self._batches.get(consistent_read) is batch
+                if is_current:
+                    del self._batches[consistent_read]
+            if is_current:
+                self._dispatch(batch, consistent_read)
+
+        return future.result()
+
+    async def aload(
+        self, key: Dict[str, Any], consistent_read: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """The asyncio version of `load`, batches are collected per event loop."""
+        loop = asyncio.get_running_loop()
+        group = (id(loop), consistent_read)
+
+        batch = self._async_batches.get(group)
+        if batch is None:
+            batch = self._async_batches[group] = _Batch()
+            loop.call_later(self.window, self._aflush, group, batch)
+
+        future = self._add(batch, key, loop.create_future)
+        if len(batch.keys) >= BATCH_GET_SIZE:
+            self._aflush(group, batch)
+
+        # one caller being cancelled must not cancel the batch for the others.
+        return await asyncio.shield(future)
+
+    # private api starts here.
+
+    def _item_key(self, item: Dict[str, Any]) -> ItemKey:
+        return tuple(item[name] for name in self.key_names)
+
+    def _add(self, batch: _Batch, key: Dict[str, Any], create_future) -> Any:
+        item_key = self._item_key(key)
+        if item_key not in batch.futures:
+            batch.keys[item_key] = key
+            batch.futures[item_key] = create_future()
+        return batch.futures[item_key]
+
+    def _resolve(self, batch: _Batch, items: List[Dict[str, Any]]) -> None:
+        found = {self._item_key(item): item for item in items}
+        for item_key, future in batch.futures.items():
+            if not future.done():
+                future.set_result(found.get(item_key))
+
+    def _fail(self, batch: _Batch, error: BaseException) -> None:
+        for future in batch.futures.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def _measure(self):
+        return measure(self.metrics, "batch_get_item", self.table_name)
+
+    @staticmethod
+    def _record_items(record: OperationRecord, items: List[Dict[str, Any]]) -> None:
+        record.items = len(items)
+        record.bytes = sum(item_size(item) for item in items)
+
+    def _dispatch(self, batch: _Batch, consistent_read: bool) -> None:
+        try:
+            with self._measure() as record:
+                with record.phase("network"):
+                    items = batch_get_chunk(
+                        lambda: self.clients.resource(self.client_config),
+                        self.table_name,
+                        list(batch.keys.values()),
+                        consistent_read=consistent_read,
+                        record=record,
+                        **capacity_args(self.metrics),
+                    )
+                self._record_items(record, items)
+        except Exception as error:
+            self._fail(batch, error)
+        else:
+            self._resolve(batch, items)
+
+    def _aflush(self, group: Tuple[int, bool], batch: _Batch) -> None:
+        if self._async_batches.get(group) is batch:
+            del self._async_batches[group]
+            asyncio.ensure_future(self._adispatch(batch, group[1]))
+
+    async def _adispatch(self, batch: _Batch, consistent_read: bool) -> None:
+        try:
+            client = await self.clients.aclient(self.client_config)
+            with self._measure() as record:
+                with record.phase("network"):
+                    items = await abatch_get_chunk(
+                        client,
+                        self.table_name,
+                        list(batch.keys.values()),
+                        consistent_read=consistent_read,
+                        record=record,
+                        **capacity_args(self.metrics),
+                    )
+                self._record_items(record, items)
+        except Exception as error:
+            self._fail(batch, error)
+        else:
+            self._resolve(batch, items)
@@ -0,0 +1,1131 @@
+"""Holds an in-memory dynamodb, to run tests and benchmarks without a network."""
+
+import bisect
+import math
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from botocore.exceptions import ClientError
+
+from dynamodb_monotable.core.clients import Backend
+from dynamodb_monotable.core.expressions import (
+    ExpressionError,
+    Node,
+    apply_update,
+    copy_value,
+    evaluate,
+    format_number,
+    key_conditions,
+    parse_condition,
+    parse_projection,
+    parse_update,
+    project,
+    scalar,
+)
+from dynamodb_monotable.core.serializers import from_dynamodb, to_dynamodb
+
+Item = Dict[str, Dict[str, Any]]
+PrimaryKey = Tuple[Tuple[str, Any], ...]
+
+PAGE_MAX_BYTES = 1024 * 1024
+BATCH_GET_MAX_KEYS = 100
+BATCH_WRITE_MAX_ITEMS = 25
+TRANSACTION_MAX_ITEMS = 100
+
+
+class MemoryBackend(Backend):
+    """Keeps tables in memory and hands out clients that read and write them.
+
+    It implements the requests the models make: `GetItem`, `PutItem`,
+    `UpdateItem`, `DeleteItem`, `Query`, `Scan`, the batch and transaction
+    apis and creating tables, along with the condition, filter, projection
+    and update expressions they use. Every partition is a sorted list, so
+    queries find their range of sort keys with a binary search.
+
+    Errors are raised as botocore `ClientError`s with the codes dynamodb
+    uses. Requests are applied one at a time under a lock, and nothing is
+    ever throttled or left unprocessed. Secondary indexes project every
+    attribute, whatever their `Projection`.
+
+    Pass it to a `Table` as its `backend`.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.tables: Dict[str, "_MemoryTable"] = {}
+        self._client = MemoryClient(self)
+
+    def client(self) -> "MemoryClient":
+        return self._client
+
+    def resource(self) -> "MemoryResource":
+        return MemoryResource(self._client)
+
+    async def aclient(self) -> "AsyncMemoryClient":
+        return AsyncMemoryClient(self._client)
+
+    def clear(self) -> None:
+        """Drop every table."""
+        with self.lock:
+            self.tables = {}
+
+
+class MemoryClient:
+    """The in-memory version of the low level dynamodb client.
+
+    Args:
+        backend: The backend that holds the tables.
+    """
+
+    def __init__(self, backend: MemoryBackend):
+        self._backend = backend
+        self.exceptions = _EXCEPTIONS
+
+    def create_table(
+        self,
+        TableName: str,
+        KeySchema: List[Dict[str, str]],
+        AttributeDefinitions: List[Dict[str, str]],
+        GlobalSecondaryIndexes: Optional[List[Dict[str, Any]]] = None,
+        LocalSecondaryIndexes: Optional[List[Dict[str, Any]]] = None,
+        **_options: Any,
+    ) -> Dict[str, Any]:
+        with self._backend.lock:
+            if TableName in self._backend.tables:
+                raise _error(
+                    "ResourceInUseException",
+                    f"Table already exists: {TableName}",
+                    "CreateTable",
+                )
+
+            table = _MemoryTable(
+                TableName,
+                KeySchema,
+                AttributeDefinitions,
+                [*(GlobalSecondaryIndexes or []), *(LocalSecondaryIndexes or [])],
+            )
+            self._backend.tables[TableName] = table
+            return _response(TableDescription=table.describe())
+
+    def describe_table(self, TableName: str) -> Dict[str, Any]:
+        with self._backend.lock:
+            table = self._table(TableName, "DescribeTable")
+            return _response(Table=table.describe())
+
+    def delete_table(self, TableName: str) -> Dict[str, Any]:
+        with self._backend.lock:
+            table = self._table(TableName, "DeleteTable")
+            del self._backend.tables[TableName]
+            return _response(TableDescription=table.describe())
+
+    def list_tables(self, **_options: Any) -> Dict[str, Any]:
+        with self._backend.lock:
+            return _response(TableNames=sorted(self._backend.tables))
+
+    def get_item(
+        self,
+        TableName: str,
+        Key: Item,
+        ConsistentRead: bool = False,
+        ProjectionExpression: Optional[str] = None,
+        ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+        ReturnConsumedCapacity: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        with self._backend.lock, _validation("GetItem"):
+            table = self._table(TableName, "GetItem")
+            item = table.items.get(table.key(Key))
+            size = _item_size(item) if item else 0
+
+            response = _capacity(
+                TableName, _read_units(size, ConsistentRead), ReturnConsumedCapacity
+            )
+            if item is not None:
+                response["Item"] = _projected(
+                    item, ProjectionExpression, ExpressionAttributeNames
+                )
+            return _response(**response)
+
+    def put_item(
+        self,
+        TableName: str,
+        Item: Item,
+        ConditionExpression: Optional[str] = None,
+        ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+        ExpressionAttributeValues: Optional[Item] = None,
+        ReturnValues: str = "NONE",
+        ReturnConsumedCapacity: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        return self._single_write("Put", "PutItem", locals())
+
+    def update_item(
+        self,
+        TableName: str,
+        Key: Item,
+        UpdateExpression: Optional[str] = None,
+        ConditionExpression: Optional[str] = None,
+        ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+        ExpressionAttributeValues: Optional[Item] = None,
+        ReturnValues: str = "NONE",
+        ReturnConsumedCapacity: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        return self._single_write("Update", "UpdateItem", locals())
+
+    def delete_item(
+        self,
+        TableName: str,
+        Key: Item,
+        ConditionExpression: Optional[str] = None,
+        ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+        ExpressionAttributeValues: Optional[Item] = None,
+        ReturnValues: str = "NONE",
+        ReturnConsumedCapacity: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        return self._single_write("Delete", "DeleteItem", locals())
+
+    def query(
+        self,
+        TableName: str,
+        KeyConditionExpression: str,
+        IndexName: Optional[str] = None,
+        FilterExpression: Optional[str] = None,
+        ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+        ExpressionAttributeValues: Optional[Item] = None,
+        Limit: Optional[int] = None,
+        ExclusiveStartKey: Optional[Item] = None,
+        ScanIndexForward: bool = True,
+        Select: Optional[str] = None,
+        ProjectionExpression: Optional[str] = None,
+        ConsistentRead: bool = False,
+        ReturnConsumedCapacity: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        with self._backend.lock, _validation("Query"):
+            table = self._table(TableName, "Query")
+            index = table.index(IndexName)
+            condition = parse_condition(
+                KeyConditionExpression,
+                ExpressionAttributeNames,
+                ExpressionAttributeValues,
+            )
+            hash_value, sort_condition = index.key_condition(condition)
+
+            partition = index.partitions.get(hash_value, [])
+            start, stop = index.sort_range(partition, sort_condition)
+            if ExclusiveStartKey:
+                start_entry = table.start_entry(index, ExclusiveStartKey)
+                if start_entry[0] != hash_value:
+                    raise ExpressionError("The provided starting key is invalid.")
+                if ScanIndexForward:
+                    start = max(start, bisect.bisect_right(partition, start_entry[1]))
+                else:
+                    stop = min(stop, bisect.bisect_left(partition, start_entry[1]))
+
+            entries = partition[start:stop]
+            if not ScanIndexForward:
+                entries.reverse()
+
+            return self._page(
+                table,
+                index,
+                (primary_key for _, primary_key in entries),
+                Limit,
+                FilterExpression,
+                ExpressionAttributeNames,
+                ExpressionAttributeValues,
+                ProjectionExpression,
+                Select,
+                ConsistentRead,
+                ReturnConsumedCapacity,
+            )
+
+    def scan(
+        self,
+        TableName: str,
+        IndexName: Optional[str] = None,
+        FilterExpression: Optional[str] = None,
+        ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+        ExpressionAttributeValues: Optional[Item] = None,
+        Limit: Optional[int] = None,
+        ExclusiveStartKey: Optional[Item] = None,
+        Segment: Optional[int] = None,
+        TotalSegments: Optional[int] = None,
+        Select: Optional[str] = None,
+        ProjectionExpression: Optional[str] = None,
+        ConsistentRead: bool = False,
+        ReturnConsumedCapacity: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        with self._backend.lock, _validation("Scan"):
+            table = self._table(TableName, "Scan")
+            index = table.index(IndexName)
+            if (Segment is None) != (TotalSegments is None):
+                raise ExpressionError(
+                    "Segment and TotalSegments must be used together."
+                )
+
+            start_entry = None
+            if ExclusiveStartKey:
+                start_entry = table.start_entry(index, ExclusiveStartKey)
+
+            return self._page(
+                table,
+                index,
+                index.scan(start_entry, Segment, TotalSegments),
+                Limit,
+                FilterExpression,
+                ExpressionAttributeNames,
+                ExpressionAttributeValues,
+                ProjectionExpression,
+                Select,
+                ConsistentRead,
+                ReturnConsumedCapacity,
+            )
+
+    def batch_get_item(
+        self,
+        RequestItems: Dict[str, Dict[str, Any]],
+        ReturnConsumedCapacity: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        with self._backend.lock, _validation("BatchGetItem"):
+            if sum(len(r["Keys"]) for r in RequestItems.values()) > BATCH_GET_MAX_KEYS:
+                raise ExpressionError(
+                    "Too many items requested for the BatchGetItem call."
+                )
+
+            responses: Dict[str, List[Item]] = {}
+            consumed = []
+            for table_name, request in RequestItems.items():
+                table = self._table(table_name, "BatchGetItem")
+                keys = [table.key(key) for key in request["Keys"]]
+                if len(set(keys)) != len(keys):
+                    raise ExpressionError(
+                        "Provided list of item keys contains duplicates."
+                    )
+
+                items = [table.items[key] for key in keys if key in table.items]
+                responses[table_name] = [
+                    _projected(
+                        item,
+                        request.get("ProjectionExpression"),
+                        request.get("ExpressionAttributeNames"),
+                    )
+                    for item in items
+                ]
+                units = sum(
+                    _read_units(_item_size(item), request.get("ConsistentRead", False))
+                    for item in items
+                )
+                consumed.append({"TableName": table_name, "CapacityUnits": units})
+
+            response: Dict[str, Any] = {"Responses": responses, "UnprocessedKeys": {}}
+            if ReturnConsumedCapacity in ("TOTAL", "INDEXES"):
+                response["ConsumedCapacity"] = consumed
+            return _response(**response)
+
+    def batch_write_item(
+        self,
+        RequestItems: Dict[str, List[Dict[str, Any]]],
+        ReturnConsumedCapacity: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        with self._backend.lock, _validation("BatchWriteItem"):
+            requests = [
+                (table_name, request)
+                for table_name, table_requests in RequestItems.items()
+                for request in table_requests
+            ]
+            if len(requests) > BATCH_WRITE_MAX_ITEMS:
+                raise ExpressionError(
+                    f"Too many items in the BatchWriteItem request, the limit is "
+                    f"{BATCH_WRITE_MAX_ITEMS}."
+                )
+
+            writes = []
+            for table_name, request in requests:
+                if "PutRequest" in request:
+                    params = {"TableName": table_name, **request["PutRequest"]}
+                    writes.append(self._plan("Put", params, "BatchWriteItem"))
+                else:
+                    params = {"TableName": table_name, **request["DeleteRequest"]}
+                    writes.append(self._plan("Delete", params, "BatchWriteItem"))
+            _check_unique(writes, "Provided list of item keys contains duplicates.")
+
+            consumed: Dict[str, float] = {}
+            for write in writes:
+                write.apply()
+                consumed[write.table.name] = (
+                    consumed.get(write.table.name, 0) + write.units()
+                )
+
+            response: Dict[str, Any] = {"UnprocessedItems": {}}
+            if ReturnConsumedCapacity in ("TOTAL", "INDEXES"):
+                response["ConsumedCapacity"] = [
+                    {"TableName": name, "CapacityUnits": units}
+                    for name, units in consumed.items()
+                ]
+            return _response(**response)
+
+    def transact_get_items(
+        self,
+        TransactItems: List[Dict[str, Any]],
+        ReturnConsumedCapacity: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        with self._backend.lock, _validation("TransactGetItems"):
+            if len(TransactItems) > TRANSACTION_MAX_ITEMS:
+                raise ExpressionError(
+                    f"Member must have length less than or equal to "
+                    f"{TRANSACTION_MAX_ITEMS}."
+                )
+
+            responses = []
+            for request in TransactItems:
+                get = request["Get"]
+                table = self._table(get["TableName"], "TransactGetItems")
+                item = table.items.get(table.key(get["Key"]))
+                if item is None:
+                    responses.append({})
+                    continue
+                responses.append(
+                    {
+                        "Item": _projected(
+                            item,
+                            get.get("ProjectionExpression"),
+                            get.get("ExpressionAttributeNames"),
+                        )
+                    }
+                )
+            return _response(Responses=responses)
+
+    def transact_write_items(
+        self,
+        TransactItems: List[Dict[str, Any]],
+        ClientRequestToken: Optional[str] = None,
+        ReturnConsumedCapacity: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        with self._backend.lock, _validation("TransactWriteItems"):
+            if len(TransactItems) > TRANSACTION_MAX_ITEMS:
+                raise ExpressionError(
+                    f"Member must have length less than or equal to "
+                    f"{TRANSACTION_MAX_ITEMS}."
+                )
+
+            writes = [
+                self._plan(kind, request, "TransactWriteItems")
+                for transact_item in TransactItems
+                for kind, request in transact_item.items()
+            ]
+            _check_unique(
+                writes,
+                "Transaction request cannot include multiple operations on one item.",
+            )
+
+            if not all(write.passed for write in writes):
+                reasons = [
+                    (
+                        {"Code": "None"}
+                        if write.passed
+                        else {
+                            "Code": "ConditionalCheckFailed",
+                            "Message": "The conditional request failed",
+                        }
+                    )
+                    for write in writes
+                ]
+                codes = ", ".join(reason["Code"] for reason in reasons)
+                raise _error(
+                    "TransactionCanceledException",
+                    f"Transaction cancelled, please refer cancellation reasons "
+                    f"for specific reasons [{codes}]",
+                    "TransactWriteItems",
+                    CancellationReasons=reasons,
+                )
+
+            # every write was planned before any is applied, so all or none are.
+            for write in writes:
+                write.apply()
+            return _response()
+
+    # private api starts here.
+
+    def _table(self, table_name: str, operation: str) -> "_MemoryTable":
+        try:
+            return self._backend.tables[table_name]
+        except KeyError:
+            raise _error(
+                "ResourceNotFoundException",
+                "Requested resource not found",
+                operation,
+            )
+
+    def _plan(self, kind: str, request: Dict[str, Any], operation: str) -> "_Write":
+        """Work out what a write changes, without changing anything yet."""
+        table = self._table(request["TableName"], operation)
+        if kind == "Put":
+            new = {name: copy_value(value) for name, value in request["Item"].items()}
+            key = table.key({name: new.get(name) for name in table.key_names})
+        else:
+            key = table.key(request["Key"])
+        old = table.items.get(key)
+
+        passed = True
+        if request.get("ConditionExpression"):
+            condition = parse_condition(
+                request["ConditionExpression"],
+                request.get("ExpressionAttributeNames"),
+                request.get("ExpressionAttributeValues"),
+            )
+            passed = evaluate(condition, old or {})
+
+        write = _Write(kind, table, key, old, passed)
+        if not passed:
+            return write
+
+        if kind == "Put":
+            table.validate(new)
+            write.new = new
+        elif kind == "Update":
+            actions = []
+            if request.get("UpdateExpression"):
+                actions = parse_update(
+                    request["UpdateExpression"],
+                    request.get("ExpressionAttributeNames"),
+                    request.get("ExpressionAttributeValues"),
+                )
+            for _, path, _ in actions:
+                if path[0] in table.key_names:
+                    raise ExpressionError(
+                        f"Cannot update attribute {path[0]}. This attribute is "
+                        f"part of the key"
+                    )
+
+            base = old if old is not None else dict(request["Key"])
+            write.new, write.changed = apply_update(base, actions)
+            table.validate(write.new)
+        elif kind == "ConditionCheck":
+            write.new = old
+        return write
+
+    def _single_write(
+        self, kind: str, operation: str, params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        params = {name: value for name, value in params.items() if name != "self"}
+        with self._backend.lock, _validation(operation):
+            write = self._plan(kind, params, operation)
+            if not write.passed:
+                raise _error(
+                    "ConditionalCheckFailedException",
+                    "The conditional request failed",
+                    operation,
+                )
+            write.apply()
+
+            response = _capacity(
+                write.table.name, write.units(), params["ReturnConsumedCapacity"]
+            )
+            attributes = write.returned(params["ReturnValues"])
+            if attributes:
+                response["Attributes"] = attributes
+            return _response(**response)
+
+    def _page(
+        self,
+        table: "_MemoryTable",
+        index: "_Index",
+        primary_keys: Iterable[PrimaryKey],
+        limit: Optional[int],
+        filter_expression: Optional[str],
+        names: Optional[Dict[str, str]],
+        values: Optional[Item],
+        projection_expression: Optional[str],
+        select: Optional[str],
+        consistent_read: bool,
+        return_consumed_capacity: Optional[str],
+    ) -> Dict[str, Any]:
+        """Read a page of a query or scan, `primary_keys` are in the order to read."""
+        if limit is not None and limit < 1:
+            raise ExpressionError("Limit must be greater than or equal to 1.")
+
+        condition = (
+            parse_condition(filter_expression, names, values)
+            if filter_expression
+            else None
+        )
+        paths = (
+            parse_projection(projection_expression, names)
+            if projection_expression
+            else None
+        )
+
+        items = []
+        scanned = size = 0
+        last_item = None
+        primary_keys = iter(primary_keys)
+        for primary_key in primary_keys:
+            item = table.items[primary_key]
+            scanned += 1
+            size += _item_size(item)
+            if condition is None or evaluate(condition, item):
+                items.append(item)
+
+            # like dynamodb, a page ends after `Limit` items or 1 MB are read.
+            if scanned == limit or size >= PAGE_MAX_BYTES:
+                # only end the page early if there are more items to read.
+                if next(primary_keys, None) is not None:
+                    last_item = item
+                break
+
+        response = _capacity(
+            table.name, _read_units(size, consistent_read), return_consumed_capacity
+        )
+        response["Count"] = len(items)
+        response["ScannedCount"] = scanned
+        if select != "COUNT":
+            response["Items"] = [
+                _copy_item(project(item, paths) if paths else item) for item in items
+            ]
+        if last_item is not None:
+            response["LastEvaluatedKey"] = {
+                name: copy_value(last_item[name])
+                for name in dict.fromkeys([*table.key_names, *index.key_names])
+            }
+        return _response(**response)
+
+
+class AsyncMemoryClient:
+    """The asyncio version of `MemoryClient`, with the api of `aiobotocore`.
+
+    Args:
+        client: The client to run the requests with.
+    """
+
+    def __init__(self, client: MemoryClient):
+        self._client = client
+        self.exceptions = client.exceptions
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self._client, name)
+
+        async def call(**kwargs: Any) -> Dict[str, Any]:
+            return method(**kwargs)
+
+        return call
+
+
+class MemoryResource:
+    """The in-memory version of the boto3 dynamodb resource, with python values.
+
+    Args:
+        client: The client to run the requests with.
+    """
+
+    def __init__(self, client: MemoryClient):
+        self._client = client
+
+    def Table(self, name: str) -> "MemoryTableResource":
+        return MemoryTableResource(self._client, name)
+
+    def batch_get_item(self, RequestItems: Dict[str, Any], **kwargs: Any):
+        request = {
+            table_name: {**r, "Keys": [to_dynamodb(key) for key in r["Keys"]]}
+            for table_name, r in RequestItems.items()
+        }
+        response = self._client.batch_get_item(RequestItems=request, **kwargs)
+        response["Responses"] = {
+            table_name: [from_dynamodb(item) for item in items]
+            for table_name, items in response["Responses"].items()
+        }
+        return response
+
+    def batch_write_item(self, RequestItems: Dict[str, Any], **kwargs: Any):
+        request = {
+            table_name: [
+                (
+                    {"PutRequest": {"Item": to_dynamodb(r["PutRequest"]["Item"])}}
+                    if "PutRequest" in r
+                    else {
+                        "DeleteRequest": {"Key": to_dynamodb(r["DeleteRequest"]["Key"])}
+                    }
+                )
+                for r in requests
+            ]
+            for table_name, requests in RequestItems.items()
+        }
+        return self._client.batch_write_item(RequestItems=request, **kwargs)
+
+
+class MemoryTableResource:
+    """The in-memory version of the boto3 `Table` resource, with python values.
+
+    Args:
+        client: The client to run the requests with.
+        name: The name of the table.
+    """
+
+    def __init__(self, client: MemoryClient, name: str):
+        self._client = client
+        self.name = name
+
+    def get_item(self, **kwargs: Any) -> Dict[str, Any]:
+        return self._call(self._client.get_item, kwargs)
+
+    def put_item(self, **kwargs: Any) -> Dict[str, Any]:
+        return self._call(self._client.put_item, kwargs)
+
+    def update_item(self, **kwargs: Any) -> Dict[str, Any]:
+        return self._call(self._client.update_item, kwargs)
+
+    def delete_item(self, **kwargs: Any) -> Dict[str, Any]:
+        return self._call(self._client.delete_item, kwargs)
+
+    def query(self, **kwargs: Any) -> Dict[str, Any]:
+        return self._call(self._client.query, kwargs)
+
+    def scan(self, **kwargs: Any) -> Dict[str, Any]:
+        return self._call(self._client.scan, kwargs)
+
+    # private api starts here.
+
+    def _call(self, method, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        for name in ("Key", "Item", "ExpressionAttributeValues", "ExclusiveStartKey"):
+            if kwargs.get(name) is not None:
+                kwargs[name] = to_dynamodb(kwargs[name])
+
+        response = method(TableName=self.name, **kwargs)
+        for name in ("Item", "Attributes", "LastEvaluatedKey"):
+            if name in response:
+                response[name] = from_dynamodb(response[name])
+        if "Items" in response:
+            response["Items"] = [from_dynamodb(item) for item in response["Items"]]
+        return response
+
+
+class _Top:
+    """Sorts after every primary key, to find the end of a run of equal sort keys."""
+
+    def __lt__(self, other: Any) -> bool:
+        return False
+
+    def __gt__(self, other: Any) -> bool:
+        return True
+
+
+_TOP = _Top()
+
+
+class _Index:
+    """The items of a table or index, as a sorted list for each partition.
+
+    Each entry of a partition is `((sort key,), primary key)`, so items with the
+    same sort key in a secondary index are ordered by their primary key.
+    """
+
+    def __init__(self, hash_key: str, sort_key: Optional[str], key_types: Dict):
+        self.hash_key = hash_key
+        self.sort_key = sort_key
+        self.key_names = [hash_key, sort_key] if sort_key else [hash_key]
+        self._key_types = key_types
+        self.partitions: Dict[Tuple[str, Any], List[Tuple[Tuple, PrimaryKey]]] = {}
+
+    def entry(
+        self, item: Item, primary_key: PrimaryKey
+    ) -> Optional[Tuple[Tuple[str, Any], Tuple[Tuple, PrimaryKey]]]:
+        """Get the partition and entry of an item, None if it isn't indexed."""
+        hash_value = scalar(item.get(self.hash_key))
+        if hash_value is None:
+            return None
+        if self.sort_key is None:
+            return hash_value, ((), primary_key)
+
+        sort_value = scalar(item.get(self.sort_key))
+        if sort_value is None:
+            return None
+        return hash_value, ((sort_value,), primary_key)
+
+    def add(self, item: Item, primary_key: PrimaryKey) -> None:
+        found = self.entry(item, primary_key)
+        if found is not None:
+            hash_value, entry = found
+            bisect.insort(self.partitions.setdefault(hash_value, []), entry)
+
+    def remove(self, item: Item, primary_key: PrimaryKey) -> None:
+        found = self.entry(item, primary_key)
+        if found is None:
+            return
+
+        hash_value, entry = found
+        partition = self.partitions[hash_value]
+        del partition[bisect.bisect_left(partition, entry)]
+        if not partition:
+            del self.partitions[hash_value]
+
+    def key_condition(self, condition: Node) -> Tuple[Tuple[str, Any], Optional[Node]]:
+        """Split a key condition into the hash key value and the sort key condition."""
+        hash_value = None
+        sort_condition = None
+        for part in key_conditions(condition):
+            name = _key_attribute(part)
+            if (
+                part[0] == "compare"
+                and part[1] == "="
+                and name == self.hash_key
+                and part[3][0] == "value"
+            ):
+                hash_value = self._typed(self.hash_key, part[3][1])
+            elif self.sort_key and name == self.sort_key and sort_condition is None:
+                sort_condition = part
+            else:
+                raise ExpressionError("Query key condition not supported.")
+
+        if hash_value is None:
+            raise ExpressionError("Query condition missed key schema element.")
+        return hash_value, sort_condition
+
+    def sort_range(
+        self, partition: List[Tuple[Tuple, PrimaryKey]], condition: Optional[Node]
+    ) -> Tuple[int, int]:
+        """Find the slice of a partition whose sort keys match the condition."""
+        if condition is None:
+            return 0, len(partition)
+
+        def values(*nodes: Node) -> List[Tuple[str, Any]]:
+            if any(node[0] != "value" for node in nodes):
+                raise ExpressionError("Query key condition not supported.")
+            return [self._typed(self.sort_key, node[1]) for node in nodes]
+
+        def before(value) -> int:
+            return bisect.bisect_left(partition, ((value,),))
+
+        def after(value) -> int:
+            return bisect.bisect_right(partition, ((value,), _TOP))
+
+        kind = condition[0]
+        if kind == "between":
+            low, high = values(condition[2], condition[3])
+            return before(low), after(high)
+
+        if kind == "function":
+            if condition[1] != "begins_with":
+                raise ExpressionError("Query key condition not supported.")
+            (prefix,) = values(condition[2][1])
+            start = stop = before(prefix)
+            while stop < len(partition) and (
+                partition[stop][0][0][1].startswith(prefix[1])
+            ):
+                stop += 1
+            return start, stop
+
+        (value,) = values(condition[3])
+        operator = condition[1]
+        if operator == "=":
+            return before(value), after(value)
+        if operator == "<":
+            return 0, before(value)
+        if operator == "<=":
+            return 0, after(value)
+        if operator == ">":
+            return after(value), len(partition)
+        if operator == ">=":
+            return before(value), len(partition)
+        raise ExpressionError("Query key condition not supported.")
+
+    def scan(
+        self,
+        start_entry: Optional[Tuple[Tuple[str, Any], Tuple]],
+        segment: Optional[int],
+        total_segments: Optional[int],
+    ) -> Iterator[PrimaryKey]:
+        """Iterate over the primary keys in a scan order that is always the same."""
+        hash_values = sorted(self.partitions)
+        if segment is not None:
+            hash_values = [
+                value
+                for value in hash_values
+                if _segment(value, total_segments) == segment
+            ]
+
+        start = 0
+        if start_entry is not None:
+            start = bisect.bisect_left(hash_values, start_entry[0])
+
+        for hash_value in hash_values[start:]:
+            partition = self.partitions.get(hash_value, [])
+            position = 0
+            if start_entry is not None and hash_value == start_entry[0]:
+                position = bisect.bisect_right(partition, start_entry[1])
+            for _, primary_key in partition[position:]:
+                yield primary_key
+
+    # private api starts here.
+
+    def _typed(self, name: str, value: Dict[str, Any]) -> Tuple[str, Any]:
+        typed = scalar(value)
+        if typed is None or typed[0] != self._key_types.get(name, typed[0]):
+            raise ExpressionError(
+                f"One or more parameter values were invalid: Condition parameter "
+                f"type does not match schema type for {name}."
+            )
+        return typed
+
+
+class _MemoryTable:
+    def __init__(
+        self,
+        name: str,
+        key_schema: List[Dict[str, str]],
+        attribute_definitions: List[Dict[str, str]],
+        indexes: List[Dict[str, Any]],
+    ):
+        self.name = name
+        self.key_schema = key_schema
+        self.attribute_definitions = attribute_definitions
+        self.key_types = {
+            definition["AttributeName"]: definition["AttributeType"]
+            for definition in attribute_definitions
+        }
+
+        self.primary = self._index(key_schema)
+        self.key_names = self.primary.key_names
+        self.indexes = {index["IndexName"]: index for index in indexes}
+        self.secondary = {
+            index["IndexName"]: self._index(index["KeySchema"]) for index in indexes
+        }
+        self.items: Dict[PrimaryKey, Item] = {}
+
+    def index(self, name: Optional[str]) -> _Index:
+        if name is None:
+            return self.primary
+        try:
+            return self.secondary[name]
+        except KeyError:
+            raise ExpressionError(
+                f"The table does not have the specified index: {name}"
+            )
+
+    def key(self, key: Item) -> PrimaryKey:
+        """Get the primary key of an item from its key attributes."""
+        if set(key) != set(self.key_names):
+            raise ExpressionError("The provided key element does not match the schema")
+        return tuple(self._key_value(name, key[name]) for name in self.key_names)
+
+    def start_entry(
+        self, index: _Index, exclusive_start_key: Item
+    ) -> Tuple[Tuple[str, Any], Tuple[Tuple, PrimaryKey]]:
+        """Find where in an index a query or scan carries on from."""
+        primary_key = self.key(
+            {name: exclusive_start_key.get(name) for name in self.key_names}
+        )
+        entry = index.entry(exclusive_start_key, primary_key)
+        if entry is None:
+            raise ExpressionError("The provided starting key is invalid.")
+        return entry
+
+    def validate(self, item: Item) -> None:
+        """Check the key attributes of every index have the right types."""
+        for name, key_type in self.key_types.items():
+            value = item.get(name)
+            if value is None:
+                continue
+            if key_type not in value or value[key_type] in ("", b""):
+                raise ExpressionError(
+                    f"One or more parameter values were invalid: Type mismatch "
+                    f"for Index Key {name} Expected: {key_type}"
+                )
+
+    def put(self, primary_key: PrimaryKey, item: Item) -> None:
+        old = self.items.get(primary_key)
+        for index in (self.primary, *self.secondary.values()):
+            if old is not None:
+                index.remove(old, primary_key)
+            index.add(item, primary_key)
+        self.items[primary_key] = item
+
+    def delete(self, primary_key: PrimaryKey) -> None:
+        old = self.items.pop(primary_key, None)
+        if old is not None:
+            for index in (self.primary, *self.secondary.values()):
+                index.remove(old, primary_key)
+
+    def describe(self) -> Dict[str, Any]:
+        description = {
+            "TableName": self.name,
+            "TableStatus": "ACTIVE",
+            "KeySchema": self.key_schema,
+            "AttributeDefinitions": self.attribute_definitions,
+            "ItemCount": len(self.items),
+        }
+        if self.indexes:
+            description["GlobalSecondaryIndexes"] = list(self.indexes.values())
+        return description
+
+    # private api starts here.
+
+    def _index(self, key_schema: List[Dict[str, str]]) -> _Index:
+        names = {key["KeyType"]: key["AttributeName"] for key in key_schema}
+        return _Index(names["HASH"], names.get("RANGE"), self.key_types)
+
+    def _key_value(self, name: str, value: Optional[Dict[str, Any]]) -> Tuple:
+        typed = scalar(value)
+        if typed is None or typed[0] != self.key_types[name]:
+            raise ExpressionError("The provided key element does not match the schema")
+        return typed
+
+
+class _Write:
+    """One write of a request, planned before it is applied."""
+
+    def __init__(
+        self,
+        kind: str,
+        table: _MemoryTable,
+        key: PrimaryKey,
+        old: Optional[Item],
+        passed: bool,
+    ):
+        self.kind = kind
+        self.table = table
+        self.key = key
+        self.old = old
+        self.passed = passed
+        self.new: Optional[Item] = None
+        self.changed: Set[str] = set()
+
+    def apply(self) -> None:
+        if self.kind == "ConditionCheck":
+            return
+        if self.new is None:
+            self.table.delete(self.key)
+        else:
+            self.table.put(self.key, self.new)
+
+    def units(self) -> float:
+        sizes = [_item_size(item) for item in (self.old, self.new) if item]
+        return float(max(1, math.ceil(max(sizes, default=0) / 1024)))
+
+    def returned(self, return_values: str) -> Optional[Item]:
+        """Get the attributes asked for by `ReturnValues`."""
+        item = {
+            "ALL_OLD": self.old,
+            "UPDATED_OLD": self.old,
+            "ALL_NEW": self.new,
+            "UPDATED_NEW": self.new,
+        }.get(return_values)
+        if not item:
+            return None
+        if return_values.startswith("UPDATED"):
+            return {
+                name: copy_value(value)
+                for name, value in item.items()
+                if name in self.changed
+            }
+        return _copy_item(item)
+
+
+class _Exceptions:
+    """Mirrors `client.exceptions`, every error is a subclass of `ClientError`."""
+
+    def __init__(self):
+        self._classes: Dict[str, type] = {}
+
+    def __getattr__(self, code: str) -> type:
+        if code.startswith("_"):
+            raise AttributeError(code)
+        return self._classes.setdefault(code, type(code, (ClientError,), {}))
+
+
+_EXCEPTIONS = _Exceptions()
+
+
+def _error(code: str, message: str, operation: str, **extra: Any) -> ClientError:
+    response = {
+        "Error": {"Code": code, "Message": message},
+        "ResponseMetadata": {"HTTPStatusCode": 400, "RetryAttempts": 0},
+        **extra,
+    }
+    return getattr(_EXCEPTIONS, code)(response, operation)
+
+
+@contextmanager
+def _validation(operation: str) -> Iterator[None]:
+    """Raise invalid requests as a `ValidationException`, like dynamodb."""
+    try:
+        yield
+    except ExpressionError as error:
+        raise _error("ValidationException", str(error), operation) from None
+
+
+def _key_attribute(condition: Node) -> Optional[str]:
+    """Get the name of the attribute a part of a key condition is on."""
+    kind = condition[0]
+    if kind == "compare":
+        target = condition[2]
+    elif kind == "between":
+        target = condition[1]
+    elif kind == "function":
+        target = condition[2][0]
+    else:
+        return None
+
+    if target[0] != "path" or len(target[1]) != 1:
+        return None
+    return target[1][0]
+
+
+def _check_unique(writes: List[_Write], message: str) -> None:
+    if len(set((id(write.table), write.key) for write in writes)) != len(writes):
+        raise ExpressionError(message)
+
+
+def _segment(hash_value: Tuple[str, Any], total_segments: int) -> int:
+    value_type, raw = hash_value
+    if value_type == "N":
+        raw = format_number(raw)
+    return zlib.crc32(f"{value_type}:{raw!r}".encode()) % total_segments
+
+
+def _response(**fields: Any) -> Dict[str, Any]:
+    return {**fields, "ResponseMetadata": {"HTTPStatusCode": 200, "RetryAttempts": 0}}
+
+
+def _capacity(table_name: str, units: float, requested: Optional[str]) -> Dict:
+    if requested not in ("TOTAL", "INDEXES"):
+        return {}
+    return {"ConsumedCapacity": {"TableName": table_name, "CapacityUnits": units}}
+
+
+def _read_units(size: int, consistent_read: bool) -> float:
+    units = max(1, math.ceil(size / 4096))
+    return float(units) if consistent_read else units / 2
+
+
+def _item_size(item: Item) -> int:
+    return sum(len(name.encode()) + _value_size(value) for name, value in item.items())
+
+
+def _value_size(value: Dict[str, Any]) -> int:
+    ((value_type, raw),) = value.items()
+    if value_type == "S":
+        return len(raw.encode())
+    if value_type == "N":
+        return len(raw) // 2 + 1
+    if value_type == "B":
+        return len(raw)
+    if value_type in ("SS", "BS"):
+        return sum(len(v.encode() if isinstance(v, str) else v) for v in raw)
+    if value_type == "NS":
+        return sum(len(v) // 2 + 1 for v in raw)
+    if value_type == "L":
+        return 3 + sum(1 + _value_size(v) for v in raw)
+    if value_type == "M":
+        return 3 + sum(1 + len(k.encode()) + _value_size(v) for k, v in raw.items())
+    return 1
+
+
+def _copy_item(item: Item) -> Item:
+    return {name: copy_value(value) for name, value in item.items()}
+
+
+def _projected(
+    item: Item, projection_expression: Optional[str], names: Optional[Dict[str, str]]
+) -> Item:
+    if projection_expression:
+        item = project(item, parse_projection(projection_expression, names))
+    return _copy_item(item)
@@ -0,0 +1,98 @@
+"""Holds the metadata of a model, which is computed once when the class is defined."""
+
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Tuple
+
+from dynamodb_monotable.attributes import Attribute
+from dynamodb_monotable.resolvers import TemplatePlan
+from dynamodb_monotable.core.sharding import ShardSpec
+
+
+class ModelMeta:
+    """Describes the attributes of a model.
+
+    Attributes:
+        attributes: The attributes of the model, in the order they were defined.
+        attribute_names: The names of the attributes, in the same order.
+        attributes_by_name: The attributes keyed by their name.
+        required: The names of the attributes that must be provided on create.
+        defaults: The default values keyed by the attribute name.
+        template_plan: Resolves the attributes with a template value.
+        templates: The names of the attributes with a template value, in the
+            order they are resolved in.
+        shards: The sharded attributes keyed by their name.
+
+    Raises:
+        ValueError: If the templates depend on each other in a cycle, or an
+            attribute can't be sharded.
+    """
+
+    def __init__(self, attributes: Tuple[Attribute, ...]):
+        self.attributes = attributes
+        self.attribute_names: Tuple[str, ...] = tuple(a.name for a in attributes)
+        self.attributes_by_name: Mapping[str, Attribute] = MappingProxyType(
+            {a.name: a for a in attributes}
+        )
+        self.names: FrozenSet[str] = frozenset(self.attribute_names)
+        self.required: FrozenSet[str] = frozenset(
+            a.name for a in attributes if a.required
+        )
+        self.defaults: Mapping[str, Any] = MappingProxyType(
+            {a.name: a.default for a in attributes if a.value is None}
+        )
+        self.template_plan = TemplatePlan(self.attributes_by_name)
+        self.templates: Tuple[str, ...] = self.template_plan.names
+        self.shards: Mapping[str, ShardSpec] = MappingProxyType(
+            {a.name: self._shard_spec(a) for a in attributes if a.shards}
+        )
+
+    def index_keys(
+        self, indexes: Dict[str, Any]
+    ) -> Mapping[str, Tuple[Optional[Attribute], Optional[Attribute]]]:
+        """Find the hash and sort key attributes of the model for every index.
+
+        The indexes are defined on the table rather than the model, so this is
+        computed once per table the model is used with.
+        """
+        index_keys = {}
+        for index_name, index in indexes.items():
+            hash_key = index.hash_key.name if index.hash_key else None
+            sort_key = index.sort_key.name if index.sort_key else None
+            index_keys[index_name] = (
+                self.attributes_by_name.get(hash_key),
+                self.attributes_by_name.get(sort_key),
+            )
+        return MappingProxyType(index_keys)
+
+    @classmethod
+    def from_class(cls, model_class: type) -> "ModelMeta":
+        """Find the attributes defined on a model class and its bases."""
+        attributes = {}
+        for klass in reversed(model_class.__mro__):
+            for name, value in vars(klass).items():
+                if isinstance(value, Attribute):
+                    # the attribute is stored in the table under its field name.
+                    value.name = name
+                    attributes[name] = value
+
+        return cls(tuple(attributes.values()))
+
+    # private api starts here.
+
+    def _shard_spec(self, attribute: Attribute) -> ShardSpec:
+        if attribute.dynamodb_type != "S":
+            raise ValueError(f"Only string attributes can be sharded: {attribute.name}")
+
+        # by default items are sharded by the values in the other templates,
+        # which are the values that tell the items in a partition apart.
+        fields = attribute.shard_by
+        if fields is None:
+            placeholders = {
+                placeholder
+                for step in self.template_plan.steps
+                if step.name != attribute.name
+                for placeholder in step.placeholders
+            }
+            fields = tuple(sorted(placeholders - set(self.templates)))
+
+        return ShardSpec(attribute.name, attribute.shards, fields)
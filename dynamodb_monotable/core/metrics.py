@@ -0,0 +1,366 @@
+"""Holds the hooks that record metrics about every request made to a table."""
+
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager, nullcontext
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+try:
+    from opentelemetry import trace
+except ImportError:  # pragma: no cover
+    trace = None
+
+PHASES = ("serialize", "network", "deserialize")
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class OperationRecord:
+    """The metrics of one operation, such as a `get_item` or a page of a query.
+
+    Attributes:
+        operation: The name of the operation.
+        table_name: The name of the table.
+        model: The name of the model class, if the operation has one.
+        index: The name of the index, `primary` for the table itself.
+        start_time_ns: When the operation started, in nanoseconds since the epoch.
+        duration: The number of seconds the operation took.
+        phases: The number of seconds spent in each of `PHASES`.
+        consumed_capacity: The RCU or WCU reported by dynamodb.
+        items: The number of items read or written.
+        bytes: The estimated size of the items read or written.
+        retries: The number of times botocore retried the request, and the
+            number of times unprocessed items of a batch were sent again.
+        error: The name of the exception the operation raised, if any.
+    """
+
+    def __init__(
+        self,
+        operation: str,
+        table_name: str,
+        model: Optional[str] = None,
+        index: Optional[str] = None,
+    ):
+        self.operation = operation
+        self.table_name = table_name
+        self.model = model
+        self.index = index or "primary"
+        self.start_time_ns = time.time_ns()
+        self.duration = 0.0
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.consumed_capacity = 0.0
+        self.items = 0
+        self.bytes = 0
+        self.retries = 0
+        self.error: Optional[str] = None
+        # the requests of a batch can be sent from many threads.
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a phase of the operation, phases that run more than once add up."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start
+
+    def response(self, response: Dict[str, Any]) -> None:
+        """Record the consumed capacity and retries reported in a response."""
+        consumed = response.get("ConsumedCapacity")
+        if isinstance(consumed, dict):
+            units = consumed.get("CapacityUnits", 0.0)
+        elif isinstance(consumed, list):
+            units = sum(c.get("CapacityUnits", 0.0) for c in consumed)
+        else:
+            units = 0.0
+
+        retries = response.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        with self._lock:
+            self.consumed_capacity += units
+            self.retries += retries
+
+    def retried(self) -> None:
+        """Record that the unprocessed items of a batch were sent again."""
+        with self._lock:
+            self.retries += 1
+
+    def labels(self) -> Tuple[Tuple[str, str], ...]:
+        return (
+            ("table", self.table_name),
+            ("model", self.model or ""),
+            ("index", self.index),
+            ("operation", self.operation),
+        )
+
+
+class _NullRecord(OperationRecord):
+    """Used when the table doesn't record metrics, so recording costs nothing."""
+
+    phases: Dict[str, float] = {}
+    consumed_capacity = 0.0
+    items = 0
+    bytes = 0
+    retries = 0
+
+    def __init__(self):
+        pass
+
+    def phase(self, name: str) -> ContextManager[None]:
+        return nullcontext()
+
+    def response(self, response: Dict[str, Any]) -> None:
+        pass
+
+    def retried(self) -> None:
+        pass
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        pass
+
+
+NULL_RECORD = _NullRecord()
+NULL_OPERATION = nullcontext(NULL_RECORD)
+
+
+class MetricsSink(ABC):
+    """Receives the record of every operation once it has completed.
+
+    Sinks are called on the thread that made the request, so they have to
+    be quick and thread safe.
+    """
+
+    @abstractmethod
+    def record(self, record: OperationRecord) -> None:
+        raise NotImplementedError()
+
+
+class CallbackSink(MetricsSink):
+    """Calls `callback` with the record of every operation."""
+
+    def __init__(self, callback: Callable[[OperationRecord], None]):
+        self.callback = callback
+
+    def record(self, record: OperationRecord) -> None:
+        self.callback(record)
+
+
+class _Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry(MetricsSink):
+    """Aggregates the records in memory, like a Prometheus client registry.
+
+    Every metric is labelled with the table, model, index and operation.
+    Latencies are histograms with a `phase` label, which is `total` for the
+    whole operation. Use `render` to expose them in the Prometheus text format.
+
+    Args:
+        buckets: The upper bounds of the latency histogram buckets, in seconds.
+    """
+
+    COUNTERS = (
+        "operations",
+        "errors",
+        "consumed_capacity",
+        "items",
+        "bytes",
+        "retries",
+    )
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Tuple, float]] = {
+            name: {} for name in self.COUNTERS
+        }
+        self._histograms: Dict[Tuple, _Histogram] = {}
+
+    def record(self, record: OperationRecord) -> None:
+        labels = record.labels()
+        values = {
+            "operations": 1,
+            "errors": 1 if record.error else 0,
+            "consumed_capacity": record.consumed_capacity,
+            "items": record.items,
+            "bytes": record.bytes,
+            "retries": record.retries,
+        }
+        # only the phases the operation went through are observed.
+        latencies = {"total": record.duration}
+        latencies.update((phase, s) for phase, s in record.phases.items() if s)
+
+        with self._lock:
+            for name, value in values.items():
+                counter = self._counters[name]
+                counter[labels] = counter.get(labels, 0) + value
+
+            for phase, seconds in latencies.items():
+                histogram = self._histograms.get((*labels, ("phase", phase)))
+                if histogram is None:
+                    histogram = _Histogram(self.buckets)
+                    self._histograms[(*labels, ("phase", phase))] = histogram
+                histogram.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+                histogram.sum += seconds
+                histogram.count += 1
+
+    def counter(self, name: str, **labels: str) -> float:
+        """Get the total of a counter across every series that matches the labels."""
+        with self._lock:
+            return sum(
+                value
+                for series, value in self._counters[name].items()
+                if labels.items() <= dict(series).items()
+            )
+
+    def latency_count(self, **labels: str) -> int:
+        """Get the number of latencies recorded for the series that match the labels."""
+        labels.setdefault("phase", "total")
+        with self._lock:
+            return sum(
+                histogram.count
+                for series, histogram in self._histograms.items()
+                if labels.items() <= dict(series).items()
+            )
+
+    def render(self, prefix: str = "dynamodb_monotable") -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            for name, series in self._counters.items():
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                for labels, value in series.items():
+                    lines.append(f"{prefix}_{name}_total{_labels(labels)} {value}")
+
+            lines.append(f"# TYPE {prefix}_latency_seconds histogram")
+            for labels, histogram in self._histograms.items():
+                cumulative = 0
+                for bound, count in zip((*self.buckets, "+Inf"), histogram.counts):
+                    cumulative += count
+                    bucket_labels = _labels((*labels, ("le", str(bound))))
+                    lines.append(
+                        f"{prefix}_latency_seconds_bucket{bucket_labels} {cumulative}"
+                    )
+                lines.append(
+                    f"{prefix}_latency_seconds_sum{_labels(labels)} {histogram.sum}"
+                )
+                lines.append(
+                    f"{prefix}_latency_seconds_count{_labels(labels)} {histogram.count}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+class OpenTelemetrySink(MetricsSink):
+    """Records every operation as an OpenTelemetry span.
+
+    Needs the optional `opentelemetry-api` dependency. The spans are created
+    once the operation has completed, with its real start and end time, and
+    the phases are added as span events.
+
+    Args:
+        tracer: The tracer to create the spans with, defaults to the global one.
+    """
+
+    def __init__(self, tracer: Optional[Any] = None):
+        if tracer is None:
+            if trace is None:
+                raise ImportError(
+                    "opentelemetry-api is required for the OpenTelemetry sink, "
+                    "install it with `pip install opentelemetry-api`."
+                )
+            tracer = trace.get_tracer("dynamodb_monotable")
+        self.tracer = tracer
+
+    def record(self, record: OperationRecord) -> None:
+        span = self.tracer.start_span(
+            f"dynamodb.{record.operation}",
+            start_time=record.start_time_ns,
+            attributes={
+                "db.system": "dynamodb",
+                "db.operation": record.operation,
+                "aws.dynamodb.table_names": [record.table_name],
+                "aws.dynamodb.index_name": record.index,
+                "dynamodb_monotable.model": record.model or "",
+                "dynamodb_monotable.consumed_capacity": record.consumed_capacity,
+                "dynamodb_monotable.items": record.items,
+                "dynamodb_monotable.bytes": record.bytes,
+                "dynamodb_monotable.retries": record.retries,
+                **{
+                    f"dynamodb_monotable.{phase}_seconds": seconds
+                    for phase, seconds in record.phases.items()
+                },
+            },
+        )
+        if record.error:
+            span.set_attribute("error.type", record.error)
+        span.end(end_time=record.start_time_ns + int(record.duration * 1e9))
+
+
+class Metrics:
+    """Times operations and hands their records to every sink.
+
+    Args:
+        sinks: The sinks to send the records to.
+    """
+
+    def __init__(self, sinks: Sequence[MetricsSink]):
+        self.sinks = list(sinks)
+
+    @contextmanager
+    def operation(
+        self,
+        operation: str,
+        table_name: str,
+        model: Optional[str] = None,
+        index: Optional[str] = None,
+    ) -> Iterator[OperationRecord]:
+        record = OperationRecord(operation, table_name, model, index)
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as error:
+            record.error = type(error).__name__
+            raise
+        finally:
+            record.duration = time.perf_counter() - start
+            for sink in self.sinks:
+                sink.record(record)
+
+
+def measure(
+    metrics: Optional[Metrics],
+    operation: str,
+    table_name: str,
+    model: Optional[str] = None,
+    index: Optional[str] = None,
+) -> ContextManager[OperationRecord]:
+    """Record the metrics of an operation, if the table has any sinks."""
+    if metrics is None:
+        return NULL_OPERATION
+    return metrics.operation(operation, table_name, model, index)
+
+
+def capacity_args(metrics: Optional[Metrics]) -> Dict[str, str]:
+    # dynamodb only reports the consumed capacity when it is asked for.
+    if metrics is None:
+        return {}
+    return {"ReturnConsumedCapacity": "TOTAL"}
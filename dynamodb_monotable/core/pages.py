@@ -0,0 +1,73 @@
+"""Holds the queue that background threads hand pages of results over on."""
+
+import queue
+import threading
+from typing import Any, Callable, List, Optional
+
+# put on the queue by a producer once it has no more pages.
+DONE = object()
+
+Producer = Callable[[Callable[[Any], bool]], None]
+
+
+class PageQueue:
+    """Runs producers on daemon threads and hands their pages to the consumer.
+
+    A producer is called with a `put` function, which waits for room on the
+    bounded queue and returns False once the queue is closed, after which the
+    producer should return. An error raised by a producer is raised to the
+    consumer instead of the next page.
+
+    Args:
+        producers: The functions that fetch the pages, each runs on a thread.
+        maxsize: The number of pages to hold before the producers wait.
+    """
+
+    def __init__(self, producers: List[Producer], maxsize: int):
+        self._pages: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._stopped = threading.Event()
+        self._running = len(producers)
+
+        self._threads = [
+            threading.Thread(target=self._run, args=(producer,), daemon=True)
+            for producer in producers
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def get(self) -> Optional[Any]:
+        """Wait for the next page, returns None if there are no more pages."""
+        while self._running and not self._stopped.is_set():
+            page = self._pages.get()
+            if page is DONE:
+                self._running -= 1
+                continue
+            if isinstance(page, Exception):
+                self.close()
+                raise page
+            return page
+        return None
+
+    def close(self) -> None:
+        """Stop the producers, used when the consumer stops iterating early."""
+        self._stopped.set()
+
+    # private api starts here.
+
+    def _run(self, producer: Producer) -> None:
+        try:
+            producer(self._put)
+        except Exception as error:
+            self._put(error)
+
+        self._put(DONE)
+
+    def _put(self, page: Any) -> bool:
+        """Put a page on the queue, returns False if we were stopped while waiting."""
+        while not self._stopped.is_set():
+            try:
+                self._pages.put(page, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
@@ -0,0 +1,72 @@
+"""Holds the logic for fetching pages of a query in the background."""
+
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from dynamodb_monotable.core.pages import PageQueue
+from dynamodb_monotable.core.queries import next_page_args
+
+
+class PagePrefetcher:
+    """Fetches the following pages of a query on a background thread.
+
+    At most `depth` pages are waiting on the queue at any time, the worker
+    blocks until the consumer takes one off before fetching the next.
+
+    Args:
+        query: Runs a query, returns the response and its deserialized items.
+        query_args: The arguments of the first query.
+        last_evaluated_key: The `LastEvaluatedKey` of the first page.
+        fetched_count: The number of items in the first page.
+        max_items: The maximum number of items to fetch across all pages.
+        depth: The number of pages to fetch ahead of the consumer.
+    """
+
+    def __init__(
+        self,
+        query: Callable[[Dict[str, Any]], Tuple[Dict[str, Any], Any]],
+        query_args: Dict[str, Any],
+        last_evaluated_key: Dict[str, Any],
+        fetched_count: int,
+        max_items: Optional[int] = None,
+        depth: int = 1,
+    ):
+        if depth < 1:
+            raise ValueError("Prefetch depth must be at least 1.")
+
+        self._query = query
+        self._query_args = query_args
+        self._max_items = max_items
+        self._pages = PageQueue(
+            [partial(self._run, last_evaluated_key, fetched_count)], maxsize=depth
+        )
+
+    def get(self) -> Optional[Tuple[Dict[str, Any], Any]]:
+        """Wait for the next response and its items, returns None if there are no
+        more pages."""
+        return self._pages.get()
+
+    def close(self) -> None:
+        """Stop fetching pages, used when the consumer stops iterating early."""
+        self._pages.close()
+
+    # private api starts here.
+
+    def _run(
+        self,
+        last_evaluated_key: Dict[str, Any],
+        fetched_count: int,
+        put: Callable[[Any], bool],
+    ) -> None:
+        while last_evaluated_key and (
+            self._max_items is None or fetched_count < self._max_items
+        ):
+            args = next_page_args(
+                self._query_args, last_evaluated_key, fetched_count, self._max_items
+            )
+            response, items = self._query(args)
+            fetched_count += response["Count"]
+            last_evaluated_key = response.get("LastEvaluatedKey", {})
+
+            if not put((response, items)):
+                return
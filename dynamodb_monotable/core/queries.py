@@ -1,8 +1,15 @@
 """Holds the core logic for handling queries."""
 
-from typing import Any, Union, Optional, Dict
+import re
+from typing import Any, Union, Optional, Dict, List, Tuple, Hashable
 
-from dynamodb_monotable.attributes import Condition, Attribute
+from dynamodb_monotable.attributes import Attribute
+from dynamodb_monotable.conditions import Condition, ExpressionBuilder, Param
+
+PLACEHOLDER_PATTERN = re.compile(r":[A-Za-z\d_]+")
+
+# the name the hash key value is bound by in a prepared query.
+HASH_KEY_PARAM = "#hash_key_value"
 
 
 def create_key_condition(
@@ -37,29 +44,30 @@ def parse_query_args(
     exclusive_start_key: Optional[dict] = None,
     return_consumed_capacity: Optional[str] = None,
     projection_expression: Optional[str] = None,
+    expression_attribute_names: Optional[Dict[str, str]] = None,
 ) -> Dict[str, Any]:
     """Parse the arguments passed to the query."""
 
+    # the key condition and filter share their placeholders.
+    builder = ExpressionBuilder(names=expression_attribute_names)
     key_condition = create_key_condition(hash_key, hash_key_value, key_condition)
-    filter_expression_values = filter_expression.values if filter_expression else {}
-    filter_expression = filter_expression.expression if filter_expression else None
 
     args = {
         "TableName": table_name,
-        "KeyConditionExpression": key_condition.expression,
-        "ExpressionAttributeValues": {
-            **key_condition.values,
-            **filter_expression_values,
-        },
-        "FilterExpression": filter_expression,
+        "KeyConditionExpression": builder.build(key_condition),
+        "FilterExpression": (
+            builder.build(filter_expression) if filter_expression else None
+        ),
         "Limit": limit,
-        "Index": index,
+        "IndexName": index,
         "Select": select,
         "ConsistentRead": consistent_read,
         "ScanIndexForward": scan_index_forward,
         "ExclusiveStartKey": exclusive_start_key,
         "ReturnConsumedCapacity": return_consumed_capacity,
         "ProjectionExpression": projection_expression,
+        "ExpressionAttributeNames": builder.names or None,
+        "ExpressionAttributeValues": builder.values,
     }
 
     return {
@@ -67,3 +75,114 @@ def parse_query_args(
         for argument, argument_value in args.items()
         if argument_value is not None
     }
+
+
+def prepare_query_args(
+    hash_key: Attribute,
+    table_name: str,
+    key_condition: Optional[Condition] = None,
+    filter_expression: Optional[Condition] = None,
+    **kwargs: Any,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Parse the arguments of a query whose values are bound on every execution.
+
+    The placeholders are numbered in the order they appear in the expressions,
+    so the same query always has the same expressions. The rest of the
+    arguments are the same as `parse_query_args`.
+
+    Returns:
+        The query arguments without `ExpressionAttributeValues`, and the value,
+        or the `Param` to bind, of each placeholder.
+    """
+
+    args = parse_query_args(
+        hash_key=hash_key,
+        hash_key_value=Param(HASH_KEY_PARAM),
+        table_name=table_name,
+        key_condition=key_condition,
+        filter_expression=filter_expression,
+        **kwargs,
+    )
+    return args, args.pop("ExpressionAttributeValues")
+
+
+def bind_query_args(
+    args: Dict[str, Any], placeholders: Dict[str, Any], values: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Create the arguments of one execution of a prepared query.
+
+    Args:
+        args: The arguments returned by `prepare_query_args`.
+        placeholders: The placeholders returned by `prepare_query_args`.
+        values: The value of every `Param`, by name.
+    """
+
+    return {
+        **args,
+        "ExpressionAttributeValues": {
+            placeholder: value.bind(values) if isinstance(value, Param) else value
+            for placeholder, value in placeholders.items()
+        },
+    }
+
+
+def key_projection(key_names: List[str]) -> Tuple[str, Dict[str, str]]:
+    """Create a projection expression that only returns the key attributes.
+
+    Returns:
+        The projection expression and its expression attribute names.
+    """
+
+    names = {f"#key{i}": name for i, name in enumerate(key_names)}
+    return ", ".join(names), names
+
+
+def next_page_args(
+    query_args: Dict[str, Any],
+    last_evaluated_key: Dict[str, Any],
+    fetched_count: int,
+    max_items: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Create the arguments for the query that fetches the next page of results.
+
+    Args:
+        query_args: The arguments of the first query.
+        last_evaluated_key: The `LastEvaluatedKey` of the previous page.
+        fetched_count: The number of items fetched by the previous pages.
+        max_items: The maximum number of items to fetch across all pages.
+    """
+
+    args = {**query_args, "ExclusiveStartKey": last_evaluated_key}
+    if max_items is not None:
+        remaining = max_items - fetched_count
+        args["Limit"] = min(args.get("Limit", remaining), remaining)
+
+    return args
+
+
+def query_fingerprint(args: Dict[str, Any]) -> Hashable:
+    """Create a key that is the same for queries that will return the same items.
+
+    Placeholder names are random, so they are replaced by their position in the
+    expressions, and the values are used in their place.
+    """
+
+    values = args.get("ExpressionAttributeValues", {})
+    placeholders: Dict[str, str] = {}
+
+    def rename(match: re.Match) -> str:
+        return placeholders.setdefault(match.group(0), f":{len(placeholders)}")
+
+    fingerprint = []
+    for argument, argument_value in sorted(args.items()):
+        if argument == "ExpressionAttributeValues":
+            continue
+        if argument in ("KeyConditionExpression", "FilterExpression"):
+            argument_value = PLACEHOLDER_PATTERN.sub(rename, argument_value)
+        fingerprint.append((argument, repr(argument_value)))
+
+    ordered_values = sorted(placeholders.items(), key=lambda item: item[1])
+    fingerprint.append(
+        ("values", tuple(repr(values.get(name)) for name, _ in ordered_values))
+    )
+    return tuple(fingerprint)
@@ -0,0 +1,416 @@
+"""Holds the rate limiters used to keep requests within a throughput."""
+
+import asyncio
+import math
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError, ConnectionError, HTTPClientError
+
+from dynamodb_monotable.core.batch import backoff_delay
+from dynamodb_monotable.core.cache import item_size
+
+READ_OPERATIONS = ("get_item", "query", "scan", "batch_get_item", "transact_get_items")
+WRITE_OPERATIONS = (
+    "put_item",
+    "update_item",
+    "delete_item",
+    "batch_write_item",
+    "transact_write_items",
+)
+THROTTLE_CODES = (
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+)
+TRANSIENT_CODES = ("InternalServerError", "ServiceUnavailable")
+
+# the tokens each operation and index has to wait for, see `RateLimiter`.
+Charges = List[Tuple["AdaptiveTokenBucket", float]]
+
+
+class TokenBucket:
+    """Limits the rate of requests to `rate` tokens a second.
+
+    Tokens build up while the bucket is idle, up to `capacity`, so short
+    bursts are allowed. `acquire` blocks until there are enough tokens.
+
+    Args:
+        rate: The number of tokens added every second, such as the target WCU.
+        capacity: The maximum number of tokens to build up, defaults to `rate`.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("The rate must be greater than 0.")
+
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+
+    @property
+    def tokens(self) -> float:
+        """The tokens available now, negative when more were consumed than held."""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Wait until `tokens` are available and take them."""
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: float = 1.0) -> None:
+        """The asyncio version of `acquire`."""
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def consume(self, tokens: float) -> None:
+        """Take tokens without waiting, such as capacity used beyond an estimate.
+
+        The bucket can go into debt, which later requests wait to pay off.
+        Negative tokens are given back.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - tokens)
+
+    # private api starts here.
+
+    def _take(self, tokens: float) -> float:
+        """Take the tokens if they are available, else return how long to wait."""
+        # a request bigger than the bucket could never be sent otherwise.
+        tokens = min(tokens, self.capacity)
+
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """A token bucket whose rate backs off when requests are throttled.
+
+    The rate is adjusted with AIMD: every throttle multiplies it by
+    `decrease`, down to `min_rate`, and it then grows back by `increase`
+    tokens a second, every second, up to the `rate` it started with.
+
+    Args:
+        rate: The highest rate, such as the provisioned capacity.
+        capacity: The maximum number of tokens to build up, defaults to `rate`.
+        min_rate: The lowest rate, defaults to 5% of `rate`.
+        increase: How fast the rate grows back, defaults to 5% of `rate` a second.
+        decrease: What the rate is multiplied by on every throttle.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        min_rate: Optional[float] = None,
+        increase: Optional[float] = None,
+        decrease: float = 0.5,
+    ):
+        super().__init__(rate, capacity)
+        if not 0 < decrease < 1:
+            raise ValueError("The decrease must be between 0 and 1.")
+
+        self.max_rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate * 0.05
+        self.increase = increase if increase is not None else rate * 0.05
+        self.decrease = decrease
+
+    def throttled(self) -> None:
+        """Slow down after a request was throttled."""
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+
+    # private api starts here.
+
+    def _refill(self) -> None:
+        elapsed = time.monotonic() - self._updated_at
+        super()._refill()
+        self.rate = min(self.max_rate, self.rate + elapsed * self.increase)
+
+
+class RateLimiter:
+    """Keeps the requests of a table within its read and write capacity.
+
+    Every request made by the models of the table waits for tokens from the
+    read or write bucket of the table, or of the index it reads. It is
+    charged an estimate up front and the capacity dynamodb reports is
+    settled once it returns, so a large page leaves the bucket in debt.
+    Throttled requests slow the buckets down, see `AdaptiveTokenBucket`,
+    and are retried with a jittered backoff. The buckets don't know about
+    other clients, so a background job given its own table and limiter
+    backs off when online traffic uses the capacity.
+
+    Pass it to a `Table` as its `rate_limiter`, botocore then no longer
+    retries requests itself.
+
+    Args:
+        read_capacity: The RCU to use each second, or None to not limit reads.
+        write_capacity: The WCU to use each second, or None to not limit writes.
+        indexes: The `(read_capacity, write_capacity)` of each index. Indexes
+            without their own share the buckets of the table.
+        max_attempts: The number of times to send a throttled request.
+        burst: The number of seconds of capacity that can build up.
+    """
+
+    def __init__(
+        self,
+        read_capacity: Optional[float] = None,
+        write_capacity: Optional[float] = None,
+        indexes: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+        max_attempts: int = 8,
+        burst: float = 1.0,
+    ):
+        self.max_attempts = max_attempts
+
+        budgets = {(None, "read"): read_capacity, (None, "write"): write_capacity}
+        for index, (index_read, index_write) in (indexes or {}).items():
+            budgets[(index, "read")] = index_read
+            budgets[(index, "write")] = index_write
+
+        self._buckets = {
+            key: AdaptiveTokenBucket(rate, capacity=rate * burst)
+            for key, rate in budgets.items()
+            if rate
+        }
+
+    def bucket(
+        self, index: Optional[str] = None, kind: str = "read"
+    ) -> Optional[AdaptiveTokenBucket]:
+        """Get the bucket requests of the kind to the index wait on, if any."""
+        if (index, kind) in self._buckets:
+            return self._buckets[(index, kind)]
+        return self._buckets.get((None, kind))
+
+    def wrap(self, client: Any) -> "LimitedClient":
+        """Limit the requests of a client, resource or `Table` resource."""
+        return LimitedClient(client, self)
+
+    def wrap_async(self, client: Any) -> "AsyncLimitedClient":
+        """Limit the requests of an `aiobotocore` client."""
+        return AsyncLimitedClient(client, self)
+
+    def call(self, method, operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Send a request once the buckets allow it, retrying throttles."""
+        params = _with_consumed_capacity(params)
+        charges = self._charges(operation, params)
+
+        attempt = 0
+        while True:
+            for bucket, tokens in charges:
+                bucket.acquire(tokens)
+            try:
+                response = method(**params)
+            except (ClientError, ConnectionError, HTTPClientError) as error:
+                if not self._should_retry(error, attempt, charges):
+                    raise
+                attempt += 1
+                time.sleep(backoff_delay(attempt))
+                continue
+
+            self._settle(operation, params, response, charges)
+            return response
+
+    async def acall(
+        self, method, operation: str, params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """The asyncio version of `call`."""
+        params = _with_consumed_capacity(params)
+        charges = self._charges(operation, params)
+
+        attempt = 0
+        while True:
+            for bucket, tokens in charges:
+                await bucket.aacquire(tokens)
+            try:
+                response = await method(**params)
+            except (ClientError, ConnectionError, HTTPClientError) as error:
+                if not self._should_retry(error, attempt, charges):
+                    raise
+                attempt += 1
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+
+            self._settle(operation, params, response, charges)
+            return response
+
+    # private api starts here.
+
+    def _charges(self, operation: str, params: Dict[str, Any]) -> Charges:
+        """Estimate the capacity a request will use, before it is sent."""
+        kind = "read" if operation in READ_OPERATIONS else "write"
+        bucket = self.bucket(params.get("IndexName"), kind)
+        if bucket is None:
+            return []
+
+        if operation == "get_item":
+            tokens = 1.0 if params.get("ConsistentRead") else 0.5
+        elif operation in ("query", "scan"):
+            # pages vary too much to guess, the rest is settled afterwards.
+            tokens = 0.5
+        elif operation == "batch_get_item":
+            tokens = 0.5 * sum(
+                len(request["Keys"]) for request in params["RequestItems"].values()
+            )
+        elif operation == "put_item":
+            tokens = _write_units(params["Item"])
+        elif operation == "batch_write_item":
+            tokens = sum(
+                (
+                    _write_units(request["PutRequest"]["Item"])
+                    if "PutRequest" in request
+                    else 1.0
+                )
+                for requests in params["RequestItems"].values()
+                for request in requests
+            )
+        elif operation.startswith("transact"):
+            # transactions use twice the capacity of the same requests.
+            tokens = 2.0 * len(params["TransactItems"])
+        else:
+            tokens = 1.0
+        return [(bucket, tokens)]
+
+    def _should_retry(self, error: Exception, attempt: int, charges: Charges) -> bool:
+        code = (
+            error.response.get("Error", {}).get("Code")
+            if isinstance(error, ClientError)
+            else None
+        )
+        throttled = code in THROTTLE_CODES
+        if throttled:
+            for bucket, tokens in charges:
+                # throttled requests don't use any capacity.
+                bucket.consume(-tokens)
+                bucket.throttled()
+
+        retryable = (
+            throttled or code in TRANSIENT_CODES or not isinstance(error, ClientError)
+        )
+        return retryable and attempt + 1 < self.max_attempts
+
+    def _settle(
+        self,
+        operation: str,
+        params: Dict[str, Any],
+        response: Dict[str, Any],
+        charges: Charges,
+    ) -> None:
+        """Charge the buckets the capacity dynamodb reports beyond the estimate."""
+        kind = "read" if operation in READ_OPERATIONS else "write"
+        used: Dict[AdaptiveTokenBucket, float] = {}
+
+        consumed = response.get("ConsumedCapacity") or []
+        for entry in consumed if isinstance(consumed, list) else [consumed]:
+            indexes = {
+                **entry.get("GlobalSecondaryIndexes", {}),
+                **entry.get("LocalSecondaryIndexes", {}),
+            }
+            if "Table" in entry or indexes:
+                units = [(None, entry.get("Table", {}).get("CapacityUnits", 0.0))]
+                units.extend(
+                    (index, capacity["CapacityUnits"])
+                    for index, capacity in indexes.items()
+                )
+            else:
+                units = [(params.get("IndexName"), entry.get("CapacityUnits", 0.0))]
+
+            for index, capacity in units:
+                bucket = self.bucket(index, kind)
+                if bucket is not None:
+                    used[bucket] = used.get(bucket, 0.0) + capacity
+
+        if consumed:
+            for bucket, tokens in charges:
+                used[bucket] = used.get(bucket, 0.0) - tokens
+            for bucket, tokens in used.items():
+                bucket.consume(tokens)
+
+        # dynamodb returns the part of a batch it throttled as unprocessed.
+        if response.get("UnprocessedItems") or response.get("UnprocessedKeys"):
+            for bucket, _ in charges:
+                bucket.throttled()
+
+
+class LimitedClient:
+    """Sends the requests of a client or resource through a `RateLimiter`.
+
+    Args:
+        client: The boto3 client, resource or `Table` resource to wrap.
+        limiter: The limiter to send the requests through.
+    """
+
+    def __init__(self, client: Any, limiter: RateLimiter):
+        self._client = client
+        self._limiter = limiter
+
+    def Table(self, name: str) -> "LimitedClient":
+        return LimitedClient(self._client.Table(name), self._limiter)
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._client, name)
+        if name not in READ_OPERATIONS and name not in WRITE_OPERATIONS:
+            return attribute
+
+        def call(**params: Any) -> Dict[str, Any]:
+            return self._limiter.call(attribute, name, params)
+
+        return call
+
+
+class AsyncLimitedClient:
+    """The asyncio version of `LimitedClient`, for `aiobotocore` clients.
+
+    Args:
+        client: The client to wrap.
+        limiter: The limiter to send the requests through.
+    """
+
+    def __init__(self, client: Any, limiter: RateLimiter):
+        self._client = client
+        self._limiter = limiter
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._client, name)
+        if name not in READ_OPERATIONS and name not in WRITE_OPERATIONS:
+            return attribute
+
+        async def call(**params: Any) -> Dict[str, Any]:
+            return await self._limiter.acall(attribute, name, params)
+
+        return call
+
+
+def _with_consumed_capacity(params: Dict[str, Any]) -> Dict[str, Any]:
+    # the capacity of each index is only reported when it is asked for, a caller
+    # that already asked for it keeps its choice.
+    params = dict(params)
+    params.setdefault("ReturnConsumedCapacity", "INDEXES")
+    return params
+
+
+def _write_units(item: Dict[str, Any]) -> float:
+    return float(max(1, math.ceil(item_size(item) / 1024)))
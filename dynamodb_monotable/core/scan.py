@@ -0,0 +1,219 @@
+"""Holds the logic for scanning the segments of a table in parallel."""
+
+import asyncio
+import queue
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional
+
+from dynamodb_monotable.conditions import Condition, ExpressionBuilder
+from dynamodb_monotable.core.pages import DONE, PageQueue
+
+
+def parse_scan_args(
+    table_name: str,
+    filter_expression: Optional[Condition] = None,
+    limit: Optional[int] = None,
+    index: Optional[str] = None,
+    consistent_read: bool = False,
+    projection_expression: Optional[str] = None,
+    expression_attribute_names: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """Parse the arguments passed to the scan."""
+
+    builder = ExpressionBuilder(names=expression_attribute_names)
+    args = {
+        "TableName": table_name,
+        "FilterExpression": (
+            builder.build(filter_expression) if filter_expression else None
+        ),
+        "ExpressionAttributeValues": builder.values or None,
+        "Limit": limit,
+        "IndexName": index,
+        "ConsistentRead": consistent_read,
+        "ProjectionExpression": projection_expression,
+        "ExpressionAttributeNames": builder.names or None,
+    }
+
+    return {
+        argument: argument_value
+        for argument, argument_value in args.items()
+        if argument_value is not None
+    }
+
+
+def segment_pages(
+    scan: Callable[[Dict[str, Any]], Dict[str, Any]],
+    scan_args: Dict[str, Any],
+    segment: int,
+    total_segments: int,
+    exclusive_start_key: Optional[Dict[str, Any]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Scan every page of one segment, starting after `exclusive_start_key`.
+
+    `scan` sends one scan request with the arguments it is given, such as
+    `Item._scan`, which records its metrics.
+    """
+    args = {**scan_args, "Segment": segment, "TotalSegments": total_segments}
+    if exclusive_start_key:
+        args["ExclusiveStartKey"] = exclusive_start_key
+
+    while True:
+        response = scan(args)
+        yield response
+
+        if not response.get("LastEvaluatedKey"):
+            return
+        args["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+class ParallelScan:
+    """Scans the segments of a table on a pool of worker threads.
+
+    Every worker takes the next segment that hasn't been scanned yet and
+    follows its pages until the segment is done. Pages are put on a bounded
+    queue, so the workers wait for the consumer once `queue_size` pages are
+    waiting. Iterating over the scan returns the raw rows in no particular
+    order.
+
+    Args:
+        scan: Sends one scan request, see `segment_pages`.
+        scan_args: The arguments of the scan, see `parse_scan_args`.
+        segments: The number of segments to split the table into.
+        workers: The number of segments to scan at once, defaults to `segments`.
+        queue_size: The number of pages to hold before the workers wait.
+    """
+
+    def __init__(
+        self,
+        scan: Callable[[Dict[str, Any]], Dict[str, Any]],
+        scan_args: Dict[str, Any],
+        segments: int = 1,
+        workers: Optional[int] = None,
+        queue_size: int = 8,
+    ):
+        if segments < 1:
+            raise ValueError("A scan needs at least 1 segment.")
+
+        self._scan = scan
+        self._scan_args = scan_args
+        self._segments = segments
+
+        self._remaining_segments: queue.Queue = queue.Queue()
+        for segment in range(segments):
+            self._remaining_segments.put(segment)
+
+        workers = max(1, min(workers or segments, segments))
+        self._pages = PageQueue([self._run] * workers, maxsize=queue_size)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for page in self.pages():
+            yield from page.get("Items", ())
+
+    def pages(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over the responses of the scans, rather than their rows."""
+        try:
+            page = self._pages.get()
+            while page is not None:
+                yield page
+                page = self._pages.get()
+        finally:
+            # also runs when the consumer drops the iterator early.
+            self.close()
+
+    def close(self) -> None:
+        """Stop scanning, used when the consumer stops iterating early."""
+        self._pages.close()
+
+    # private api starts here.
+
+    def _run(self, put: Callable[[Dict[str, Any]], bool]) -> None:
+        while True:
+            try:
+                segment = self._remaining_segments.get_nowait()
+            except queue.Empty:
+                return
+
+            pages = segment_pages(self._scan, self._scan_args, segment, self._segments)
+            for page in pages:
+                if not put(page):
+                    return
+
+
+class AsyncParallelScan:
+    """The asyncio version of `ParallelScan`, the workers are tasks.
+
+    The workers are started when iteration starts, and cancelled if the
+    consumer stops iterating early.
+
+    Args:
+        scan: Sends one scan request with the arguments it is given.
+        scan_args: The arguments of the scan, see `parse_scan_args`.
+        segments: The number of segments to split the table into.
+        workers: The number of segments to scan at once, defaults to `segments`.
+        queue_size: The number of pages to hold before the workers wait.
+    """
+
+    def __init__(
+        self,
+        scan: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        scan_args: Dict[str, Any],
+        segments: int = 1,
+        workers: Optional[int] = None,
+        queue_size: int = 8,
+    ):
+        if segments < 1:
+            raise ValueError("A scan needs at least 1 segment.")
+
+        self._scan = scan
+        self._scan_args = scan_args
+        self._segments = segments
+        self._workers = max(1, min(workers or segments, segments))
+        self._queue_size = queue_size
+
+    async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        pages = self.pages()
+        try:
+            async for page in pages:
+                for item in page.get("Items", ()):
+                    yield item
+        finally:
+            # closing the rows has to cancel the workers straight away.
+            await pages.aclose()
+
+    async def pages(self) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate over the responses of the scans, rather than their rows."""
+        pages: asyncio.Queue = asyncio.Queue(maxsize=self._queue_size)
+        remaining_segments = iter(range(self._segments))
+
+        async def run() -> None:
+            try:
+                for segment in remaining_segments:
+                    args = {
+                        **self._scan_args,
+                        "Segment": segment,
+                        "TotalSegments": self._segments,
+                    }
+                    while True:
+                        response = await self._scan(args)
+                        await pages.put(response)
+
+                        if not response.get("LastEvaluatedKey"):
+                            break
+                        args["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+            except Exception as error:
+                await pages.put(error)
+            await pages.put(DONE)
+
+        tasks = [asyncio.ensure_future(run()) for _ in range(self._workers)]
+        try:
+            running = len(tasks)
+            while running:
+                page = await pages.get()
+                if page is DONE:
+                    running -= 1
+                    continue
+                if isinstance(page, Exception):
+                    raise page
+                yield page
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,23 @@
+"""Converts items between the formats used by the dynamodb resource and client.
+
+The resource works with plain python values, where as the low level client,
+which is the only api available with `aiobotocore`, works with typed values
+such as `{"S": "value"}`.
+"""
+
+from typing import Any, Dict
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def to_dynamodb(item: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Convert a resource item into a client item."""
+    return {name: _serializer.serialize(value) for name, value in item.items()}
+
+
+def from_dynamodb(item: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Convert a client item into a resource item."""
+    return {name: _deserializer.deserialize(value) for name, value in item.items()}
@@ -0,0 +1,58 @@
+"""Holds the logic for spreading the items of a hot partition over many shards."""
+
+import zlib
+from typing import Any, List, Mapping, Optional, Tuple
+
+SHARD_SEPARATOR = "#"
+
+
+class ShardSpec:
+    """Spreads the values of a key attribute over `shards` partitions.
+
+    The shard is appended to the value as a `#<shard>` suffix. It is a hash of
+    the `fields` of the item, so an item is always written to the same shard
+    and can be found again from those fields.
+
+    Args:
+        name: The name of the sharded attribute.
+        shards: The number of shards.
+        fields: The names of the attributes the shard is derived from.
+    """
+
+    def __init__(self, name: str, shards: int, fields: Tuple[str, ...]):
+        if not isinstance(shards, int) or shards < 1:
+            raise ValueError(f"The shards of {name} must be a positive integer.")
+        if not fields:
+            raise ValueError(f"{name} needs shard_by to know what to shard on.")
+
+        self.name = name
+        self.shards = shards
+        self.fields = fields
+
+    def shard(self, values: Mapping[str, Any]) -> Optional[int]:
+        """Find the shard of an item, or None if a field it depends on is missing."""
+        if any(values.get(field) is None for field in self.fields):
+            return None
+
+        # crc32 rather than hash(), which is randomised for every process.
+        data = "\x1f".join(str(values[field]) for field in self.fields)
+        return zlib.crc32(data.encode()) % self.shards
+
+    def apply(self, value: str, values: Mapping[str, Any]) -> str:
+        """Add the shard of the item to the value."""
+        shard = self.shard(values)
+        if shard is None:
+            missing = [field for field in self.fields if values.get(field) is None]
+            raise ValueError(
+                f"{', '.join(missing)} must be provided to find the shard of "
+                f"{self.name}."
+            )
+        return f"{value}{SHARD_SEPARATOR}{shard}"
+
+    def all_values(self, value: str) -> List[str]:
+        """Get the value of every shard, to fan a query out over them."""
+        return [f"{value}{SHARD_SEPARATOR}{shard}" for shard in range(self.shards)]
+
+    def strip(self, value: str) -> str:
+        """Remove the shard from a value that is known to have one."""
+        return value.rsplit(SHARD_SEPARATOR, 1)[0]
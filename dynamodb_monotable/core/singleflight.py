@@ -0,0 +1,71 @@
+"""Holds the logic for sharing one request between concurrent identical calls."""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Makes concurrent calls with the same key share the result of one call.
+
+    The first caller of a key runs the request, every caller that arrives
+    while it is still running waits for it and gets the same result, or
+    error. Nothing is cached once the request has completed.
+
+    The result is returned with whether it was shared, so only the caller
+    that sent the request records what it consumed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run the call, or wait for the one already running, returns its result
+        and whether it was shared from another caller."""
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+            return call.result, False
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(
+        self, key: Hashable, func: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """The asyncio version of `do`, calls are shared within an event loop."""
+        loop_key = (id(asyncio.get_running_loop()), key)
+
+        future = self._async_calls.get(loop_key)
+        shared = future is not None
+        if not shared:
+            future = asyncio.ensure_future(func())
+            self._async_calls[loop_key] = future
+            future.add_done_callback(lambda _: self._async_calls.pop(loop_key, None))
+
+        # one caller being cancelled must not cancel the request for the others.
+        return await asyncio.shield(future), shared
@@ -0,0 +1,215 @@
+"""Holds the logic for writing and reading many items in one transaction."""
+
+import json
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from dynamodb_monotable.conditions import Condition, ExpressionBuilder
+from dynamodb_monotable.core.cache import ItemCache, cache_key
+from dynamodb_monotable.core.metrics import Metrics, capacity_args, measure
+from dynamodb_monotable.core.serializers import to_dynamodb
+
+TRANSACTION_MAX_ITEMS = 100
+TRANSACTION_MAX_BYTES = 4 * 1024 * 1024
+
+
+def _with_condition(
+    request: Dict[str, Any], condition: Optional[Condition]
+) -> Dict[str, Any]:
+    if condition is None:
+        return request
+
+    # an update already has names and values, the condition adds to them.
+    builder = ExpressionBuilder(
+        names=request.get("ExpressionAttributeNames"),
+        values=request.get("ExpressionAttributeValues"),
+    )
+    request["ConditionExpression"] = builder.build(condition)
+    if builder.names:
+        request["ExpressionAttributeNames"] = builder.names
+    if builder.values:
+        request["ExpressionAttributeValues"] = builder.values
+    return request
+
+
+def check_transaction_size(requests: List[Dict[str, Any]]) -> None:
+    """Check the requests fit in one transaction.
+
+    Raises:
+        ValueError: If there are more than 100 requests or they are over 4 MB.
+    """
+    if len(requests) > TRANSACTION_MAX_ITEMS:
+        raise ValueError(
+            f"A transaction can hold at most {TRANSACTION_MAX_ITEMS} items, "
+            f"got {len(requests)}."
+        )
+
+    size = len(json.dumps(requests, default=str))
+    if size > TRANSACTION_MAX_BYTES:
+        raise ValueError(
+            f"A transaction can be at most {TRANSACTION_MAX_BYTES} bytes, "
+            f"got roughly {size}."
+        )
+
+
+class Transaction:
+    """Collects writes to many items and sends them with one `TransactWriteItems`.
+
+    Either every write succeeds or none of them do. Each operation can have
+    a `Condition`, and `condition_check` adds a condition on an item that
+    isn't written. Use it as a context manager so the transaction is
+    committed on exit, unless an error was raised.
+
+    Args:
+        clients: The client registry of the table.
+        client_config: The config used to create the clients.
+        key_names: The names of the primary key attributes of the table.
+        cache: The cache of the table, written items are removed from it.
+        table_name: The name of the table the metrics are recorded for.
+        metrics: Records the `TransactWriteItems` request, see `Metrics`.
+    """
+
+    def __init__(
+        self,
+        clients,
+        client_config: Dict[str, Any],
+        key_names: List[str],
+        cache: Optional[ItemCache] = None,
+        table_name: str = "",
+        metrics: Optional[Metrics] = None,
+    ):
+        self._clients = clients
+        self._client_config = client_config
+        self._key_names = key_names
+        self._cache = cache
+        self._table_name = table_name
+        self._metrics = metrics
+
+        self._requests: List[Dict[str, Any]] = []
+        self._items: List[Tuple[Any, bool]] = []
+        self._keys: Set[Tuple[Any, ...]] = set()
+
+    def put(self, item, condition: Optional[Condition] = None) -> None:
+        """Put a created item into the table."""
+        request = {
+            "TableName": item.table_config["table_name"],
+            "Item": to_dynamodb(item._serialize()),
+        }
+        self._add(item, {"Put": _with_condition(request, condition)})
+
+    def update(self, item, condition: Optional[Condition] = None) -> None:
+        """Write the changes to an item, see `Item.save`.
+
+        Increments are applied by the table, but the incremented values are not
+        refreshed as transactions can't return them.
+        """
+        update_args = item._update_args({})
+        if update_args is None:
+            self.put(item, condition)
+        elif update_args:
+            update_args.pop("ReturnValues", None)
+            self._add(item, {"Update": _with_condition(update_args, condition)})
+        elif condition is not None:
+            # nothing changed, but the condition still has to hold.
+            self.condition_check(item, condition)
+
+    def delete(self, item, condition: Optional[Condition] = None) -> None:
+        """Delete an item from the table."""
+        request = _with_condition(self._key_request(item), condition)
+        self._add(item, {"Delete": request}, saves=False)
+
+    def condition_check(self, item, condition: Condition) -> None:
+        """Fail the transaction unless the condition holds for the item."""
+        request = _with_condition(self._key_request(item), condition)
+        self._add(item, {"ConditionCheck": request}, saves=False)
+
+    def commit(self) -> None:
+        """Send the transaction, it is not sent when it is empty."""
+        if not self._requests:
+            return
+
+        check_transaction_size(self._requests)
+        client = self._clients.client(self._client_config)
+        with self._measure() as record:
+            with record.phase("network"):
+                response = client.transact_write_items(
+                    TransactItems=self._requests, **capacity_args(self._metrics)
+                )
+            record.response(response)
+            record.items = len(self._requests)
+        self._committed()
+
+    async def acommit(self) -> None:
+        """The asyncio version of `commit`."""
+        if not self._requests:
+            return
+
+        check_transaction_size(self._requests)
+        client = await self._clients.aclient(self._client_config)
+        with self._measure() as record:
+            with record.phase("network"):
+                response = await client.transact_write_items(
+                    TransactItems=self._requests, **capacity_args(self._metrics)
+                )
+            record.response(response)
+            record.items = len(self._requests)
+        self._committed()
+
+    def __enter__(self) -> "Transaction":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.commit()
+
+    async def __aenter__(self) -> "Transaction":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            await self.acommit()
+
+    # private api starts here.
+
+    def _measure(self):
+        return measure(self._metrics, "transact_write_items", self._table_name)
+
+    def _item_key(self, item) -> Dict[str, Any]:
+        serialized = item._serialize()
+        return {name: serialized[name] for name in self._key_names}
+
+    def _key_request(self, item) -> Dict[str, Any]:
+        return {
+            "TableName": item.table_config["table_name"],
+            "Key": to_dynamodb(self._item_key(item)),
+        }
+
+    def _add(self, item, request: Dict[str, Any], saves: bool = True) -> None:
+        if len(self._requests) >= TRANSACTION_MAX_ITEMS:
+            raise ValueError(
+                f"A transaction can hold at most {TRANSACTION_MAX_ITEMS} items."
+            )
+
+        key = tuple(self._item_key(item).values())
+        if key in self._keys:
+            raise ValueError(
+                f"A transaction can only include each item once, {key} is repeated."
+            )
+
+        self._keys.add(key)
+        self._requests.append(request)
+        self._items.append((item, saves))
+
+    def _committed(self) -> None:
+        for item, saves in self._items:
+            if self._cache is not None:
+                self._cache.delete(
+                    cache_key(
+                        item.table_config["table_name"],
+                        self._key_names,
+                        item._serialize(),
+                    )
+                )
+            if saves:
+                item._saved()
+
+        self._requests, self._items, self._keys = [], [], set()
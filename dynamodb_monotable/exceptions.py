@@ -5,3 +5,9 @@ class NoResultsFound(Exception):
     """No results were found for the query."""
 
     pass
+
+
+class BatchRetriesExhausted(Exception):
+    """A batch request still had unprocessed items after all of its retries."""
+
+    pass
@@ -1,136 +1,1205 @@
-from typing import Dict, ClassVar, List, Any, Optional, TypeVar, Iterator
-from dataclasses import dataclass, fields, field
+from typing import (
+    Dict,
+    ClassVar,
+    List,
+    Any,
+    Optional,
+    TypeVar,
+    Iterator,
+    AsyncIterator,
+    Sequence,
+    Tuple,
+    Callable,
+    Awaitable,
+    Hashable,
+    Set,
+    Union,
+)
+from dataclasses import dataclass, field
+from functools import partial
+import asyncio
+import heapq
+import itertools
+import weakref
 
-import boto3
-
-from dynamodb_monotable.resolvers import solve_template_values
 from dynamodb_monotable.attributes import Attribute, Condition
 from dynamodb_monotable.exceptions import NoResultsFound
-from dynamodb_monotable.core.queries import parse_query_args
+from dynamodb_monotable.core.queries import (
+    HASH_KEY_PARAM,
+    bind_query_args,
+    prepare_query_args,
+    parse_query_args,
+    next_page_args,
+    key_projection,
+    query_fingerprint,
+)
+from dynamodb_monotable.core.prefetch import PagePrefetcher
+from dynamodb_monotable.core.scan import (
+    AsyncParallelScan,
+    ParallelScan,
+    parse_scan_args,
+)
+from dynamodb_monotable.core.batch import (
+    BATCH_GET_SIZE,
+    abatch_get_chunk,
+    batch_get_chunk,
+    chunk,
+)
+from dynamodb_monotable.core.serializers import to_dynamodb, from_dynamodb
+from dynamodb_monotable.core.metadata import ModelMeta
+from dynamodb_monotable.core.cache import CacheKey, cache_key, item_size
+from dynamodb_monotable.core.metrics import (
+    OperationRecord,
+    capacity_args,
+    measure,
+)
+from dynamodb_monotable.core.sharding import ShardSpec
 
 TItem = TypeVar("TItem", bound="Item")
 
 
+def _page_budget(
+    max_items: Optional[int], dispatch: Optional[Callable]
+) -> Optional[int]:
+    """The number of items the next pages are limited to, rows skipped by
+    `dispatch` are read but not returned so the pages can't be cut short."""
+    return None if dispatch else max_items
+
+
 class ResultsSet:
+    """Iterates over the items returned by a query.
+
+    The first query is sent straight away. By default only the items in the
+    first response are returned. When `paginate` is set the results set follows
+    the `LastEvaluatedKey` and lazily fetches the next page once the current one
+    has been consumed, so only a single page is held in memory at a time. The
+    rows of each page are deserialized as it arrives, so the time it takes is
+    recorded along with the query.
+
+    With `prefetch` set, up to that many of the following pages are fetched and
+    deserialized on a background thread while the current page is being
+    consumed. The thread stops once the results set is closed, used as a
+    context manager, or garbage collected.
+
+    Args:
+        model: The model used to deserialize the items.
+        query_args: The arguments of the first query.
+        paginate: Whether to follow the `LastEvaluatedKey` to the next pages.
+        max_items: The maximum number of items to return across all pages.
+        prefetch: The number of pages to fetch ahead of the consumer.
+        dispatch: Finds the model of each row, for results with many types of
+            model. Rows it returns None for are skipped.
+    """
+
     def __init__(
         self,
         model: TItem,
-        response: Dict[str, Any],
+        query_args: Dict[str, Any],
+        paginate: bool = False,
+        max_items: Optional[int] = None,
+        prefetch: int = 0,
+        dispatch: Optional[Callable[[Dict[str, Any]], Optional[TItem]]] = None,
+    ):
+        self._model = model
+        self._dispatch = dispatch
+        self._query_args = query_args
+        self._paginate = paginate
+        self._max_items = max_items
+        self._returned_count = 0
+        self.count = 0
+        self._load_page(*model._query_page(query_args, dispatch))
+
+        self._prefetcher = None
+        if prefetch and paginate and self.last_evaluated_key:
+            self._prefetcher = PagePrefetcher(
+                query=partial(model._query_page, dispatch=dispatch),
+                query_args=query_args,
+                last_evaluated_key=self.last_evaluated_key,
+                fetched_count=self.count,
+                max_items=_page_budget(max_items, dispatch),
+                depth=prefetch,
+            )
+            # the prefetcher doesn't reference us, so this runs once we're dropped.
+            weakref.finalize(self, self._prefetcher.close)
+
+    def __next__(self) -> TItem:
+        if self._max_items is not None and self._returned_count >= self._max_items:
+            self.close()
+            raise StopIteration
+
+        while self._last_iterated_index >= len(self._results):
+            if not self._fetch_next_page():
+                raise StopIteration
+
+        item = self._results[self._last_iterated_index]
+        self._last_iterated_index += 1
+        self._returned_count += 1
+        return item
+
+    def __iter__(self) -> Iterator[TItem]:
+        return self
+
+    def __enter__(self) -> "ResultsSet":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop fetching pages in the background."""
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+
+    # private api starts here.
+
+    def _load_page(self, response: Dict[str, Any], items: List[TItem]) -> None:
+        self.last_evaluated_key = response.get("LastEvaluatedKey", {})
+        self.count += response["Count"]
+        self._results = items
+        self._last_iterated_index = 0
+
+    def _fetch_next_page(self) -> bool:
+        """Fetch the next page of results, returns False if there are none."""
+        if self._prefetcher is not None:
+            page = self._prefetcher.get()
+            if page is None:
+                return False
+            self._load_page(*page)
+            return True
+
+        if not self._paginate or not self.last_evaluated_key:
+            return False
+
+        args = next_page_args(
+            self._query_args,
+            self.last_evaluated_key,
+            self._returned_count,
+            _page_budget(self._max_items, self._dispatch),
+        )
+        self._load_page(*self._model._query_page(args, self._dispatch))
+        return True
+
+
+class AsyncResultsSet:
+    """The asyncio version of `ResultsSet`, iterate over it with `async for`.
+
+    The first query is only sent once iteration starts. When `paginate` is set
+    the following pages are fetched lazily, one page at a time.
+
+    Args:
+        model: The model used to deserialize the items.
+        query_args: The arguments of the first query.
+        paginate: Whether to follow the `LastEvaluatedKey` to the next pages.
+        max_items: The maximum number of items to return across all pages.
+        dispatch: Finds the model of each row, see `ResultsSet`.
+    """
+
+    def __init__(
+        self,
+        model: TItem,
+        query_args: Dict[str, Any],
+        paginate: bool = False,
+        max_items: Optional[int] = None,
+        dispatch: Optional[Callable[[Dict[str, Any]], Optional[TItem]]] = None,
     ):
         self._model = model
+        self._dispatch = dispatch
+        self._query_args = query_args
+        self._paginate = paginate
+        self._max_items = max_items
+        self._returned_count = 0
+        self.count = 0
+        self.last_evaluated_key = {}
+        self._results = None
+        self._last_iterated_index = 0
+
+    async def __anext__(self) -> TItem:
+        if self._max_items is not None and self._returned_count >= self._max_items:
+            raise StopAsyncIteration
+
+        if self._results is None:
+            await self._fetch_page(self._query_args)
+
+        while self._last_iterated_index >= len(self._results):
+            if not self._paginate or not self.last_evaluated_key:
+                raise StopAsyncIteration
+            await self._fetch_page(
+                next_page_args(
+                    self._query_args,
+                    self.last_evaluated_key,
+                    self._returned_count,
+                    _page_budget(self._max_items, self._dispatch),
+                )
+            )
+
+        item = self._results[self._last_iterated_index]
+        self._last_iterated_index += 1
+        self._returned_count += 1
+        return item
+
+    def __aiter__(self) -> AsyncIterator[TItem]:
+        return self
+
+    # private api starts here.
+
+    async def _fetch_page(self, args: Dict[str, Any]) -> None:
+        response, items = await self._model._aquery_page(args, self._dispatch)
+
         self.last_evaluated_key = response.get("LastEvaluatedKey", {})
-        self.count = response["Count"]
-        self._results = response["Items"]
+        self.count += response["Count"]
+        self._results = items
         self._last_iterated_index = 0
 
+
+class MergedResultsSet:
+    """Merges the results of a query that was fanned out over many shards.
+
+    Every shard is itself sorted by the sort key, so the results are merged
+    back into sort key order with a k-way heap merge, which only holds the
+    current item of each shard.
+
+    Args:
+        results_sets: The results of each shard.
+        sort_key_name: The name of the sort key to order the items by, or None
+            to return the items of each shard in turn.
+        reverse: Whether the items are in descending sort key order.
+        max_items: The maximum number of items to return across all shards.
+    """
+
+    def __init__(
+        self,
+        results_sets: List[ResultsSet],
+        sort_key_name: Optional[str] = None,
+        reverse: bool = False,
+        max_items: Optional[int] = None,
+    ):
+        self._results_sets = results_sets
+
+        if sort_key_name is None:
+            items = itertools.chain(*results_sets)
+        else:
+            items = heapq.merge(
+                *results_sets,
+                key=lambda item: item.attribute_values[sort_key_name],
+                reverse=reverse,
+            )
+        self._items = itertools.islice(items, max_items)
+
+    @property
+    def count(self) -> int:
+        return sum(results_set.count for results_set in self._results_sets)
+
     def __next__(self) -> TItem:
+        return next(self._items)
+
+    def __iter__(self) -> Iterator[TItem]:
+        return self
+
+    def __enter__(self) -> "MergedResultsSet":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop fetching pages in the background."""
+        for results_set in self._results_sets:
+            results_set.close()
+
+
+class _HeapEntry:
+    """An item in the heap of `AsyncMergedResultsSet`, ordered by its sort key."""
+
+    __slots__ = ("key", "index", "item", "reverse")
+
+    def __init__(self, key: Any, index: int, item: TItem, reverse: bool):
+        self.key = key
+        self.index = index
+        self.item = item
+        self.reverse = reverse
+
+    def __lt__(self, other: "_HeapEntry") -> bool:
+        if self.key == other.key:
+            return self.index < other.index
+        return (self.key > other.key) if self.reverse else (self.key < other.key)
+
+
+class AsyncMergedResultsSet:
+    """The asyncio version of `MergedResultsSet`.
+
+    The first page of every shard is fetched concurrently.
+    """
+
+    def __init__(
+        self,
+        results_sets: List[AsyncResultsSet],
+        sort_key_name: Optional[str] = None,
+        reverse: bool = False,
+        max_items: Optional[int] = None,
+    ):
+        self._results_sets = results_sets
+        self._sort_key_name = sort_key_name
+        self._reverse = reverse
+        self._max_items = max_items
+        self._returned_count = 0
+        self._heap: Optional[List[_HeapEntry]] = None
+
+    @property
+    def count(self) -> int:
+        return sum(results_set.count for results_set in self._results_sets)
+
+    async def __anext__(self) -> TItem:
+        if self._max_items is not None and self._returned_count >= self._max_items:
+            raise StopAsyncIteration
+
+        if self._heap is None:
+            entries = await asyncio.gather(
+                *[self._next_entry(index) for index in range(len(self._results_sets))]
+            )
+            self._heap = [entry for entry in entries if entry is not None]
+            heapq.heapify(self._heap)
+
+        if not self._heap:
+            raise StopAsyncIteration
+
+        entry = heapq.heappop(self._heap)
+        next_entry = await self._next_entry(entry.index)
+        if next_entry is not None:
+            heapq.heappush(self._heap, next_entry)
+
+        self._returned_count += 1
+        return entry.item
+
+    def __aiter__(self) -> AsyncIterator[TItem]:
+        return self
+
+    # private api starts here.
+
+    async def _next_entry(self, index: int) -> Optional[_HeapEntry]:
         try:
-            item = self._results[self._last_iterated_index]
-            deserialized_item = {}
-            for field_name, field in self._model._fields().items():
-                field_value = item[field_name][field.dynamodb_type]
-                deserialized_field_value = field.deserialize(field_value)
-                deserialized_item[field_name] = deserialized_field_value
-
-            self._last_iterated_index += 1
-            return self._model.__class__(
-                table_config=self._model.table_config,
-                client_config=self._model.client_config,
-                create_state=True,
-                attribute_values=deserialized_item,
-            )
-        except IndexError:
-            raise StopIteration
+            item = await self._results_sets[index].__anext__()
+        except StopAsyncIteration:
+            return None
+
+        # without a sort key the shards are returned one after the other.
+        key = (
+            item.attribute_values[self._sort_key_name] if self._sort_key_name else index
+        )
+        return _HeapEntry(key, index, item, self._reverse)
+
+
+class PreparedQuery:
+    """A query whose expressions are built once, see `Item.prepare_query`.
+
+    Executing it only binds the hash key and the values of the `Param`s, the
+    expression strings and placeholder names are the same for every call.
+
+    Args:
+        model: The model the query is for.
+        args: The query arguments without their values.
+        placeholders: The value, or the `Param` to bind, of each placeholder.
+    """
+
+    def __init__(self, model: TItem, args: Dict[str, Any], placeholders: Dict):
+        self.model = model
+        self.args = args
+        self.placeholders = placeholders
+        self._index = args.get("IndexName")
+
+    def execute(
+        self,
+        hash_key_value: Any,
+        values: Optional[Dict[str, Any]] = None,
+        exclusive_start_key: Optional[Dict] = None,
+        paginate: bool = False,
+        max_items: Optional[int] = None,
+        prefetch: int = 0,
+    ) -> Union[ResultsSet, MergedResultsSet]:
+        """Run the query, the arguments are the same as `Item.query`.
+
+        Args:
+            hash_key_value: The value of the hash key.
+            values: The value of every `Param` in the conditions, by name.
+        """
+
+        return self.model._results(
+            self._bind(hash_key_value, values, exclusive_start_key, max_items),
+            index=self._index,
+            scan_index_forward=self.args["ScanIndexForward"],
+            paginate=paginate,
+            max_items=max_items,
+            prefetch=prefetch,
+        )
+
+    def aexecute(
+        self,
+        hash_key_value: Any,
+        values: Optional[Dict[str, Any]] = None,
+        exclusive_start_key: Optional[Dict] = None,
+        paginate: bool = False,
+        max_items: Optional[int] = None,
+    ) -> Union[AsyncResultsSet, AsyncMergedResultsSet]:
+        """The asyncio version of `execute`."""
+
+        return self.model._aresults(
+            self._bind(hash_key_value, values, exclusive_start_key, max_items),
+            index=self._index,
+            scan_index_forward=self.args["ScanIndexForward"],
+            paginate=paginate,
+            max_items=max_items,
+        )
+
+    # private api starts here.
+
+    def _bind(
+        self,
+        hash_key_value: Any,
+        values: Optional[Dict[str, Any]],
+        exclusive_start_key: Optional[Dict],
+        max_items: Optional[int],
+    ) -> List[Dict[str, Any]]:
+        shard_args = []
+        for value in self.model._hash_key_values(
+            hash_key_value, self._index, exclusive_start_key
+        ):
+            args = bind_query_args(
+                self.args, self.placeholders, {**(values or {}), HASH_KEY_PARAM: value}
+            )
+            if exclusive_start_key is not None:
+                args["ExclusiveStartKey"] = exclusive_start_key
+            # there is no point reading more items than we are going to return.
+            if max_items is not None and args.get("Limit", max_items) >= max_items:
+                args["Limit"] = max_items
+            shard_args.append(args)
+        return shard_args
+
+
+class ScanResultsSet:
+    """Iterates over the items returned by a parallel scan, as they arrive.
+
+    Args:
+        model: The model used to deserialize the items.
+        scan: The scan that returns the rows.
+        dispatch: Finds the model of each row, see `ResultsSet`.
+    """
+
+    def __init__(
+        self,
+        model: TItem,
+        scan: ParallelScan,
+        dispatch: Optional[Callable[[Dict[str, Any]], Optional[TItem]]] = None,
+    ):
+        self._model = model
+        self._scan = scan
+        self._rows = iter(scan)
+        self._dispatch = dispatch
+        # the workers don't reference us, so this runs once we're dropped.
+        weakref.finalize(self, scan.close)
+
+    def __next__(self) -> TItem:
+        for row in self._rows:
+            model = self._dispatch(row) if self._dispatch else self._model
+            if model is not None:
+                return model._from_query_item(row)
+        raise StopIteration
 
     def __iter__(self) -> Iterator[TItem]:
         return self
 
+    def __enter__(self) -> "ScanResultsSet":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop scanning, used when the consumer stops iterating early."""
+        self._scan.close()
+
+
+class AsyncScanResultsSet:
+    """The asyncio version of `ScanResultsSet`, iterate over it with `async for`."""
+
+    def __init__(
+        self,
+        model: TItem,
+        scan: AsyncParallelScan,
+        dispatch: Optional[Callable[[Dict[str, Any]], Optional[TItem]]] = None,
+    ):
+        self._model = model
+        self._rows = scan.__aiter__()
+        self._dispatch = dispatch
+
+    async def __anext__(self) -> TItem:
+        async for row in self._rows:
+            model = self._dispatch(row) if self._dispatch else self._model
+            if model is not None:
+                return model._from_query_item(row)
+        raise StopAsyncIteration
+
+    def __aiter__(self) -> AsyncIterator[TItem]:
+        return self
+
+    async def aclose(self) -> None:
+        """Stop scanning, used when the consumer stops iterating early."""
+        await self._rows.aclose()
+
+
+@dataclass
+class QueryCount:
+    """The number of items matched by a query or scan, see `Item.count`.
+
+    Args:
+        count: The number of items that matched the conditions.
+        scanned_count: The number of items read before the filter was applied.
+    """
+
+    count: int = 0
+    scanned_count: int = 0
+
+    def __add__(self, other: "QueryCount") -> "QueryCount":
+        return QueryCount(
+            self.count + other.count, self.scanned_count + other.scanned_count
+        )
+
 
 @dataclass
 class Item:
 
-    ignored_fields: ClassVar[List[str]] = [
-        "table_config",
-        "client_config",
-        "create_state",
-        "attribute_values",
-    ]
+    _meta: ClassVar[ModelMeta] = ModelMeta(())
 
     table_config: Dict[str, Any]
     client_config: Dict[str, Any]
     create_state: bool = False
     attribute_values: Dict[str, Any] = field(default_factory=dict)
 
-    def __post_init__(self):
-        """We use post_init to set the values of the names in the Attribute class."""
-        # set the field names of the attr's after init
-        for field in fields(self):
-            if field.name not in self.ignored_fields:
-                attribute = getattr(self, field.name)
-                attribute.name = field.name
-
-    def _field_names(self) -> List[str]:
-        return [f.name for f in fields(self) if f.name not in self.ignored_fields]
+    # whether the item was read from, or written to, the table. `save` updates
+    # the attributes that changed, or were incremented, since then.
+    _stored: bool = field(default=False, init=False, repr=False, compare=False)
+    _dirty_fields: Set[str] = field(
+        default_factory=set, init=False, repr=False, compare=False
+    )
+    _increments: Dict[str, Any] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
 
-    def _fields(self) -> Dict[str, Attribute]:
-        return {
-            f.name: f.default for f in fields(self) if f.name not in self.ignored_fields
-        }
+    def __init_subclass__(cls, **kwargs):
+        """Compute the metadata of the model once, when the class is defined."""
+        super().__init_subclass__(**kwargs)
+        cls._meta = ModelMeta.from_class(cls)
 
     def _validate_model(self):
         # check hash key and optionally sort key are on the model.
         hash_key = self.table_config["key_schema"]["hash_key"]
         sort_key = self.table_config["key_schema"]["sort_key"]
-        if hash_key.name not in self._field_names():
+        if hash_key.name not in self._meta.names:
             raise ValueError(f"{hash_key.name} is not on the model.")
-        if sort_key and sort_key.name not in self._field_names():
+        if sort_key and sort_key.name not in self._meta.names:
             raise ValueError(f"{sort_key.name} is not on the model.")
 
+    def _new_item(self, attribute_values: Dict[str, Any]) -> TItem:
+        """Create a new item of this model that has already been created."""
+        item = self.__class__(
+            table_config=self.table_config,
+            client_config=self.client_config,
+            create_state=True,
+        )
+        item.attribute_values.update(attribute_values)
+        item._stored = True
+        return item
+
+    def _serialize(self) -> Dict[str, Any]:
+        """Serialize the item into the format used by the dynamodb resource."""
+        item = {}
+        for attribute in self._meta.attributes:
+            value = self.attribute_values.get(attribute.name)
+            if value is not None:
+                item[attribute.name] = attribute.serialize(value)
+        return item
+
+    def _deserialize(self, response_item: Dict[str, Any]) -> TItem:
+        """Create an item from an item returned by the dynamodb resource."""
+        attribute_values = {}
+        for attribute in self._meta.attributes:
+            if attribute.name in response_item:
+                attribute_values[attribute.name] = attribute.deserialize(
+                    response_item[attribute.name]
+                )
+        return self._new_item(self._hydrate(attribute_values))
+
+    def _from_query_item(self, item: Dict[str, Any]) -> TItem:
+        """Create an item from an item returned by the dynamodb client."""
+        deserialized_item = {}
+        for attribute in self._meta.attributes:
+            if attribute.name in item:
+                value = item[attribute.name][attribute.dynamodb_type]
+                deserialized_item[attribute.name] = attribute.deserialize(value)
+        return self._new_item(self._hydrate(deserialized_item))
+
+    def _key_names(self) -> List[str]:
+        key_schema = self.table_config["key_schema"]
+        key_names = [key_schema["hash_key"].name]
+        if key_schema["sort_key"]:
+            key_names.append(key_schema["sort_key"].name)
+        return key_names
+
+    def _projected_key_names(self, index: Optional[str] = None) -> List[str]:
+        """The key attributes that are always projected into an index."""
+        key_names = self._key_names()
+        if index is not None:
+            index_keys = self.table_config["indexes"][index]
+            for key in (index_keys.hash_key, index_keys.sort_key):
+                if key and key.name not in key_names:
+                    key_names.append(key.name)
+        return key_names
+
+    def _hydrate(self, attribute_values: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill in missing attributes from the values embedded in the templates."""
+        meta = self._meta
+        if len(attribute_values) < len(meta.attributes):
+            values = attribute_values
+            if meta.shards:
+                # the shard isn't part of the template, so it can't be parsed.
+                values = {**attribute_values}
+                for name, spec in meta.shards.items():
+                    if isinstance(values.get(name), str):
+                        values[name] = spec.strip(values[name])
+
+            for name, value in meta.template_plan.parse(values).items():
+                attribute = meta.attributes_by_name.get(name)
+                if attribute is not None:
+                    attribute_values[name] = attribute.deserialize(value)
+        return attribute_values
+
+    def _cache_key(self, item: Dict[str, Any]) -> CacheKey:
+        return cache_key(self.table_config["table_name"], self._key_names(), item)
+
+    def _cache_items(self, items: List[Dict[str, Any]]) -> None:
+        cache = self.table_config["cache"]
+        if cache is not None:
+            for item in items:
+                cache.set(self._cache_key(item), item)
+
+    def _uncache(self, item: Dict[str, Any]) -> None:
+        cache = self.table_config["cache"]
+        if cache is not None:
+            cache.delete(self._cache_key(item))
+
+    def _cached_item(
+        self, key: Dict[str, Any], consistent_read: bool
+    ) -> Optional[Dict[str, Any]]:
+        cache = self.table_config["cache"]
+        if cache is None or consistent_read:
+            return None
+        return cache.get(self._cache_key(key))
+
+    def _split_cached_keys(
+        self, keys: Sequence[Tuple[Any, ...]], consistent_read: bool
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Split the unique keys into the keys to fetch and the items in the cache."""
+        keys_to_fetch, cached_items = [], []
+        for key in self._unique_keys(keys):
+            cached_item = self._cached_item(key, consistent_read)
+            if cached_item is None:
+                keys_to_fetch.append(key)
+            else:
+                cached_items.append(cached_item)
+        return keys_to_fetch, cached_items
+
+    def _unique_keys(self, keys: Sequence[Tuple[Any, ...]]) -> List[Dict[str, Any]]:
+        # dynamodb rejects duplicate keys within a batch, so only fetch each once.
+        unique_keys = {}
+        for key in keys:
+            unique_keys.setdefault(tuple(key), self._key(*key))
+        return list(unique_keys.values())
+
+    def _order_batch_results(
+        self, keys: Sequence[Tuple[Any, ...]], response_items: List[Dict[str, Any]]
+    ) -> List[Optional[TItem]]:
+        key_names = self._key_names()
+
+        found = {}
+        for response_item in response_items:
+            item_key = tuple(response_item[name] for name in key_names)
+            found[item_key] = self._deserialize(response_item)
+
+        # the stored keys can differ from the keys asked for when they're sharded.
+        if self._meta.shards:
+            return [found.get(tuple(self._key(*key).values())) for key in keys]
+        return [found.get(tuple(key)) for key in keys]
+
+    def _key(
+        self, hash_key: Any, sort_key: Optional[Any] = None, index_name: str = "primary"
+    ) -> Dict[str, Any]:
+        index = self.table_config["indexes"][index_name]
+
+        key = {index.hash_key.name: hash_key}
+        if sort_key:
+            if index.sort_key:
+                key[index.sort_key.name] = sort_key
+            else:
+                raise ValueError(
+                    "Sort key is not defined on the table but has been provided."
+                )
+
+        if self._meta.shards:
+            self._add_shard(key, index_name)
+        return key
+
+    def _sharding(self, index_name: Optional[str]) -> Optional[ShardSpec]:
+        """Get the sharding of the hash key of the index, if it is sharded."""
+        hash_key, _ = self.table_config["model_keys"][self.__class__][
+            index_name or "primary"
+        ]
+        return self._meta.shards.get(hash_key.name) if hash_key else None
+
+    def _add_shard(self, key: Dict[str, Any], index_name: str) -> None:
+        """Add the shard to the hash key, found from the values in the sort key."""
+        spec = self._sharding(index_name)
+        _, sort_key = self.table_config["model_keys"][self.__class__][index_name]
+        if spec is None or sort_key is None or sort_key.name not in key:
+            return
+
+        hash_key_name = next(iter(key))
+        values = self._meta.template_plan.parse({sort_key.name: key[sort_key.name]})
+        if spec.shard(values) is None:
+            return
+
+        key[hash_key_name] = spec.apply(key[hash_key_name], values)
+
+    def _update_args(self, kwargs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Build the `UpdateItem` request that writes the changes to the item.
+
+        Returns None when the whole item has to be put instead, because it
+        isn't in the table yet, and an empty dict when there is nothing to write.
+
+        Raises:
+            ValueError: If the changes would move the item to another key.
+        """
+        if not self._stored:
+            return None
+
+        meta = self._meta
+        changed = set(self._dirty_fields)
+        dependents = meta.template_plan.dependents(changed)
+        resolved = meta.template_plan.resolve(
+            {
+                name: value
+                for name, value in self.attribute_values.items()
+                if name not in dependents
+            }
+        )
+
+        # writing the new key would leave the item at the old key behind.
+        key_names = self._key_names()
+        moved = [
+            name
+            for name in key_names
+            if name in changed or resolved.get(name) != self.attribute_values.get(name)
+        ]
+        if moved:
+            raise ValueError(
+                f"The changes would move the item to a new {', '.join(moved)}, "
+                "create a new item and delete this one instead."
+            )
+
+        for name in dependents:
+            self.attribute_values[name] = resolved[name]
+        changed.update(dependents)
+        changed.difference_update(key_names)
+        if not changed and not self._increments:
+            return {}
+
+        names: Dict[str, str] = {}
+        values: Dict[str, Any] = {}
+        actions: Dict[str, List[str]] = {"SET": [], "REMOVE": [], "ADD": []}
+        for i, name in enumerate(sorted(changed) + sorted(self._increments)):
+            names[f"#upd{i}"] = name
+            if name in self._increments:
+                value = self._increments[name]
+                actions["ADD"].append(f"#upd{i} :upd{i}")
+            else:
+                value = self.attribute_values.get(name)
+                if value is None:
+                    actions["REMOVE"].append(f"#upd{i}")
+                    continue
+                actions["SET"].append(f"#upd{i} = :upd{i}")
+
+            attribute = meta.attributes_by_name[name]
+            values[f":upd{i}"] = to_dynamodb({name: attribute.serialize(value)})[name]
+
+        serialized = self._serialize()
+        args = {
+            **kwargs,
+            "TableName": self.table_config["table_name"],
+            "Key": to_dynamodb({name: serialized[name] for name in key_names}),
+            "UpdateExpression": " ".join(
+                f"{action} {', '.join(parts)}"
+                for action, parts in actions.items()
+                if parts
+            ),
+            "ExpressionAttributeNames": {
+                **kwargs.get("ExpressionAttributeNames", {}),
+                **names,
+            },
+        }
+        if values or "ExpressionAttributeValues" in kwargs:
+            args["ExpressionAttributeValues"] = {
+                **to_dynamodb(kwargs.get("ExpressionAttributeValues", {})),
+                **values,
+            }
+        if self._increments:
+            args["ReturnValues"] = "UPDATED_NEW"
+        return args
+
+    def _updated(self, response: Dict[str, Any]) -> None:
+        """Refresh the incremented values and drop the stale item from the cache."""
+        if "Attributes" in response:
+            for name, value in from_dynamodb(response["Attributes"]).items():
+                attribute = self._meta.attributes_by_name.get(name)
+                if attribute is not None:
+                    self.attribute_values[name] = attribute.deserialize(value)
+
+        self._uncache(self._serialize())
+        self._saved()
+
+    def _saved(self) -> None:
+        self._stored = True
+        self._dirty_fields.clear()
+        self._increments.clear()
+
+    def _measure(self, operation: str, index: Optional[str] = None):
+        """Record the metrics of an operation, if the table has any sinks."""
+        return measure(
+            self.table_config["metrics"],
+            operation,
+            self.table_config["table_name"],
+            type(self).__name__,
+            index,
+        )
+
+    @staticmethod
+    def _client_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert the values in the keyword arguments of `save` and `delete`,
+        which are given in the resource format, for the low level client."""
+        if "ExpressionAttributeValues" not in kwargs:
+            return kwargs
+        return {
+            **kwargs,
+            "ExpressionAttributeValues": to_dynamodb(
+                kwargs["ExpressionAttributeValues"]
+            ),
+        }
+
+    def _capacity_args(self) -> Dict[str, str]:
+        return capacity_args(self.table_config["metrics"])
+
+    def _client(self):
+        return self.table_config["clients"].client(self.client_config)
+
+    async def _aclient(self):
+        return await self.table_config["clients"].aclient(self.client_config)
+
+    def _coalesce(self, key: Hashable, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Share the request with concurrent identical ones, if the table allows it.
+        Returns the response and whether it was shared from another caller."""
+        single_flight = self.table_config["single_flight"]
+        if single_flight is None:
+            return func(), False
+        return single_flight.do(key, func)
+
+    async def _acoalesce(
+        self, key: Hashable, func: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        single_flight = self.table_config["single_flight"]
+        if single_flight is None:
+            return await func(), False
+        return await single_flight.ado(key, func)
+
+    def _loader(self, key: Dict[str, Any], index_name: str) -> Optional[Any]:
+        """Get the table's loader if the get can be batched, only full primary
+        keys can be fetched with `BatchGetItem`."""
+        loader = self.table_config["loader"]
+        if loader is None or index_name != "primary":
+            return None
+        return loader if len(key) == len(self._key_names()) else None
+
+    def _get_fingerprint(self, key: Dict[str, Any], consistent_read: bool) -> Hashable:
+        table_name = self.table_config["table_name"]
+        return ("get", table_name, tuple(sorted(key.items())), consistent_read)
+
+    def _query_fingerprint(self, args: Dict[str, Any]) -> Optional[Hashable]:
+        # only requests that can be shared need the fingerprint.
+        if self.table_config["single_flight"] is None:
+            return None
+        return ("query", query_fingerprint(args))
+
+    def _query(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        with self._measure("query", args.get("IndexName")) as record:
+            return self._send_query(record, args)
+
+    def _query_page(
+        self,
+        args: Dict[str, Any],
+        dispatch: Optional[Callable[[Dict[str, Any]], Optional[TItem]]] = None,
+    ) -> Tuple[Dict[str, Any], List[TItem]]:
+        """Run a query and deserialize its rows, so the time it takes is recorded
+        with the query. Rows `dispatch` finds no model for are skipped."""
+        with self._measure("query", args.get("IndexName")) as record:
+            response = self._send_query(record, args)
+            with record.phase("deserialize"):
+                items = self._page_items(response["Items"], dispatch)
+        return response, items
+
+    async def _aquery(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        with self._measure("query", args.get("IndexName")) as record:
+            return await self._asend_query(record, args)
+
+    async def _aquery_page(
+        self,
+        args: Dict[str, Any],
+        dispatch: Optional[Callable[[Dict[str, Any]], Optional[TItem]]] = None,
+    ) -> Tuple[Dict[str, Any], List[TItem]]:
+        with self._measure("query", args.get("IndexName")) as record:
+            response = await self._asend_query(record, args)
+            with record.phase("deserialize"):
+                items = self._page_items(response["Items"], dispatch)
+        return response, items
+
+    def _send_query(
+        self, record: OperationRecord, args: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        with record.phase("network"):
+            response, shared = self._coalesce(
+                self._query_fingerprint(args), lambda: self._client().query(**args)
+            )
+        # only the caller that sent a shared request records what it read.
+        if not shared:
+            self._record_page(record, response)
+        return response
+
+    async def _asend_query(
+        self, record: OperationRecord, args: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        async def query() -> Dict[str, Any]:
+            client = await self._aclient()
+            return await client.query(**args)
+
+        with record.phase("network"):
+            response, shared = await self._acoalesce(
+                self._query_fingerprint(args), query
+            )
+        if not shared:
+            self._record_page(record, response)
+        return response
+
+    def _page_items(
+        self,
+        rows: List[Dict[str, Any]],
+        dispatch: Optional[Callable[[Dict[str, Any]], Optional[TItem]]] = None,
+    ) -> List[TItem]:
+        if dispatch is None:
+            return [self._from_query_item(row) for row in rows]
+        models = ((dispatch(row), row) for row in rows)
+        return [
+            model._from_query_item(row) for model, row in models if model is not None
+        ]
+
+    def _scan(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        with self._measure("scan", args.get("IndexName")) as record:
+            with record.phase("network"):
+                response = self._client().scan(**args)
+            self._record_page(record, response)
+        return response
+
+    async def _ascan(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        with self._measure("scan", args.get("IndexName")) as record:
+            with record.phase("network"):
+                client = await self._aclient()
+                response = await client.scan(**args)
+            self._record_page(record, response)
+        return response
+
+    @staticmethod
+    def _record_write(
+        record: OperationRecord, response: Dict[str, Any], payload: Dict[str, Any]
+    ) -> None:
+        record.response(response)
+        record.items = 1
+        record.bytes = item_size(payload)
+
+    @staticmethod
+    def _record_page(record: OperationRecord, response: Dict[str, Any]) -> None:
+        record.response(response)
+        record.items += response["Count"]
+        record.bytes += sum(item_size(item) for item in response.get("Items", ()))
+
+    def _table(self):
+        return self.table_config["clients"].table(
+            self.client_config, self.table_config["table_name"]
+        )
+
     def hash_key(self, index: Optional[str]) -> Attribute:
 
         if index is None:
             index = "primary"
 
-        hash_key_name = self.table_config["indexes"][index].hash_key.name
-        return self._fields()[hash_key_name]
+        hash_key, _ = self.table_config["model_keys"][self.__class__][index]
+        return hash_key
 
     def save(self, **kwargs) -> None:
+        """Write the item to the table.
+
+        A new item is put into the table. An item that was read from the
+        table, or saved before, is updated with `UpdateItem` instead, which
+        only sends the attributes that changed, the templates that depend on
+        them, and any `increment`. Nothing is sent if nothing changed. The
+        keyword arguments are passed to the request, with their values in the
+        resource format, e.g. `ExpressionAttributeValues={":status": "open"}`.
+        """
         if self.create_state is False:
             raise ValueError("Item must be created before saving.")
 
-        dynamodb = boto3.resource("dynamodb", **self.client_config)
-        table = dynamodb.Table(self.table_config["table_name"])
+        kwargs = {**self._capacity_args(), **kwargs}
+        update_args = self._update_args(kwargs)
+        if update_args == {}:
+            return
 
-        item = {}
-        for field_name, field in self._fields().items():
-            value = self.attribute_values[field_name]
-            serialized_value = field.serialize(value)
-            item[field_name] = serialized_value
+        if update_args is not None:
+            with self._measure("update_item") as record:
+                with record.phase("network"):
+                    response = self._client().update_item(**update_args)
+                self._record_write(
+                    record, response, update_args.get("ExpressionAttributeValues", {})
+                )
+            self._updated(response)
+            return
 
-        table.put_item(Item=item, **kwargs)
+        with self._measure("put_item") as record:
+            with record.phase("serialize"):
+                item = self._serialize()
+            with record.phase("network"):
+                response = self._table().put_item(Item=item, **kwargs)
+            self._record_write(record, response, item)
 
-    def create(self, **values) -> TItem:
-        self.attribute_values.update(values)
+        self._cache_items([item])
+        self._saved()
 
-        # check for default fields
-        for field_name, field in self._fields().items():
-            if field_name not in self.attribute_values:
-                self.attribute_values[field_name] = field.default
+    def increment(self, name: str, amount: Any = 1) -> None:
+        """Add `amount` to a number attribute atomically, with an `ADD` on `save`.
+
+        The table adds the amount to its current value, so concurrent
+        increments are never lost. Use a negative amount to decrement. The
+        value is refreshed from the table on `save`.
+        """
+        attribute = self._meta.attributes_by_name.get(name)
+        if attribute is None or attribute.dynamodb_type != "N":
+            raise ValueError(f"{name} is not a number attribute of the model.")
+
+        self.attribute_values[name] = (self.attribute_values.get(name) or 0) + amount
+        self._increments[name] = self._increments.get(name, 0) + amount
+        self._dirty_fields.discard(name)
+
+    def delete(self, **kwargs) -> None:
+        """Delete the item from the table."""
+        if self.create_state is False:
+            raise ValueError("Item must be created before deleting.")
+
+        item = self._serialize()
+        key = {name: item[name] for name in self._key_names()}
+        with self._measure("delete_item") as record:
+            with record.phase("network"):
+                response = self._table().delete_item(
+                    Key=key, **{**self._capacity_args(), **kwargs}
+                )
+            self._record_write(record, response, key)
+        self._uncache(key)
+
+    async def asave(self, **kwargs) -> None:
+        """The asyncio version of `save`."""
+        if self.create_state is False:
+            raise ValueError("Item must be created before saving.")
+
+        kwargs = {**self._capacity_args(), **kwargs}
+        update_args = self._update_args(kwargs)
+        if update_args == {}:
+            return
+
+        client = await self._aclient()
+        if update_args is not None:
+            with self._measure("update_item") as record:
+                with record.phase("network"):
+                    response = await client.update_item(**update_args)
+                self._record_write(
+                    record, response, update_args.get("ExpressionAttributeValues", {})
+                )
+            self._updated(response)
+            return
+
+        with self._measure("put_item") as record:
+            with record.phase("serialize"):
+                item = self._serialize()
+                client_item = to_dynamodb(item)
+            with record.phase("network"):
+                response = await client.put_item(
+                    TableName=self.table_config["table_name"],
+                    Item=client_item,
+                    **self._client_kwargs(kwargs),
+                )
+            self._record_write(record, response, item)
+
+        self._cache_items([item])
+        self._saved()
+
+    async def adelete(self, **kwargs) -> None:
+        """The asyncio version of `delete`."""
+        if self.create_state is False:
+            raise ValueError("Item must be created before deleting.")
+
+        item = self._serialize()
+        key = {name: item[name] for name in self._key_names()}
+        client = await self._aclient()
+        with self._measure("delete_item") as record:
+            with record.phase("network"):
+                response = await client.delete_item(
+                    TableName=self.table_config["table_name"],
+                    Key=to_dynamodb(key),
+                    **self._client_kwargs({**self._capacity_args(), **kwargs}),
+                )
+            self._record_write(record, response, key)
+        self._uncache(key)
+
+    def create(self, **values) -> TItem:
+        # create a new item so the model can keep being used to create more.
+        item = self.__class__(
+            table_config=self.table_config, client_config=self.client_config
+        )
+        meta = self._meta
 
         # check for required fields
-        for field_name, field in self._fields().items():
-            if field_name not in self.attribute_values and field.required:
+        for field_name in meta.required:
+            if field_name not in values:
                 raise ValueError(f"{field_name} is required.")
 
+        # check for default fields
+        for field_name, default in meta.defaults.items():
+            if field_name not in values and default is not None:
+                item.attribute_values[field_name] = default
+        item.attribute_values.update(values)
+
         # check the hk and sk are provided if needed
-        self._validate_model()
+        item._validate_model()
 
         # populate item attributes.
-        resolved_fields = solve_template_values(self._fields(), values)
-        self.attribute_values.update(resolved_fields)
+        meta.template_plan.resolve(item.attribute_values)
+        for name, spec in meta.shards.items():
+            if name not in values:
+                item.attribute_values[name] = spec.apply(
+                    item.attribute_values[name], item.attribute_values
+                )
 
-        self.create_state = True
-        return self
+        item.create_state = True
+        return item
 
     def get(self, index_name: str = "primary") -> TItem:
         if not self.create_state:
@@ -143,6 +1212,11 @@ class Item:
         if index.sort_key:
             sort_key = self.attribute_values[index.sort_key.name]
 
+        # the stored hash key has its shard, get_by_key adds it back.
+        spec = self._sharding(index_name)
+        if spec is not None:
+            hash_key = spec.strip(hash_key)
+
         return self.get_by_key(hash_key, sort_key)
 
     def get_by_key(
@@ -150,41 +1224,209 @@ class Item:
         hash_key: Any,
         sort_key: Optional[Any] = None,
         index_name: str = "primary",
+        consistent_read: bool = False,
     ) -> TItem:
+        """Get an item by its key.
 
-        index = self.table_config["indexes"][index_name]
+        When the table has a cache it is checked first, unless `consistent_read`
+        is set, in which case the item is always read from the table. When the
+        table batches gets, the item is fetched along with the other gets made
+        at the same time using `BatchGetItem`.
 
-        dynamodb = boto3.resource("dynamodb", **self.client_config)
-        table = dynamodb.Table(self.table_config["table_name"])
+        When the hash key is sharded, pass the value without the shard, it is
+        found from the sort key.
+        """
 
-        key = {index.hash_key.name: hash_key}
-        if sort_key:
-            if index.sort_key:
-                key[index.sort_key.name] = sort_key
-            else:
-                raise ValueError(
-                    "Sort key is not defined on the table but has been provided."
-                )
+        key = self._key(hash_key, sort_key, index_name)
+
+        cached_item = self._cached_item(key, consistent_read)
+        if cached_item is not None:
+            return self._deserialize(cached_item)
+
+        with self._measure("get_item", index_name) as record:
+            loader = self._loader(key, index_name)
+            with record.phase("network"):
+                if loader is not None:
+                    item = loader.load(key, consistent_read)
+                    response = {"Item": item} if item is not None else {}
+                    shared = False
+                else:
+                    # TODO: this is basic at the moment and can support far more args.
+                    response, shared = self._coalesce(
+                        self._get_fingerprint(key, consistent_read),
+                        lambda: self._table().get_item(
+                            Key=key,
+                            ConsistentRead=consistent_read,
+                            **self._capacity_args(),
+                        ),
+                    )
+            # only the caller that sent a shared request records what it read.
+            if not shared:
+                record.response(response)
+
+            if "Item" in response:
+                with record.phase("deserialize"):
+                    found = self._deserialize(response["Item"])
+                if not shared:
+                    record.items = 1
+                    record.bytes = item_size(response["Item"])
 
-        # TODO: this is basic at the moment and can support far more args.
-        response = table.get_item(Key=key)
         if "Item" not in response:
             raise NoResultsFound("No item found for the provided key.")
 
-        response_item: Dict[str, Any] = response["Item"]
-        for field_name, field in self._fields().items():
-            if field_name in response_item:
-                self.attribute_values[field_name] = field.deserialize(
-                    response_item[field_name]
+        self._cache_items([response["Item"]])
+        return found
+
+    async def aget_by_key(
+        self,
+        hash_key: Any,
+        sort_key: Optional[Any] = None,
+        index_name: str = "primary",
+        consistent_read: bool = False,
+    ) -> TItem:
+        """The asyncio version of `get_by_key`."""
+
+        key = self._key(hash_key, sort_key, index_name)
+
+        cached_item = self._cached_item(key, consistent_read)
+        if cached_item is not None:
+            return self._deserialize(cached_item)
+
+        async def get_item() -> Dict[str, Any]:
+            client = await self._aclient()
+            return await client.get_item(
+                TableName=self.table_config["table_name"],
+                Key=to_dynamodb(key),
+                ConsistentRead=consistent_read,
+                **self._capacity_args(),
+            )
+
+        with self._measure("get_item", index_name) as record:
+            loader = self._loader(key, index_name)
+            with record.phase("network"):
+                if loader is not None:
+                    item = await loader.aload(key, consistent_read)
+                    shared = False
+                else:
+                    response, shared = await self._acoalesce(
+                        self._get_fingerprint(key, consistent_read), get_item
+                    )
+                    if not shared:
+                        record.response(response)
+
+            if loader is None:
+                with record.phase("deserialize"):
+                    item = (
+                        from_dynamodb(response["Item"]) if "Item" in response else None
+                    )
+
+            if item is not None:
+                with record.phase("deserialize"):
+                    found = self._deserialize(item)
+                if not shared:
+                    record.items = 1
+                    record.bytes = item_size(item)
+
+        if item is None:
+            raise NoResultsFound("No item found for the provided key.")
+
+        self._cache_items([item])
+        return found
+
+    def batch_get(
+        self,
+        keys: Sequence[Tuple[Any, ...]],
+        consistent_read: bool = False,
+        max_workers: int = 8,
+    ) -> List[Optional[TItem]]:
+        """Fetch many items by their primary key using `BatchGetItem`.
+
+        The keys are split into requests of 100 keys which are sent concurrently
+        on at most `max_workers` of the table's shared threads, see
+        `ClientRegistry.map`. Unprocessed keys are retried with a
+        jittered backoff. Keys found in the table's cache are not fetched,
+        unless `consistent_read` is set.
+
+        Args:
+            keys: `(hash_key, sort_key)` tuples, or `(hash_key,)` if the table
+                has no sort key.
+            consistent_read: Whether to use strongly consistent reads.
+            max_workers: The maximum number of requests to send at once.
+
+        Returns:
+            The items in the same order as `keys`, with `None` in place of any
+            key that was not found.
+        """
+
+        keys_to_fetch, cached_items = self._split_cached_keys(keys, consistent_read)
+
+        clients = self.table_config["clients"]
+        requests = list(chunk(keys_to_fetch, BATCH_GET_SIZE))
+
+        with self._measure("batch_get_item") as record:
+
+            def fetch(request_keys: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+                return batch_get_chunk(
+                    lambda: clients.resource(self.client_config),
+                    self.table_config["table_name"],
+                    request_keys,
+                    consistent_read=consistent_read,
+                    record=record,
+                    **self._capacity_args(),
                 )
-            else:
-                # no results returned for this field so remove it from the attr values.
-                try:
-                    self.attribute_values[field_name].pop()
-                except KeyError:
-                    pass
 
-        return self
+            response_items = []
+            with record.phase("network"):
+                for chunk_items in clients.map(fetch, requests, max_workers):
+                    response_items.extend(chunk_items)
+
+            self._cache_items(response_items)
+            with record.phase("deserialize"):
+                items = self._order_batch_results(keys, cached_items + response_items)
+            record.items = len(response_items)
+            record.bytes = sum(item_size(item) for item in response_items)
+        return items
+
+    async def abatch_get(
+        self,
+        keys: Sequence[Tuple[Any, ...]],
+        consistent_read: bool = False,
+        max_concurrency: int = 8,
+    ) -> List[Optional[TItem]]:
+        """The asyncio version of `batch_get`.
+
+        At most `max_concurrency` requests are in flight at once.
+        """
+
+        client = await self._aclient()
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        keys_to_fetch, cached_items = self._split_cached_keys(keys, consistent_read)
+
+        requests = chunk(keys_to_fetch, BATCH_GET_SIZE)
+        with self._measure("batch_get_item") as record:
+
+            async def fetch(request_keys: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+                async with semaphore:
+                    return await abatch_get_chunk(
+                        client,
+                        self.table_config["table_name"],
+                        request_keys,
+                        consistent_read=consistent_read,
+                        record=record,
+                        **self._capacity_args(),
+                    )
+
+            with record.phase("network"):
+                chunks = await asyncio.gather(*[fetch(request) for request in requests])
+
+            response_items = [item for chunk_items in chunks for item in chunk_items]
+            self._cache_items(response_items)
+            with record.phase("deserialize"):
+                items = self._order_batch_results(keys, cached_items + response_items)
+            record.items = len(response_items)
+            record.bytes = sum(item_size(item) for item in response_items)
+        return items
 
     def query(
         self,
@@ -199,10 +1441,549 @@ class Item:
         exclusive_start_key: Optional[Dict] = None,
         return_consumed_capacity: Optional[str] = None,
         projection_expression: Optional[str] = None,
-    ) -> ResultsSet:
+        paginate: bool = False,
+        max_items: Optional[int] = None,
+        prefetch: int = 0,
+        keys_only: bool = False,
+    ) -> Union[ResultsSet, MergedResultsSet]:
+        """Query the table, or one of its indexes, for items of this model.
+
+        By default only the first page of results is returned. Pass
+        `paginate=True` to lazily fetch the following pages as the results
+        are iterated over, and `max_items` to stop once that many items have
+        been returned. `prefetch` sets how many pages are fetched ahead on a
+        background thread while the current page is being consumed.
+
+        With `keys_only=True` only the key attributes are read, the values
+        embedded in their templates are then parsed back out of the keys.
+
+        When the hash key is sharded, pass the value without the shard. The
+        query is sent to every shard concurrently and the results are merged
+        back into sort key order, see `MergedResultsSet`.
+        """
+
+        shard_args = [
+            self._query_args(
+                hash_key_value=value,
+                key_condition=key_condition,
+                filter_expression=filter_expression,
+                limit=limit,
+                index=index,
+                select=select,
+                consistent_read=consistent_read,
+                scan_index_forward=scan_index_forward,
+                exclusive_start_key=exclusive_start_key,
+                return_consumed_capacity=return_consumed_capacity,
+                projection_expression=projection_expression,
+                max_items=max_items,
+                keys_only=keys_only,
+            )
+            for value in self._hash_key_values(
+                hash_key_value, index, exclusive_start_key
+            )
+        ]
+        return self._results(
+            shard_args, index, scan_index_forward, paginate, max_items, prefetch
+        )
+
+    def aquery(
+        self,
+        hash_key_value: Any,
+        key_condition: Optional[Condition] = None,
+        filter_expression: Optional[Condition] = None,
+        limit: Optional[int] = None,
+        index: Optional[str] = None,
+        select: Optional[str] = None,
+        consistent_read: bool = False,
+        scan_index_forward: bool = True,
+        exclusive_start_key: Optional[Dict] = None,
+        return_consumed_capacity: Optional[str] = None,
+        projection_expression: Optional[str] = None,
+        paginate: bool = False,
+        max_items: Optional[int] = None,
+        keys_only: bool = False,
+    ) -> Union[AsyncResultsSet, AsyncMergedResultsSet]:
+        """The asyncio version of `query`, iterate over the results with `async for`."""
+
+        shard_args = [
+            self._query_args(
+                hash_key_value=value,
+                key_condition=key_condition,
+                filter_expression=filter_expression,
+                limit=limit,
+                index=index,
+                select=select,
+                consistent_read=consistent_read,
+                scan_index_forward=scan_index_forward,
+                exclusive_start_key=exclusive_start_key,
+                return_consumed_capacity=return_consumed_capacity,
+                projection_expression=projection_expression,
+                max_items=max_items,
+                keys_only=keys_only,
+            )
+            for value in self._hash_key_values(
+                hash_key_value, index, exclusive_start_key
+            )
+        ]
+        return self._aresults(
+            shard_args, index, scan_index_forward, paginate, max_items
+        )
+
+    def prepare_query(
+        self,
+        key_condition: Optional[Condition] = None,
+        filter_expression: Optional[Condition] = None,
+        limit: Optional[int] = None,
+        index: Optional[str] = None,
+        select: Optional[str] = None,
+        consistent_read: bool = False,
+        scan_index_forward: bool = True,
+        return_consumed_capacity: Optional[str] = None,
+        projection_expression: Optional[str] = None,
+        keys_only: bool = False,
+    ) -> PreparedQuery:
+        """Build a query's expressions once, to run it many times with new values.
+
+        Conditions are built as usual, with a `Param` in place of each value
+        that changes between executions. Those values and the hash key are
+        passed to `PreparedQuery.execute`, nothing else is rebuilt per call.
+
+            prepared = model.prepare_query(
+                key_condition=model.sk.begins_with(Param("prefix"))
+            )
+            prepared.execute("#WORKORDER", {"prefix": "#ORG:1"})
+
+        The arguments are the same as `query`.
+        """
+
+        if return_consumed_capacity is None and self.table_config["metrics"]:
+            return_consumed_capacity = "TOTAL"
+
+        expression_attribute_names = None
+        if keys_only:
+            projection_expression, expression_attribute_names = key_projection(
+                self._projected_key_names(index)
+            )
+
+        args, placeholders = prepare_query_args(
+            hash_key=self.hash_key(index),
+            table_name=self.table_config["table_name"],
+            key_condition=key_condition,
+            filter_expression=filter_expression,
+            limit=limit,
+            index=index,
+            select=select,
+            consistent_read=consistent_read,
+            scan_index_forward=scan_index_forward,
+            return_consumed_capacity=return_consumed_capacity,
+            projection_expression=projection_expression,
+            expression_attribute_names=expression_attribute_names,
+        )
+        return PreparedQuery(model=self, args=args, placeholders=placeholders)
+
+    def count(
+        self,
+        hash_key_value: Any,
+        key_condition: Optional[Condition] = None,
+        filter_expression: Optional[Condition] = None,
+        index: Optional[str] = None,
+        consistent_read: bool = False,
+    ) -> QueryCount:
+        """Count the items a query matches, without reading them.
+
+        Sends `Select=COUNT` queries and follows every page, so only the
+        counts are returned by the table. When the hash key is sharded every
+        shard is counted concurrently. When the table holds other models and
+        has no type attribute to filter on, only the keys are read and the
+        rows of this model are counted here. The arguments are the same as
+        `query`.
+        """
+
+        shard_args, dispatch = self._count_args(
+            hash_key_value, key_condition, filter_expression, index, consistent_read
+        )
+        counts = self.table_config["clients"].map(
+            partial(self._count_pages, dispatch), shard_args
+        )
+        return sum(counts, QueryCount())
+
+    async def acount(
+        self,
+        hash_key_value: Any,
+        key_condition: Optional[Condition] = None,
+        filter_expression: Optional[Condition] = None,
+        index: Optional[str] = None,
+        consistent_read: bool = False,
+    ) -> QueryCount:
+        """The asyncio version of `count`."""
+
+        shard_args, dispatch = self._count_args(
+            hash_key_value, key_condition, filter_expression, index, consistent_read
+        )
+        counts = await asyncio.gather(
+            *[self._acount_pages(dispatch, args) for args in shard_args]
+        )
+        return sum(counts, QueryCount())
+
+    def count_scan(
+        self,
+        filter_expression: Optional[Condition] = None,
+        segments: int = 1,
+        workers: Optional[int] = None,
+        index: Optional[str] = None,
+        consistent_read: bool = False,
+    ) -> QueryCount:
+        """Count every item of this model in the table, or one of its indexes.
+
+        Sends `Select=COUNT` scans, split into `segments` that are scanned on
+        `workers` threads like `scan`. When the table holds other models and
+        has no type attribute to filter on, only the attribute that tells the
+        models apart is read and the rows of this model are counted here.
+        """
+
+        scan_args, dispatch = self._count_scan_args(
+            filter_expression, index, consistent_read
+        )
+        scan = ParallelScan(
+            scan=self._scan,
+            scan_args=scan_args,
+            segments=segments,
+            workers=workers,
+        )
+        return sum(
+            (self._page_count(page, dispatch) for page in scan.pages()), QueryCount()
+        )
+
+    async def acount_scan(
+        self,
+        filter_expression: Optional[Condition] = None,
+        segments: int = 1,
+        workers: Optional[int] = None,
+        index: Optional[str] = None,
+        consistent_read: bool = False,
+    ) -> QueryCount:
+        """The asyncio version of `count_scan`, the segments are scanned by tasks."""
+
+        scan_args, dispatch = self._count_scan_args(
+            filter_expression, index, consistent_read
+        )
+        scan = AsyncParallelScan(
+            scan=self._ascan,
+            scan_args=scan_args,
+            segments=segments,
+            workers=workers,
+        )
+        total = QueryCount()
+        async for page in scan.pages():
+            total += self._page_count(page, dispatch)
+        return total
+
+    def scan(
+        self,
+        filter_expression: Optional[Condition] = None,
+        segments: int = 1,
+        workers: Optional[int] = None,
+        limit: Optional[int] = None,
+        index: Optional[str] = None,
+        consistent_read: bool = False,
+        queue_size: int = 8,
+    ) -> ScanResultsSet:
+        """Scan the table, or one of its indexes, for every item of this model.
+
+        The table is split into `segments` which are scanned on `workers`
+        threads, the items are returned as the pages arrive, in no particular
+        order. Rows of other models in the table are skipped.
+
+        Args:
+            filter_expression: Only return the items that match the condition.
+            segments: The number of segments to split the table into.
+            workers: The number of segments to scan at once, defaults to `segments`.
+            limit: The number of rows to read in each request.
+            index: The name of the index to scan.
+            consistent_read: Whether to use strongly consistent reads.
+            queue_size: The number of pages to read ahead of the consumer.
+        """
+
+        scan = ParallelScan(
+            scan=self._scan,
+            scan_args=self._scan_args(filter_expression, limit, index, consistent_read),
+            segments=segments,
+            workers=workers,
+            queue_size=queue_size,
+        )
+        return ScanResultsSet(model=self, scan=scan, dispatch=self._scan_dispatch())
+
+    def ascan(
+        self,
+        filter_expression: Optional[Condition] = None,
+        segments: int = 1,
+        workers: Optional[int] = None,
+        limit: Optional[int] = None,
+        index: Optional[str] = None,
+        consistent_read: bool = False,
+        queue_size: int = 8,
+    ) -> AsyncScanResultsSet:
+        """The asyncio version of `scan`, the segments are scanned by tasks."""
+
+        scan = AsyncParallelScan(
+            scan=self._ascan,
+            scan_args=self._scan_args(filter_expression, limit, index, consistent_read),
+            segments=segments,
+            workers=workers,
+            queue_size=queue_size,
+        )
+        return AsyncScanResultsSet(
+            model=self, scan=scan, dispatch=self._scan_dispatch()
+        )
+
+    def _scan_args(
+        self,
+        filter_expression: Optional[Condition],
+        limit: Optional[int],
+        index: Optional[str],
+        consistent_read: bool,
+    ) -> Dict[str, Any]:
+        return parse_scan_args(
+            table_name=self.table_config["table_name"],
+            filter_expression=filter_expression,
+            limit=limit,
+            index=index,
+            consistent_read=consistent_read,
+        )
+
+    def _count_args(
+        self,
+        hash_key_value: Any,
+        key_condition: Optional[Condition],
+        filter_expression: Optional[Condition],
+        index: Optional[str],
+        consistent_read: bool,
+    ) -> Tuple[List[Dict[str, Any]], Optional[Callable[[Dict[str, Any]], Any]]]:
+        """Get the arguments of the counting query of every shard, and the
+        function that finds the rows of this model when the table has to tell
+        them apart."""
+        select, keys_only = "COUNT", False
+        dispatch = self._scan_dispatch()
+        if dispatch is not None:
+            type_condition = self.table_config["dispatcher"].type_condition(self)
+            if type_condition is None:
+                # the rows are told apart by their sort key, which has to be read.
+                select, keys_only = None, True
+            else:
+                filter_expression = (
+                    type_condition & filter_expression
+                    if filter_expression
+                    else type_condition
+                )
+                dispatch = None
+
+        shard_args = [
+            self._query_args(
+                hash_key_value=value,
+                key_condition=key_condition,
+                filter_expression=filter_expression,
+                limit=None,
+                index=index,
+                select=select,
+                consistent_read=consistent_read,
+                scan_index_forward=True,
+                exclusive_start_key=None,
+                return_consumed_capacity=None,
+                projection_expression=None,
+                max_items=None,
+                keys_only=keys_only,
+            )
+            for value in self._hash_key_values(hash_key_value, index, None)
+        ]
+        return shard_args, dispatch
+
+    def _count_pages(
+        self,
+        dispatch: Optional[Callable[[Dict[str, Any]], Any]],
+        args: Dict[str, Any],
+    ) -> QueryCount:
+        total = QueryCount()
+        while True:
+            response = self._query(args)
+            total += self._page_count(response, dispatch)
+            if not response.get("LastEvaluatedKey"):
+                return total
+            args = {**args, "ExclusiveStartKey": response["LastEvaluatedKey"]}
+
+    async def _acount_pages(
+        self,
+        dispatch: Optional[Callable[[Dict[str, Any]], Any]],
+        args: Dict[str, Any],
+    ) -> QueryCount:
+        total = QueryCount()
+        while True:
+            response = await self._aquery(args)
+            total += self._page_count(response, dispatch)
+            if not response.get("LastEvaluatedKey"):
+                return total
+            args = {**args, "ExclusiveStartKey": response["LastEvaluatedKey"]}
+
+    def _count_scan_args(
+        self,
+        filter_expression: Optional[Condition],
+        index: Optional[str],
+        consistent_read: bool,
+    ) -> Tuple[Dict[str, Any], Optional[Callable[[Dict[str, Any]], Any]]]:
+        """Get the arguments of a counting scan, and the function that finds the
+        rows of this model when the table has to tell them apart."""
+        dispatch = self._scan_dispatch()
+        if dispatch is not None:
+            dispatcher = self.table_config["dispatcher"]
+            type_condition = dispatcher.type_condition(self)
+            if type_condition is None:
+                projection_expression, names = key_projection(dispatcher.projection())
+                scan_args = parse_scan_args(
+                    table_name=self.table_config["table_name"],
+                    filter_expression=filter_expression,
+                    index=index,
+                    consistent_read=consistent_read,
+                    projection_expression=projection_expression,
+                    expression_attribute_names=names,
+                )
+                return scan_args, dispatch
+
+            filter_expression = (
+                type_condition & filter_expression
+                if filter_expression
+                else type_condition
+            )
+
+        scan_args = self._scan_args(filter_expression, None, index, consistent_read)
+        return {**scan_args, "Select": "COUNT"}, None
+
+    @staticmethod
+    def _page_count(
+        response: Dict[str, Any],
+        dispatch: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    ) -> QueryCount:
+        if dispatch is None:
+            return QueryCount(response["Count"], response["ScannedCount"])
+        count = sum(1 for row in response["Items"] if dispatch(row) is not None)
+        return QueryCount(count, response["ScannedCount"])
+
+    def _scan_dispatch(self) -> Optional[Callable[[Dict[str, Any]], Optional[TItem]]]:
+        """Skips the rows of the other models, when the table has more than one."""
+        dispatcher = self.table_config.get("dispatcher")
+        if dispatcher is None or len(self.table_config["model_keys"]) < 2:
+            return None
+
+        def dispatch(row: Dict[str, Any]) -> Optional[TItem]:
+            model = dispatcher.dispatch(row)
+            return self if model is not None and type(model) is type(self) else None
+
+        return dispatch
+
+    def _hash_key_values(
+        self,
+        hash_key_value: Any,
+        index: Optional[str],
+        exclusive_start_key: Optional[Dict],
+    ) -> List[Any]:
+        """Get the hash key of every shard a query has to be sent to."""
+        spec = self._sharding(index)
+        if spec is None:
+            return [hash_key_value]
+
+        if exclusive_start_key is not None:
+            raise ValueError(
+                "exclusive_start_key can't be used to query a sharded hash key."
+            )
+        return spec.all_values(hash_key_value)
+
+    def _sort_key_name(self, index: Optional[str]) -> Optional[str]:
+        _, sort_key = self.table_config["model_keys"][self.__class__][
+            index or "primary"
+        ]
+        return sort_key.name if sort_key else None
+
+    def _results(
+        self,
+        shard_args: List[Dict[str, Any]],
+        index: Optional[str],
+        scan_index_forward: bool,
+        paginate: bool,
+        max_items: Optional[int],
+        prefetch: int,
+    ) -> Union[ResultsSet, MergedResultsSet]:
+        """Send the query of every shard and collect their results."""
+        results_set = partial(
+            ResultsSet,
+            self,
+            paginate=paginate,
+            max_items=max_items,
+            prefetch=prefetch if paginate else 0,
+        )
+        if len(shard_args) > 1:
+            # the first page of every shard is fetched at the same time.
+            return MergedResultsSet(
+                results_sets=self.table_config["clients"].map(results_set, shard_args),
+                sort_key_name=self._sort_key_name(index),
+                reverse=not scan_index_forward,
+                max_items=max_items,
+            )
+
+        return results_set(shard_args[0])
+
+    def _aresults(
+        self,
+        shard_args: List[Dict[str, Any]],
+        index: Optional[str],
+        scan_index_forward: bool,
+        paginate: bool,
+        max_items: Optional[int],
+    ) -> Union[AsyncResultsSet, AsyncMergedResultsSet]:
+        results_sets = [
+            AsyncResultsSet(
+                model=self, query_args=args, paginate=paginate, max_items=max_items
+            )
+            for args in shard_args
+        ]
+        if len(results_sets) == 1:
+            return results_sets[0]
+
+        return AsyncMergedResultsSet(
+            results_sets=results_sets,
+            sort_key_name=self._sort_key_name(index),
+            reverse=not scan_index_forward,
+            max_items=max_items,
+        )
+
+    def _query_args(
+        self,
+        hash_key_value: Any,
+        key_condition: Optional[Condition],
+        filter_expression: Optional[Condition],
+        limit: Optional[int],
+        index: Optional[str],
+        select: Optional[str],
+        consistent_read: bool,
+        scan_index_forward: bool,
+        exclusive_start_key: Optional[Dict],
+        return_consumed_capacity: Optional[str],
+        projection_expression: Optional[str],
+        max_items: Optional[int],
+        keys_only: bool,
+    ) -> Dict[str, Any]:
+        # there is no point reading more items than we are going to return.
+        if max_items is not None and (limit is None or limit > max_items):
+            limit = max_items
+
+        if return_consumed_capacity is None and self.table_config["metrics"]:
+            return_consumed_capacity = "TOTAL"
+
+        expression_attribute_names = None
+        if keys_only:
+            projection_expression, expression_attribute_names = key_projection(
+                self._projected_key_names(index)
+            )
 
         # TODO: need to consider how these args change the response.
-        args = parse_query_args(
+        return parse_query_args(
             hash_key=self.hash_key(index),
             hash_key_value=hash_key_value,
             table_name=self.table_config["table_name"],
@@ -216,10 +1997,5 @@ class Item:
             exclusive_start_key=exclusive_start_key,
             return_consumed_capacity=return_consumed_capacity,
             projection_expression=projection_expression,
+            expression_attribute_names=expression_attribute_names,
         )
-
-        # TODO: Update this so it automatically fetches more results for us if a limit is not provided.
-        client = boto3.client("dynamodb", **self.client_config)
-        response = client.query(**args)
-
-        return ResultsSet(model=self, response=response)
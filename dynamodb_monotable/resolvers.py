@@ -1,69 +1,171 @@
 """Module to hold all of the code for resolving attribute values."""
 
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Mapping, Optional, Pattern, Tuple
 
 from dynamodb_monotable.attributes import Attribute
 
 REPLACEMENT_PATTERN = re.compile(r"\${(?P<name>[A-Za-z\d_]+)}")
 
 
-def _get_replacement_fields(v: str, /) -> List[str]:
-    if not isinstance(v, str):
-        return []
-    return REPLACEMENT_PATTERN.findall(v)
-
-
-def _field_count(v: str, /) -> int:
-    return len(_get_replacement_fields(v))
-
-
-def _try_format_values(format_string: str, values: Dict[str, str]) -> str:
-    for k, v in values.items():
-        format_string = format_string.replace(f"${{{k}}}", str(v))
-    return format_string
+class CompiledTemplate:
+    """A template such as `#ORG:${org_id}`, split once into literals and placeholders.
+
+    Args:
+        name: The name of the attribute the template belongs to.
+        template: The template, values that are not strings are used as is.
+    """
+
+    def __init__(self, name: str, template: Any):
+        self.name = name
+        self.template = template
+
+        if isinstance(template, str):
+            parts = REPLACEMENT_PATTERN.split(template)
+            self.literals: Tuple[str, ...] = tuple(parts[0::2])
+            self.placeholders: Tuple[str, ...] = tuple(parts[1::2])
+        else:
+            self.literals = ()
+            self.placeholders = ()
+
+        self._pattern = self._compile_pattern() if self.placeholders else None
+
+    def format(self, values: Mapping[str, Any]) -> Any:
+        """Fill in the placeholders, any without a value are left as they are."""
+        if not self.placeholders:
+            return self.template
+
+        parts = [self.literals[0]]
+        for placeholder, literal in zip(self.placeholders, self.literals[1:]):
+            if placeholder in values:
+                parts.append(str(values[placeholder]))
+            else:
+                parts.append(f"${{{placeholder}}}")
+            parts.append(literal)
+        return "".join(parts)
+
+    def parse(self, value: str) -> Optional[Dict[str, str]]:
+        """Recover the placeholder values from a value created by the template.
+
+        Returns None if the value doesn't match the template.
+        """
+        if self._pattern is None:
+            return None
+
+        match = self._pattern.fullmatch(value)
+        return match.groupdict() if match else None
+
+    # private api starts here.
+
+    def _compile_pattern(self) -> Pattern:
+        parts = [re.escape(self.literals[0])]
+        seen = set()
+        for placeholder, literal in zip(self.placeholders, self.literals[1:]):
+            if placeholder in seen:
+                parts.append(f"(?P={placeholder})")
+            else:
+                parts.append(f"(?P<{placeholder}>.*?)")
+                seen.add(placeholder)
+            parts.append(re.escape(literal))
+        return re.compile("".join(parts), re.DOTALL)
+
+
+class TemplatePlan:
+    """Resolves the template attributes of a model in a single pass.
+
+    The templates are compiled once and ordered so every template comes after
+    the templates it depends on.
+
+    Args:
+        attributes: The attributes of the model keyed by their name.
+
+    Raises:
+        ValueError: If the templates depend on each other in a cycle.
+    """
+
+    def __init__(self, attributes: Mapping[str, Attribute]):
+        templates = {
+            name: CompiledTemplate(name, attribute.value)
+            for name, attribute in attributes.items()
+            if attribute.value is not None
+        }
+        self.steps: Tuple[CompiledTemplate, ...] = tuple(
+            templates[name] for name in _dependency_order(templates)
+        )
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return tuple(step.name for step in self.steps)
+
+    def parse(self, values: Mapping[str, Any]) -> Dict[str, str]:
+        """Recover the values that were used to resolve the templates in `values`.
+
+        Templates are parsed in reverse order, so values embedded in templates
+        that were themselves embedded in another template are also recovered.
+        Only values that are not already in `values` are returned.
+        """
+        found: Dict[str, str] = {}
+        for step in reversed(self.steps):
+            value = values.get(step.name, found.get(step.name))
+            if not isinstance(value, str):
+                continue
+
+            for name, placeholder_value in (step.parse(value) or {}).items():
+                if name not in values and name not in found:
+                    found[name] = placeholder_value
+        return found
+
+    def dependents(self, names: Iterable[str]) -> List[str]:
+        """Find the templates that embed any of `names`, directly or through
+        another template, in the order they are resolved in."""
+        changed = set(names)
+        found = []
+        for step in self.steps:
+            if step.name not in changed and changed.intersection(step.placeholders):
+                changed.add(step.name)
+                found.append(step.name)
+        return found
+
+    def resolve(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """Add the value of every template attribute that isn't already in `values`."""
+        for step in self.steps:
+            if step.name not in values:
+                values[step.name] = step.format(values)
+        return values
 
 
-def _create_key_to_field_count(attributes: List[Attribute]) -> dict:
-    return {
-        attr.name: _field_count(attr.value)
-        for attr in sorted(attributes, key=lambda item: _field_count(item.value))
-    }
+def _dependency_order(templates: Dict[str, CompiledTemplate]) -> List[str]:
+    """Order the templates so their dependencies come first, failing on cycles."""
+    order = []
+    visited = set()
+    path: List[str] = []
 
+    def visit(name: str) -> None:
+        if name in visited:
+            return
+        if name in path:
+            cycle = " -> ".join(path[path.index(name) :] + [name])
+            raise ValueError(f"Templates depend on each other in a cycle: {cycle}")
 
-def _replace_placeholders(
-    field_by_replacement_count: Dict[str, int],
-    attributes: List[Attribute],
-    values: Dict[str, Any],
-) -> Dict[str, str]:
-    lowest_replacements = min(field_by_replacement_count.values())
-    replacements = {
-        k for k, v in field_by_replacement_count.items() if v == lowest_replacements
-    }
+        path.append(name)
+        for placeholder in templates[name].placeholders:
+            if placeholder in templates:
+                visit(placeholder)
+        path.pop()
 
-    for attr_name in replacements:
-        unformatted_placeholder_string = [a for a in attributes if a.name == attr_name][
-            0
-        ].value
-        formatted_value = _try_format_values(unformatted_placeholder_string, values)
-        values.update({attr_name: formatted_value})
+        visited.add(name)
+        order.append(name)
 
-    return values
+    for name in templates:
+        visit(name)
+    return order
 
 
 def solve_template_values(
-    fields: Dict[str, Attribute], values: Dict[str, Any]
+    fields: Mapping[str, Attribute], values: Dict[str, Any]
 ) -> Dict[str, Any]:
+    """Resolve the template attributes of `fields` using `values`.
 
-    # check if there are any fields we need to solve.
-    fields_to_solve = [f for f in fields.values() if f.name not in values]
-    if not fields_to_solve:
-        return values
-
-    fields_by_replacements_count = _create_key_to_field_count(fields_to_solve)
-    values = _replace_placeholders(
-        fields_by_replacements_count, fields_to_solve, values
-    )
-
-    # values.update({k: v.value for k, v in fields.items() if _field_count(v.value) == 0})
-    return solve_template_values(fields, values)
+    Models compile their plan once, this builds a new one on every call.
+    """
+    return TemplatePlan(fields).resolve(values)
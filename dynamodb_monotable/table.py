@@ -1,11 +1,31 @@
 import re
-from typing import Dict, TypeVar, List, Type
+from typing import Any, Dict, TypeVar, List, Type, Optional, Sequence, Tuple
 
 from pydantic import BaseModel, root_validator
-import boto3
 
 from dynamodb_monotable.indexes import Index
-from dynamodb_monotable.models import Item
+from dynamodb_monotable.core.clients import Backend, ClientRegistry
+from dynamodb_monotable.core.batch import AsyncBatchWriter, BatchWriter
+from dynamodb_monotable.core.dispatch import ModelDispatcher
+from dynamodb_monotable.core.cache import ItemCache, item_size
+from dynamodb_monotable.core.singleflight import SingleFlight
+from dynamodb_monotable.core.loader import ItemLoader
+from dynamodb_monotable.core.backfill import Backfill
+from dynamodb_monotable.core.serializers import to_dynamodb
+from dynamodb_monotable.core.metrics import (
+    Metrics,
+    MetricsSink,
+    OperationRecord,
+    capacity_args,
+    measure,
+)
+from dynamodb_monotable.core.ratelimit import RateLimiter
+from dynamodb_monotable.core.transactions import (
+    TRANSACTION_MAX_ITEMS,
+    Transaction,
+)
+from dynamodb_monotable.attributes import Condition
+from dynamodb_monotable.models import Item, ResultsSet
 
 ModelName = TypeVar("ModelName", bound=str)
 AttrName = TypeVar("AttrName", bound=str)
@@ -17,6 +37,10 @@ class TableSchema(BaseModel):
     indexes: Dict[str, Index]
     models: List[Type[Item]]
 
+    # the attribute that holds the type of each item, when it isn't set the
+    # type is found from the prefix of the sort key.
+    type_attribute: Optional[str] = None
+
     @root_validator()
     def check_primary_index_provided(cls, values: Dict):
         if "primary" not in values["indexes"]:
@@ -63,11 +87,59 @@ class TableSchema(BaseModel):
 
 
 class Table:
-    def __init__(self, name: str, schema: TableSchema, client_config: Dict = None):
+    def __init__(
+        self,
+        name: str,
+        schema: TableSchema,
+        client_config: Dict = None,
+        max_pool_connections: int = 10,
+        tcp_keepalive: bool = True,
+        cache: Optional[ItemCache] = None,
+        coalesce_reads: bool = False,
+        batch_gets: bool = False,
+        batch_window: float = 0.002,
+        metrics: Optional[Sequence[MetricsSink]] = None,
+        backend: Optional[Backend] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
         self.name = name
         self.schema = schema
         self.client_config = client_config if client_config else {}
 
+        # items fetched by key are read through the cache, see `LRUCache`.
+        self.cache = cache
+
+        # every request sent to the table is recorded by the sinks.
+        self.metrics = Metrics(metrics) if metrics else None
+
+        # concurrent identical gets and queries share one request when enabled.
+        self.single_flight = SingleFlight() if coalesce_reads else None
+
+        # shared by every model we hand out, so clients are only created once.
+        # the clients come from the backend instead of boto3 when there is one,
+        # and every request they send waits for the rate limiter.
+        self.clients = ClientRegistry(
+            max_pool_connections=max_pool_connections,
+            tcp_keepalive=tcp_keepalive,
+            backend=backend,
+            rate_limiter=rate_limiter,
+        )
+
+        # gets by key made within `batch_window` seconds of each other are sent
+        # as one `BatchGetItem` request when enabled.
+        self.loader = (
+            ItemLoader(
+                clients=self.clients,
+                client_config=self.client_config,
+                table_name=self.name,
+                key_names=self._key_names(),
+                window=batch_window,
+                metrics=self.metrics,
+            )
+            if batch_gets
+            else None
+        )
+
         self.table_config = {
             "table_name": self.name,
             "key_schema": {
@@ -75,10 +147,29 @@ class Table:
                 "sort_key": self.schema.indexes["primary"].sort_key,
             },
             "indexes": self.schema.indexes,
+            "clients": self.clients,
+            "cache": self.cache,
+            "single_flight": self.single_flight,
+            "loader": self.loader,
+            "metrics": self.metrics,
+            # the key attributes of every model, for every index.
+            "model_keys": {
+                model: model._meta.index_keys(self.schema.indexes)
+                for model in self.schema.models
+            },
         }
 
+        # finds the model each row of an item collection belongs to.
+        sort_key = self.schema.indexes["primary"].sort_key
+        self._dispatcher = ModelDispatcher(
+            models=[self.get_model(model) for model in self.schema.models],
+            sort_key_name=sort_key.name if sort_key else None,
+            type_attribute=self.schema.type_attribute,
+        )
+        self.table_config["dispatcher"] = self._dispatcher
+
     def create_table(self) -> None:
-        client = boto3.client("dynamodb", **self.client_config)
+        client = self.clients.client(self.client_config)
         client.create_table(
             TableName=self.name,
             KeySchema=self.schema.get_key_schema(),
@@ -87,7 +178,7 @@ class Table:
         )
 
     def delete_table(self) -> None:
-        client = boto3.client("dynamodb", **self.client_config)
+        client = self.clients.client(self.client_config)
         client.delete_table(TableName=self.name)
 
     def get_model(self, model_class: TypedModel) -> TypedModel:
@@ -98,3 +189,209 @@ class Table:
             return model(self.table_config, self.client_config)
         except IndexError:
             raise ValueError(f"Model of type {model_class} does not exist")
+
+    def query_collection(
+        self,
+        hash_key_value: Any,
+        key_condition: Optional[Condition] = None,
+        filter_expression: Optional[Condition] = None,
+        limit: Optional[int] = None,
+        consistent_read: bool = False,
+        scan_index_forward: bool = True,
+        exclusive_start_key: Optional[Dict] = None,
+        paginate: bool = False,
+        max_items: Optional[int] = None,
+        prefetch: int = 0,
+    ) -> ResultsSet:
+        """Query an item collection that holds items of many models.
+
+        Each row is returned as an item of the model it belongs to, found
+        through `TableSchema.type_attribute` or the prefix of the sort key.
+        Rows that don't belong to any model of the table are skipped. See
+        `Item.query` for the arguments.
+        """
+
+        # every model shares the table's keys, so any of them can build the query.
+        model = self.get_model(self.schema.models[0])
+        args = model._query_args(
+            hash_key_value=hash_key_value,
+            key_condition=key_condition,
+            filter_expression=filter_expression,
+            limit=limit,
+            index=None,
+            select=None,
+            consistent_read=consistent_read,
+            scan_index_forward=scan_index_forward,
+            exclusive_start_key=exclusive_start_key,
+            return_consumed_capacity=None,
+            projection_expression=None,
+            # rows of no model are skipped, so the page can't stop at max_items.
+            max_items=None,
+            keys_only=False,
+        )
+        return ResultsSet(
+            model=model,
+            query_args=args,
+            paginate=paginate,
+            max_items=max_items,
+            prefetch=prefetch if paginate else 0,
+            dispatch=self._dispatcher.dispatch,
+        )
+
+    def batch_get(
+        self, model_class: TypedModel, keys: Sequence[Tuple[Any, ...]], **kwargs
+    ) -> List[Optional[TypedModel]]:
+        """Fetch many items of a model by their primary key, see `Item.batch_get`."""
+        return self.get_model(model_class).batch_get(keys, **kwargs)
+
+    async def abatch_get(
+        self, model_class: TypedModel, keys: Sequence[Tuple[Any, ...]], **kwargs
+    ) -> List[Optional[TypedModel]]:
+        """The asyncio version of `batch_get`, see `Item.abatch_get`."""
+        return await self.get_model(model_class).abatch_get(keys, **kwargs)
+
+    def backfill(
+        self, model_class: TypedModel, checkpoint_path: str, **kwargs
+    ) -> Dict[str, int]:
+        """Write the missing attributes of the items of a model, see `Backfill`.
+
+        Usage:
+            table.backfill(Workorder, "workorder-backfill.json", max_wcu=100)
+        """
+        return Backfill(self.get_model(model_class), checkpoint_path, **kwargs).run()
+
+    def transaction(self) -> Transaction:
+        """Create a transaction that writes many items atomically, see `Transaction`.
+
+        Usage:
+            with table.transaction() as transaction:
+                transaction.put(workorder)
+                transaction.update(task)
+                transaction.delete(old_task)
+        """
+        return Transaction(
+            clients=self.clients,
+            client_config=self.client_config,
+            key_names=self._key_names(),
+            cache=self.cache,
+            table_name=self.name,
+            metrics=self.metrics,
+        )
+
+    def transact_get(
+        self, requests: Sequence[Tuple[Type[Item], Tuple[Any, ...]]]
+    ) -> List[Optional[Item]]:
+        """Read up to 100 items of any model with one `TransactGetItems`.
+
+        The items are read as they were at a single point in time.
+
+        Args:
+            requests: `(model_class, (hash_key, sort_key))` tuples.
+
+        Returns:
+            The items in the same order as `requests`, with `None` in place of
+            any item that was not found.
+        """
+        models, transact_items = self._transact_get_request(requests)
+        client = self.clients.client(self.client_config)
+        with self._measure("transact_get_items") as record:
+            with record.phase("network"):
+                response = client.transact_get_items(
+                    TransactItems=transact_items, **capacity_args(self.metrics)
+                )
+            record.response(response)
+            with record.phase("deserialize"):
+                results = self._transact_get_results(models, response)
+            self._record_items(record, response)
+        return results
+
+    async def atransact_get(
+        self, requests: Sequence[Tuple[Type[Item], Tuple[Any, ...]]]
+    ) -> List[Optional[Item]]:
+        """The asyncio version of `transact_get`."""
+        models, transact_items = self._transact_get_request(requests)
+        client = await self.clients.aclient(self.client_config)
+        with self._measure("transact_get_items") as record:
+            with record.phase("network"):
+                response = await client.transact_get_items(
+                    TransactItems=transact_items, **capacity_args(self.metrics)
+                )
+            record.response(response)
+            with record.phase("deserialize"):
+                results = self._transact_get_results(models, response)
+            self._record_items(record, response)
+        return results
+
+    def batch_writer(self, parallelism: int = 8) -> BatchWriter:
+        """Create a writer that saves items in batches, see `BatchWriter`.
+
+        Usage:
+            with table.batch_writer(parallelism=8) as writer:
+                writer.put(item)
+        """
+        return BatchWriter(
+            clients=self.clients,
+            client_config=self.client_config,
+            table_name=self.name,
+            key_names=self._key_names(),
+            parallelism=parallelism,
+            cache=self.cache,
+            metrics=self.metrics,
+        )
+
+    def abatch_writer(self, parallelism: int = 8) -> AsyncBatchWriter:
+        """The asyncio version of `batch_writer`, see `AsyncBatchWriter`."""
+        return AsyncBatchWriter(
+            clients=self.clients,
+            client_config=self.client_config,
+            table_name=self.name,
+            key_names=self._key_names(),
+            parallelism=parallelism,
+            cache=self.cache,
+            metrics=self.metrics,
+        )
+
+    async def aclose(self) -> None:
+        """Close the asyncio clients, call this before the event loop is closed."""
+        await self.clients.aclose()
+
+    # private api starts here.
+
+    def _transact_get_request(
+        self, requests: Sequence[Tuple[Type[Item], Tuple[Any, ...]]]
+    ) -> Tuple[List[Item], List[Dict[str, Any]]]:
+        if len(requests) > TRANSACTION_MAX_ITEMS:
+            raise ValueError(
+                f"A transaction can read at most {TRANSACTION_MAX_ITEMS} items, "
+                f"got {len(requests)}."
+            )
+
+        models = [self.get_model(model_class) for model_class, _ in requests]
+        transact_items = [
+            {"Get": {"TableName": self.name, "Key": to_dynamodb(model._key(*key))}}
+            for model, (_, key) in zip(models, requests)
+        ]
+        return models, transact_items
+
+    def _measure(self, operation: str):
+        return measure(self.metrics, operation, self.name)
+
+    @staticmethod
+    def _record_items(record: OperationRecord, response: Dict[str, Any]) -> None:
+        items = [result["Item"] for result in response["Responses"] if "Item" in result]
+        record.items = len(items)
+        record.bytes = sum(item_size(item) for item in items)
+
+    def _transact_get_results(
+        self, models: List[Item], response: Dict[str, Any]
+    ) -> List[Optional[Item]]:
+        return [
+            model._from_query_item(result["Item"]) if "Item" in result else None
+            for model, result in zip(models, response["Responses"])
+        ]
+
+    def _key_names(self) -> List[str]:
+        key_names = [self.schema.indexes["primary"].hash_key.name]
+        if self.schema.indexes["primary"].sort_key:
+            key_names.append(self.schema.indexes["primary"].sort_key.name)
+        return key_names
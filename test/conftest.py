@@ -1,15 +1,37 @@
-from typing import Tuple
+import socket
+from typing import Optional, Tuple
 
 import boto3
 import pytest
+import requests
 from moto import mock_dynamodb
+from moto.server import ThreadedMotoServer
 
+from dynamodb_monotable.core.clients import Backend
+from dynamodb_monotable.core.memory import MemoryBackend
 from dynamodb_monotable.table import Table, TableSchema
 from .testing_models import Workorder
 
 
+def pytest_addoption(parser):
+    parser.addoption(
+        "--backend",
+        choices=("moto", "memory"),
+        default="moto",
+        help="Run the tables of the tests against moto or the in-memory backend.",
+    )
+
+
 @pytest.fixture(autouse=True)
-def mock_db():
+def aws_credentials(monkeypatch):
+    # make sure moto is used and we never pick up real credentials.
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+
+
+@pytest.fixture(autouse=True)
+def mock_db(aws_credentials):
     with mock_dynamodb():
         yield
 
@@ -20,21 +42,36 @@ def table_name() -> str:
 
 
 @pytest.fixture
-def create_basic_table(table_name: str) -> Tuple[Table, Workorder]:
-    # create a basic table using boto3
-    client = boto3.client("dynamodb")
-    client.create_table(
-        TableName=table_name,
-        KeySchema=[
-            {"AttributeName": "hk", "KeyType": "HASH"},
-            {"AttributeName": "sk", "KeyType": "RANGE"},
-        ],
-        AttributeDefinitions=[
-            {"AttributeName": "hk", "AttributeType": "S"},
-            {"AttributeName": "sk", "AttributeType": "S"},
-        ],
-        BillingMode="PAY_PER_REQUEST",
-    )
+def backend(request) -> Optional[Backend]:
+    """The backend of the test tables, None when they use moto through boto3.
+
+    Run the suite with `--backend memory` to test against `MemoryBackend`,
+    tables built in a test should pass on `table.clients.backend`.
+    """
+    if request.config.getoption("--backend") == "memory":
+        return MemoryBackend()
+    return None
+
+
+@pytest.fixture
+def create_basic_table(
+    table_name: str, backend: Optional[Backend]
+) -> Tuple[Table, Workorder]:
+    if backend is None:
+        # create a basic table using boto3
+        client = boto3.client("dynamodb")
+        client.create_table(
+            TableName=table_name,
+            KeySchema=[
+                {"AttributeName": "hk", "KeyType": "HASH"},
+                {"AttributeName": "sk", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "hk", "AttributeType": "S"},
+                {"AttributeName": "sk", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
 
     table = Table(
         name=table_name,
@@ -56,6 +93,48 @@ def create_basic_table(table_name: str) -> Tuple[Table, Workorder]:
                 "models": [Workorder],
             }
         ),
+        backend=backend,
+    )
+    if backend is not None:
+        table.create_table()
+
+    return table, Workorder
+
+
+@pytest.fixture(scope="session")
+def moto_server() -> str:
+    """Run moto as a server, the asyncio clients can't be mocked in process."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    yield f"http://127.0.0.1:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def create_server_table(moto_server: str, table_name: str) -> Tuple[Table, Workorder]:
+    # start every test with an empty server.
+    requests.post(f"{moto_server}/moto-api/reset")
+
+    table = Table(
+        name=table_name,
+        schema=TableSchema(
+            **{
+                "indexes": {
+                    "primary": {
+                        "hash_key": {"name": "hk", "type": "S"},
+                        "sort_key": {"name": "sk", "type": "S"},
+                        "index_type": "primary",
+                    },
+                },
+                "models": [Workorder],
+            }
+        ),
+        client_config={"endpoint_url": moto_server},
     )
+    table.create_table()
 
     return table, Workorder
@@ -0,0 +1,112 @@
+import asyncio
+from datetime import datetime
+from typing import Tuple
+
+from dynamodb_monotable.table import Table
+from .testing_models import Workorder
+
+
+def test_can_save_and_get_item(create_server_table: Tuple[Table, Workorder]):
+    table, item_schema = create_server_table
+
+    async def main():
+        model = table.get_model(item_schema)
+        await model.create(
+            org_id=123, workorder_id=456, date_created=datetime.utcnow()
+        ).asave()
+
+        fetched_model = await model.aget_by_key(
+            hash_key="#WORKORDER", sort_key="#ORG:123#WORKORDER:456"
+        )
+        await table.aclose()
+        return fetched_model
+
+    fetched_model = asyncio.run(main())
+
+    assert fetched_model.org_id == 123
+    assert fetched_model.workorder_id == 456
+
+
+def test_can_query_items(create_server_table: Tuple[Table, Workorder]):
+    table, item_schema = create_server_table
+
+    async def main():
+        model = table.get_model(item_schema)
+        async with table.abatch_writer(parallelism=2) as writer:
+            for wo_id in range(30):
+                await writer.put(
+                    model.create(
+                        org_id=456, workorder_id=wo_id, date_created=datetime.utcnow()
+                    )
+                )
+
+        results = model.aquery(
+            hash_key_value="#WORKORDER",
+            key_condition=model.sk.begins_with("#ORG:456"),
+            limit=7,
+            paginate=True,
+            max_items=25,
+        )
+        items = [item async for item in results]
+        await table.aclose()
+        return items
+
+    items = asyncio.run(main())
+
+    assert len(items) == 25
+
+
+def test_can_batch_get_items(create_server_table: Tuple[Table, Workorder]):
+    table, item_schema = create_server_table
+
+    model = table.get_model(item_schema)
+    with table.batch_writer() as writer:
+        for wo_id in range(120):
+            writer.put(
+                model.create(
+                    org_id=123, workorder_id=wo_id, date_created=datetime.utcnow()
+                )
+            )
+
+    keys = [("#WORKORDER", f"#ORG:123#WORKORDER:{wo_id}") for wo_id in range(121)]
+
+    async def main():
+        items = await table.abatch_get(item_schema, keys)
+        await table.aclose()
+        return items
+
+    items = asyncio.run(main())
+
+    assert [item.workorder_id for item in items[:-1]] == list(range(120))
+    assert items[-1] is None
+
+
+def test_async_batch_writer_keeps_writes_to_a_key_in_order(
+    create_server_table: Tuple[Table, Workorder],
+):
+    table, item_schema = create_server_table
+
+    async def main():
+        model = table.get_model(item_schema)
+        items = [
+            model.create(org_id=789, workorder_id=wo_id, date_created=datetime.utcnow())
+            for wo_id in range(30)
+        ]
+        async with table.abatch_writer(parallelism=2) as writer:
+            for item in items:
+                await writer.put(item)
+            # waits for the batch that puts the key before deleting it.
+            await writer.delete(items[0])
+
+        results = model.aquery(
+            hash_key_value="#WORKORDER",
+            key_condition=model.sk.begins_with("#ORG:789#"),
+            paginate=True,
+        )
+        found = [item async for item in results]
+        await table.aclose()
+        return found
+
+    found = asyncio.run(main())
+
+    assert sorted(item.workorder_id for item in found) == list(range(1, 30))
@@ -0,0 +1,124 @@
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Tuple
+from unittest import mock
+
+import pytest
+
+from dynamodb_monotable.attributes import StringAttribute
+from dynamodb_monotable.core.cache import LRUCache
+from dynamodb_monotable.table import Table, TableSchema
+from .testing_models import Workorder
+
+
+@dataclass
+class WorkorderV2(Workorder):
+    task_id: StringAttribute = StringAttribute(value="#TASK:${workorder_id}")
+    status: StringAttribute = StringAttribute(default="open")
+
+
+class FailingClient:
+    """Fails after a number of updates, like a backfill that crashed."""
+
+    def __init__(self, client, fail_after: int):
+        self.client = client
+        self.fail_after = fail_after
+
+    def scan(self, **kwargs):
+        return self.client.scan(**kwargs)
+
+    def update_item(self, **kwargs):
+        if self.fail_after == 0:
+            raise RuntimeError("crashed")
+        self.fail_after -= 1
+        return self.client.update_item(**kwargs)
+
+
+def v2_table(table: Table, **options) -> Table:
+    return Table(
+        name=table.name,
+        backend=table.clients.backend,
+        schema=TableSchema(indexes=table.schema.indexes, models=[WorkorderV2]),
+        **options,
+    )
+
+
+def test_backfill_resumes_from_checkpoint(
+    create_basic_table: Tuple[Table, Workorder], tmp_path
+):
+    table, item_schema = create_basic_table
+    model = table.get_model(item_schema)
+    for wo_id in range(20):
+        model.create(
+            org_id=123, workorder_id=wo_id, date_created=datetime.utcnow()
+        ).save()
+
+    table = v2_table(table)
+    checkpoint_path = str(tmp_path / "backfill.json")
+    client = FailingClient(table.get_model(WorkorderV2)._client(), fail_after=12)
+
+    with mock.patch.object(WorkorderV2, "_client", return_value=client):
+        with pytest.raises(RuntimeError):
+            table.backfill(WorkorderV2, checkpoint_path, segments=1, page_size=5)
+
+    with open(checkpoint_path) as checkpoint_file:
+        checkpoint = json.load(checkpoint_file)
+    assert checkpoint["segments"]["0"]["done"] is False
+
+    # only the pages after the checkpoint are read again.
+    stats = table.backfill(WorkorderV2, checkpoint_path, segments=1, page_size=5)
+    assert stats == {"scanned": 10, "updated": 8}
+
+    items = list(
+        table.get_model(WorkorderV2).query(hash_key_value="#WORKORDER", paginate=True)
+    )
+    assert len(items) == 20
+    assert all(item.task_id == f"#TASK:{item.workorder_id}" for item in items)
+    assert all(item.status == "open" for item in items)
+
+    # a finished backfill does nothing.
+    assert table.backfill(WorkorderV2, checkpoint_path, segments=1) == {
+        "scanned": 0,
+        "updated": 0,
+    }
+
+
+def test_backfill_only_writes_changed_items(
+    create_basic_table: Tuple[Table, Workorder], tmp_path
+):
+    table = v2_table(create_basic_table[0])
+    model = table.get_model(WorkorderV2)
+    for wo_id in range(5):
+        model.create(
+            org_id=123, workorder_id=wo_id, date_created=datetime.utcnow()
+        ).save()
+
+    stats = table.backfill(
+        WorkorderV2, str(tmp_path / "backfill.json"), segments=1, max_wcu=100
+    )
+    assert stats == {"scanned": 5, "updated": 0}
+
+
+def test_backfill_evicts_the_items_it_updates_from_the_cache(
+    create_basic_table: Tuple[Table, Workorder], tmp_path
+):
+    table, item_schema = create_basic_table
+    model = table.get_model(item_schema)
+    for wo_id in range(3):
+        model.create(
+            org_id=123, workorder_id=wo_id, date_created=datetime.utcnow()
+        ).save()
+
+    table = v2_table(table, cache=LRUCache())
+    model = table.get_model(WorkorderV2)
+    sort_keys = [f"#ORG:123#WORKORDER:{wo_id}" for wo_id in range(3)]
+    # the items are cached before they have a task_id.
+    for sort_key in sort_keys:
+        item = model.get_by_key("#WORKORDER", sort_key)
+        assert "task_id" not in item.attribute_values
+
+    table.backfill(WorkorderV2, str(tmp_path / "backfill.json"), segments=1)
+
+    items = [model.get_by_key("#WORKORDER", sort_key) for sort_key in sort_keys]
+    assert [item.task_id for item in items] == [f"#TASK:{i}" for i in range(3)]
@@ -0,0 +1,67 @@
+from datetime import datetime
+from typing import Tuple
+from unittest import mock
+
+from dynamodb_monotable.table import Table
+from .testing_models import Workorder
+
+
+def test_can_batch_get_items(create_basic_table: Tuple[Table, Workorder]):
+    table, item_schema = create_basic_table
+
+    model = table.get_model(item_schema)
+    for wo_id in range(150):
+        model.create(
+            org_id=123, workorder_id=wo_id, date_created=datetime.utcnow()
+        ).save()
+
+    keys = [
+        ("#WORKORDER", f"#ORG:123#WORKORDER:{wo_id}") for wo_id in range(149, -1, -1)
+    ]
+    keys.insert(10, ("#WORKORDER", "#ORG:123#WORKORDER:missing"))
+    keys.append(keys[0])
+
+    items = table.batch_get(item_schema, keys)
+
+    assert len(items) == len(keys)
+    assert items[10] is None
+    assert items[0].workorder_id == 149
+    assert items[-2].workorder_id == 0
+    assert items[-1].workorder_id == 149
+
+
+def test_batch_get_retries_unprocessed_keys(
+    create_basic_table: Tuple[Table, Workorder],
+):
+    table, item_schema = create_basic_table
+
+    model = table.get_model(item_schema)
+    for wo_id in range(2):
+        model.create(
+            org_id=123, workorder_id=wo_id, date_created=datetime.utcnow()
+        ).save()
+
+    keys = [("#WORKORDER", f"#ORG:123#WORKORDER:{wo_id}") for wo_id in range(2)]
+    resource = table.clients.resource(table.client_config)
+    batch_get_item = resource.batch_get_item
+
+    def partially_processed(RequestItems):
+        # only process the first key of every request.
+        request = RequestItems[table.name]
+        response = batch_get_item(
+            RequestItems={table.name: {**request, "Keys": request["Keys"][:1]}}
+        )
+        if len(request["Keys"]) > 1:
+            response["UnprocessedKeys"] = {
+                table.name: {**request, "Keys": request["Keys"][1:]}
+            }
+        return response
+
+    with mock.patch.object(
+        resource, "batch_get_item", side_effect=partially_processed
+    ) as patched, mock.patch.object(table.clients, "resource", return_value=resource):
+        items = model.batch_get(keys, max_workers=1)
+
+    assert patched.call_count == 2
+
+    assert [item.workorder_id for item in items] == [0, 1]
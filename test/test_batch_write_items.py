@@ -0,0 +1,66 @@
+from datetime import datetime
+from typing import Tuple
+from unittest import mock
+
+from dynamodb_monotable.table import Table
+from .testing_models import Workorder
+
+
+def test_can_batch_write_items(create_basic_table: Tuple[Table, Workorder]):
+    table, item_schema = create_basic_table
+
+    model = table.get_model(item_schema)
+    with table.batch_writer(parallelism=4) as writer:
+        for wo_id in range(60):
+            writer.put(
+                model.create(
+                    org_id=123, workorder_id=wo_id, date_created=datetime.utcnow()
+                )
+            )
+
+    results = model.query(hash_key_value="#WORKORDER", paginate=True)
+    assert len(list(results)) == 60
+
+
+def test_batch_writer_dedupes_keys(create_basic_table: Tuple[Table, Workorder]):
+    table, item_schema = create_basic_table
+
+    model = table.get_model(item_schema)
+    first = model.create(org_id=123, workorder_id=1, date_created=datetime.utcnow())
+    second = model.create(org_id=123, workorder_id=1, date_created=datetime.utcnow())
+    deleted = model.create(org_id=123, workorder_id=2, date_created=datetime.utcnow())
+
+    with table.batch_writer() as writer:
+        writer.put(first)
+        writer.put(second)
+        writer.put(deleted)
+        writer.delete(deleted)
+
+    results = list(model.query(hash_key_value="#WORKORDER"))
+    assert len(results) == 1
+    assert results[0].date_created == second.date_created
+
+
+def test_batch_writer_keeps_writes_to_a_key_in_order(
+    create_basic_table: Tuple[Table, Workorder],
+):
+    table, item_schema = create_basic_table
+
+    model = table.get_model(item_schema)
+    items = [
+        model.create(org_id=123, workorder_id=wo_id, date_created=datetime.utcnow())
+        for wo_id in range(30)
+    ]
+
+    clients_map = mock.Mock(wraps=table.clients.map)
+    with mock.patch.object(table.clients, "map", clients_map):
+        with table.batch_writer(parallelism=4) as writer:
+            for item in items:
+                writer.put(item)
+            # the first batch holds the put of this key, it is sent first.
+            writer.delete(items[0])
+
+    # the full batch is sent before the delete, and the rest on exit.
+    assert clients_map.call_count == 2
+    results = list(model.query(hash_key_value="#WORKORDER", paginate=True))
+    assert sorted(item.workorder_id for item in results) == list(range(1, 30))
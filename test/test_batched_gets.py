@@ -0,0 +1,87 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Tuple
+from unittest import mock
+
+import pytest
+
+from dynamodb_monotable.core import loader
+from dynamodb_monotable.exceptions import NoResultsFound
+from dynamodb_monotable.table import Table
+from .testing_models import Workorder
+
+
+def test_concurrent_gets_are_batched(create_basic_table: Tuple[Table, Workorder]):
+    table, item_schema = create_basic_table
+    table = Table(
+        name=table.name,
+        backend=table.clients.backend,
+        schema=table.schema,
+        batch_gets=True,
+        batch_window=0.2,
+    )
+
+    model = table.get_model(item_schema)
+    for wo_id in range(10):
+        model.create(
+            org_id=123, workorder_id=wo_id, date_created=datetime.utcnow()
+        ).save()
+
+    def get(wo_id):
+        try:
+            return model.get_by_key("#WORKORDER", f"#ORG:123#WORKORDER:{wo_id}")
+        except NoResultsFound:
+            return None
+
+    with mock.patch.object(
+        loader, "batch_get_chunk", wraps=loader.batch_get_chunk
+    ) as batch_get_chunk:
+        with ThreadPoolExecutor(max_workers=12) as executor:
+            items = list(executor.map(get, [*range(10), "missing", 3]))
+
+    assert batch_get_chunk.call_count == 1
+    assert [item.workorder_id for item in items[:10]] == list(range(10))
+    assert items[10] is None
+    assert items[11].workorder_id == 3
+    assert items[11] is not items[3]
+
+
+def test_gets_within_one_tick_are_batched(create_server_table: Tuple[Table, Workorder]):
+    table, item_schema = create_server_table
+    table = Table(
+        name=table.name,
+        backend=table.clients.backend,
+        schema=table.schema,
+        client_config=table.client_config,
+        batch_gets=True,
+        batch_window=0,
+    )
+
+    async def main():
+        model = table.get_model(item_schema)
+        for wo_id in range(5):
+            await model.create(
+                org_id=123, workorder_id=wo_id, date_created=datetime.utcnow()
+            ).asave()
+
+        with mock.patch.object(
+            loader, "abatch_get_chunk", wraps=loader.abatch_get_chunk
+        ) as abatch_get_chunk:
+            items = await asyncio.gather(
+                *[
+                    model.aget_by_key("#WORKORDER", f"#ORG:123#WORKORDER:{wo_id}")
+                    for wo_id in range(5)
+                ]
+            )
+
+        with pytest.raises(NoResultsFound):
+            await model.aget_by_key("#WORKORDER", "#ORG:123#WORKORDER:missing")
+
+        await table.aclose()
+        return items, abatch_get_chunk.call_count
+
+    items, call_count = asyncio.run(main())
+
+    assert call_count == 1
+    assert [item.workorder_id for item in items] == list(range(5))
@@ -0,0 +1,100 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Tuple
+from unittest import mock
+
+import pytest
+
+from dynamodb_monotable.table import Table
+from dynamodb_monotable.core.clients import ClientRegistry
+from .testing_models import Workorder
+
+
+def test_models_share_client(create_basic_table: Tuple[Table, Workorder]):
+    table, item_schema = create_basic_table
+
+    first_model = table.get_model(item_schema)
+    second_model = table.get_model(item_schema)
+
+    assert first_model._client() is second_model._client()
+    assert first_model._client() is table.clients.client(table.client_config)
+
+
+def test_clients_are_keyed_by_client_config():
+    clients = ClientRegistry(max_pool_connections=32)
+
+    client = clients.client({"region_name": "eu-west-1"})
+
+    assert client.meta.config.max_pool_connections == 32
+    assert client.meta.region_name == "eu-west-1"
+    assert client is clients.client({"region_name": "eu-west-1"})
+    assert client is not clients.client({})
+
+
+def test_can_save_from_many_threads(create_basic_table: Tuple[Table, Workorder]):
+    table, item_schema = create_basic_table
+
+    model = table.get_model(item_schema)
+
+    def save(workorder_id: int) -> None:
+        model.create(
+            org_id=123, workorder_id=workorder_id, date_created=datetime.utcnow()
+        ).save()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(save, range(8)))
+
+    results = model.query(hash_key_value="#WORKORDER")
+    assert results.count == 8
+
+
+def test_batch_gets_reuse_the_resources_of_their_threads(
+    create_basic_table: Tuple[Table, Workorder],
+):
+    table, item_schema = create_basic_table
+    model = table.get_model(item_schema)
+    keys = [("#WORKORDER", f"#ORG:1#WORKORDER:{wo_id}") for wo_id in range(250)]
+
+    resource = table.clients._get_session().resource
+    with mock.patch.object(
+        table.clients._get_session(), "resource", wraps=resource
+    ) as create_resource:
+        for _ in range(5):
+            assert model.batch_get(keys, max_workers=3) == [None] * 250
+
+    # one resource for each of the 3 threads the requests ran on, the first time.
+    assert create_resource.call_count <= 3
+
+
+def test_map_keeps_order_and_raises_errors():
+    clients = ClientRegistry(max_pool_connections=4)
+
+    assert clients.map(lambda value: value * 2, list(range(20))) == list(
+        range(0, 40, 2)
+    )
+
+    def fail(value: int) -> int:
+        if value == 3:
+            raise ValueError("bad value")
+        return value
+
+    with pytest.raises(ValueError, match="bad value"):
+        clients.map(fail, list(range(10)))
+
+
+def test_nested_map_calls_run_inline():
+    clients = ClientRegistry(max_pool_connections=2)
+    # two maps from two threads take both pool threads, and the callers.
+    busy = threading.Barrier(4, timeout=10)
+
+    def outer(value: int) -> int:
+        busy.wait()
+        return sum(clients.map(lambda inner: inner * value, list(range(4))))
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(clients.map, outer, list(range(4))) for _ in range(2)
+        ]
+        for future in futures:
+            assert future.result(timeout=10) == [6 * value for value in range(4)]
@@ -0,0 +1,71 @@
+from datetime import datetime
+from typing import Tuple
+
+import pytest
+
+from dynamodb_monotable.attributes import IntAttribute, StringAttribute
+from dynamodb_monotable.conditions import Condition, ExpressionBuilder
+from dynamodb_monotable.table import Table
+from .testing_models import Workorder
+
+
+def test_conditions_render_names_and_values_once():
+    name = StringAttribute(name="name")
+    count = IntAttribute(name="count")
+
+    condition = (name.begins_with("a") | ~count.between(1, 5)) & (
+        count.is_in(1, 2) & name.size().gt(3) & name.exists()
+    )
+    builder = ExpressionBuilder()
+    assert builder.build(condition) == (
+        "(begins_with(#n0, :v0) OR NOT #n1 BETWEEN :v1 AND :v2)"
+        " AND #n1 IN (:v1, :v3) AND size(#n0) > :v4 AND attribute_exists(#n0)"
+    )
+    assert builder.names == {"#n0": "name", "#n1": "count"}
+    assert builder.values == {
+        ":v0": {"S": "a"},
+        ":v1": {"N": "1"},
+        ":v2": {"N": "5"},
+        ":v3": {"N": "2"},
+        ":v4": {"N": "3"},
+    }
+
+    # raw expressions can still be mixed in, they keep their placeholders.
+    raw = Condition("#name <> :raw", {":raw": {"S": "b"}}, {"#name": "name"})
+    assert (raw | name.eq("b")).expression == "(#name <> :raw) OR #name = :v0"
+    assert (raw | name.eq("b")).values == {":raw": {"S": "b"}, ":v0": {"S": "b"}}
+
+    # but they can't take the placeholders of the other conditions.
+    with pytest.raises(ValueError, match="reserved"):
+        count.eq(5) & Condition("b = :v0", {":v0": {"N": "7"}})
+    with pytest.raises(ValueError, match="reserved"):
+        Condition("attribute_exists(#n0)")
+    with pytest.raises(ValueError, match="two values"):
+        ExpressionBuilder().build(raw & Condition(":raw < b", {":raw": {"S": "c"}}))
+
+
+def test_query_filters_with_conditions(create_basic_table: Tuple[Table, Workorder]):
+    table, item_schema = create_basic_table
+
+    model = table.get_model(item_schema)
+    for wo_id in range(10):
+        model.create(
+            org_id=1, workorder_id=wo_id, date_created=datetime.utcnow()
+        ).save()
+
+    def query(filter_expression):
+        results = model.query(
+            hash_key_value="#WORKORDER",
+            key_condition=model.sk.between("#ORG:1#WORKORDER:2", "#ORG:1#WORKORDER:8"),
+            filter_expression=filter_expression,
+        )
+        return sorted(item.workorder_id for item in results)
+
+    assert query(None) == [2, 3, 4, 5, 6, 7, 8]
+    assert query(Workorder.workorder_id.is_in(1, 3, 5)) == [3, 5]
+    assert query(~Workorder.workorder_id.lte(6) | Workorder.sk.contains(":3")) == [
+        3,
+        7,
+        8,
+    ]
+    assert query(Workorder.date_created.exists() & Workorder.org_id.ne(1)) == []
@@ -0,0 +1,76 @@
+from datetime import datetime
+from typing import Tuple
+
+import pytest
+
+from dynamodb_monotable.core.cache import LRUCache
+from dynamodb_monotable.exceptions import NoResultsFound
+from dynamodb_monotable.table import Table
+from .testing_models import Workorder
+
+
+@pytest.fixture
+def cached_table(create_basic_table: Tuple[Table, Workorder]) -> Table:
+    table, _ = create_basic_table
+    return Table(
+        name=table.name,
+        backend=table.clients.backend,
+        schema=table.schema,
+        cache=LRUCache(),
+    )
+
+
+def test_get_by_key_reads_through_cache(cached_table: Table):
+    model = cached_table.get_model(Workorder)
+    model.create(org_id=123, workorder_id=456, date_created=datetime.utcnow()).save()
+    cached_table.cache.clear()
+
+    key = ("#WORKORDER", "#ORG:123#WORKORDER:456")
+    assert model.get_by_key(*key).org_id == 123
+    assert model.get_by_key(*key).org_id == 123
+    assert (cached_table.cache.hits, cached_table.cache.misses) == (1, 1)
+
+    # consistent reads always go to the table.
+    assert model.get_by_key(*key, consistent_read=True).org_id == 123
+    assert (cached_table.cache.hits, cached_table.cache.misses) == (1, 1)
+
+    items = model.batch_get([key, ("#WORKORDER", "#ORG:123#WORKORDER:789")])
+    assert items[0].org_id == 123
+    assert items[1] is None
+    assert (cached_table.cache.hits, cached_table.cache.misses) == (2, 2)
+
+
+def test_writes_update_cache(cached_table: Table):
+    model = cached_table.get_model(Workorder)
+    item = model.create(org_id=123, workorder_id=456, date_created=datetime.utcnow())
+    item.save()
+
+    key = ("#WORKORDER", "#ORG:123#WORKORDER:456")
+    assert model.get_by_key(*key).date_created == item.date_created
+    assert cached_table.cache.hits == 1
+
+    item.delete()
+    with pytest.raises(NoResultsFound):
+        model.get_by_key(*key)
+
+    with cached_table.batch_writer() as writer:
+        writer.put(item)
+    assert len(cached_table.cache) == 0
+
+
+def test_lru_cache_evicts_items():
+    cache = LRUCache(max_entries=2, max_bytes=100)
+
+    cache.set(("a",), {"name": "a"})
+    cache.set(("b",), {"name": "b"})
+    cache.get(("a",))
+    cache.set(("c",), {"name": "c"})
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) == {"name": "a"}
+
+    cache.set(("big",), {"name": "x" * 200})
+    assert cache.get(("big",)) is None
+
+    expired = LRUCache(ttl=-1)
+    expired.set(("a",), {"name": "a"})
+    assert expired.get(("a",)) is None
@@ -0,0 +1,144 @@
+from datetime import datetime
+
+import pytest
+from botocore.exceptions import ClientError
+
+from dynamodb_monotable.core.memory import MemoryBackend
+from dynamodb_monotable.table import Table, TableSchema
+from .testing_models import Task, Workorder
+
+
+@pytest.fixture
+def memory_table() -> Table:
+    table = Table(
+        name="memory",
+        schema=TableSchema(
+            **{
+                "indexes": {
+                    "primary": {
+                        "hash_key": {"name": "hk", "type": "S"},
+                        "sort_key": {"name": "sk", "type": "S"},
+                        "index_type": "primary",
+                    },
+                },
+                "models": [Workorder, Task],
+            }
+        ),
+        backend=MemoryBackend(),
+    )
+    table.create_table()
+    return table
+
+
+def test_models_work_on_the_memory_backend(memory_table: Table):
+    workorders = memory_table.get_model(Workorder)
+    for workorder_id in range(12):
+        workorders.create(
+            org_id=1, workorder_id=workorder_id, date_created=datetime.utcnow()
+        ).save()
+
+    assert workorders.get_by_key("#WORKORDER", "#ORG:1#WORKORDER:3").workorder_id == 3
+
+    sk = Workorder.sk
+    results = workorders.query(
+        hash_key_value="#WORKORDER", key_condition=sk.begins_with("#ORG:1#WORKORDER:1")
+    )
+    assert sorted(w.workorder_id for w in results) == [1, 10, 11]
+
+    results = workorders.query(
+        hash_key_value="#WORKORDER",
+        key_condition=sk.lt("#ORG:1#WORKORDER:2"),
+        scan_index_forward=False,
+    )
+    assert [w.workorder_id for w in results] == [11, 10, 1, 0]
+
+    # pages of 5 are followed until every item has been returned.
+    results = workorders.query(hash_key_value="#WORKORDER", limit=5, paginate=True)
+    assert len(list(results)) == 12
+
+    keys = [("#WORKORDER", f"#ORG:1#WORKORDER:{i}") for i in (4, 99, 2)]
+    assert [w and w.workorder_id for w in workorders.batch_get(keys)] == [4, None, 2]
+
+    workorders.get_by_key("#WORKORDER", "#ORG:1#WORKORDER:4").delete()
+    assert len(list(workorders.query(hash_key_value="#WORKORDER"))) == 11
+
+
+def test_client_supports_expressions(memory_table: Table):
+    client = memory_table.clients.client(memory_table.client_config)
+    key = {"hk": {"S": "#WORKORDER"}, "sk": {"S": "#ORG:1#WORKORDER:1"}}
+    client.put_item(
+        TableName="memory",
+        Item={**key, "count": {"N": "1"}, "tags": {"SS": ["a"]}, "note": {"S": "x"}},
+    )
+
+    response = client.update_item(
+        TableName="memory",
+        Key=key,
+        UpdateExpression="SET #count = #count + :one REMOVE note ADD tags :tags",
+        ConditionExpression="attribute_exists(hk) AND #count < :ten",
+        ExpressionAttributeNames={"#count": "count"},
+        ExpressionAttributeValues={
+            ":one": {"N": "1"},
+            ":ten": {"N": "10"},
+            ":tags": {"SS": ["b"]},
+        },
+        ReturnValues="ALL_NEW",
+    )
+    assert response["Attributes"] == {
+        **key,
+        "count": {"N": "2"},
+        "tags": {"SS": ["a", "b"]},
+    }
+
+    response = client.query(
+        TableName="memory",
+        KeyConditionExpression="hk = :hk",
+        FilterExpression="contains(tags, :tag) OR size(tags) > :three",
+        ProjectionExpression="#count",
+        ExpressionAttributeNames={"#count": "count"},
+        ExpressionAttributeValues={
+            ":hk": {"S": "#WORKORDER"},
+            ":tag": {"S": "b"},
+            ":three": {"N": "3"},
+        },
+    )
+    assert response["Items"] == [{"count": {"N": "2"}}]
+
+    with pytest.raises(client.exceptions.ConditionalCheckFailedException):
+        client.put_item(
+            TableName="memory",
+            Item=key,
+            ConditionExpression="attribute_not_exists(hk)",
+        )
+    with pytest.raises(ClientError) as error:
+        client.update_item(
+            TableName="memory",
+            Key=key,
+            UpdateExpression="SET sk = :sk",
+            ExpressionAttributeValues={":sk": {"S": "other"}},
+        )
+    assert error.value.response["Error"]["Code"] == "ValidationException"
+
+
+def test_scan_segments_cover_every_item_once():
+    backend = MemoryBackend()
+    client = backend.client()
+    client.create_table(
+        TableName="scanned",
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "N"}],
+    )
+    for pk in range(50):
+        client.put_item(TableName="scanned", Item={"pk": {"N": str(pk)}})
+
+    scanned = []
+    for segment in range(4):
+        args = {"TableName": "scanned", "Segment": segment, "TotalSegments": 4}
+        while True:
+            response = client.scan(Limit=7, **args)
+            scanned.extend(int(item["pk"]["N"]) for item in response["Items"])
+            if "LastEvaluatedKey" not in response:
+                break
+            args["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    assert sorted(scanned) == list(range(50))
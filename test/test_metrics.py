@@ -0,0 +1,174 @@
+from datetime import datetime
+from typing import Tuple
+from unittest import mock
+
+import pytest
+
+from dynamodb_monotable.core.batch import batch_write_chunk
+from dynamodb_monotable.core.metrics import (
+    CallbackSink,
+    MetricsRegistry,
+    OpenTelemetrySink,
+    OperationRecord,
+)
+from dynamodb_monotable.exceptions import NoResultsFound
+from dynamodb_monotable.table import Table
+from .testing_models import Workorder
+
+
+class FakeSpan:
+    def __init__(self, name, start_time, attributes):
+        self.name = name
+        self.start_time = start_time
+        self.attributes = attributes
+        self.end_time = None
+
+    def set_attribute(self, name, value):
+        self.attributes[name] = value
+
+    def end(self, end_time):
+        self.end_time = end_time
+
+
+class FakeTracer:
+    def __init__(self):
+        self.spans = []
+
+    def start_span(self, name, start_time, attributes):
+        self.spans.append(FakeSpan(name, start_time, attributes))
+        return self.spans[-1]
+
+
+def test_operations_are_recorded(create_basic_table: Tuple[Table, Workorder]):
+    table, item_schema = create_basic_table
+    records = []
+    registry = MetricsRegistry()
+    tracer = FakeTracer()
+    table = Table(
+        name=table.name,
+        backend=table.clients.backend,
+        schema=table.schema,
+        metrics=[CallbackSink(records.append), registry, OpenTelemetrySink(tracer)],
+    )
+
+    model = table.get_model(item_schema)
+    for wo_id in range(3):
+        model.create(
+            org_id=123, workorder_id=wo_id, date_created=datetime.utcnow()
+        ).save()
+    model.get_by_key("#WORKORDER", "#ORG:123#WORKORDER:1")
+    with pytest.raises(NoResultsFound):
+        model.get_by_key("#WORKORDER", "#ORG:123#WORKORDER:missing")
+    list(model.query(hash_key_value="#WORKORDER"))
+
+    assert [record.operation for record in records] == [
+        "put_item",
+        "put_item",
+        "put_item",
+        "get_item",
+        "get_item",
+        "query",
+    ]
+    get_record = records[3]
+    assert get_record.model == "Workorder"
+    assert get_record.index == "primary"
+    assert get_record.items == 1 and get_record.bytes > 0
+    assert get_record.phases["network"] > 0
+    assert get_record.duration >= get_record.phases["network"]
+    assert records[-1].items == 3
+
+    assert registry.counter("operations", operation="put_item") == 3
+    assert registry.counter("items", operation="get_item") == 1
+    assert registry.latency_count(operation="query") == 1
+    assert registry.latency_count(operation="get_item", phase="deserialize") == 1
+    assert 'operation="query"' in registry.render()
+
+    assert [span.name for span in tracer.spans][-1] == "dynamodb.query"
+    assert all(span.end_time >= span.start_time for span in tracer.spans)
+
+
+def test_prefetched_pages_and_batch_writes_are_recorded(
+    create_basic_table: Tuple[Table, Workorder],
+):
+    table, item_schema = create_basic_table
+    records = []
+    table = Table(
+        name=table.name,
+        backend=table.clients.backend,
+        schema=table.schema,
+        metrics=[CallbackSink(records.append)],
+    )
+
+    model = table.get_model(item_schema)
+    with table.batch_writer() as writer:
+        for wo_id in range(30):
+            writer.put(
+                model.create(
+                    org_id=123, workorder_id=wo_id, date_created=datetime.utcnow()
+                )
+            )
+
+    writes = [record for record in records if record.operation == "batch_write_item"]
+    assert sorted(record.items for record in writes) == [5, 25]
+    assert all(record.bytes > 0 and record.phases["network"] > 0 for record in writes)
+
+    records.clear()
+    results = model.query(
+        hash_key_value="#WORKORDER", limit=10, paginate=True, prefetch=2
+    )
+    assert len(list(results)) == 30
+
+    # the pages fetched on the prefetch thread are recorded, and deserialized.
+    assert {record.operation for record in records} == {"query"}
+    assert sum(record.items for record in records) == 30
+    assert all(record.phases["deserialize"] > 0 for record in records if record.items)
+
+
+def test_unprocessed_items_are_recorded_as_retries():
+    record = OperationRecord("batch_write_item", "table")
+    resource = mock.Mock()
+    resource.batch_write_item.side_effect = [
+        {"UnprocessedItems": {"table": [{"DeleteRequest": {"Key": {"pk": "a"}}}]}},
+        {"UnprocessedItems": {}},
+    ]
+
+    with mock.patch("dynamodb_monotable.core.batch.backoff_delay", return_value=0):
+        batch_write_chunk(
+            lambda: resource,
+            "table",
+            [{"DeleteRequest": {"Key": {"pk": "a"}}}],
+            record=record,
+        )
+
+    assert record.retries == 1
+
+
+def test_transactions_loads_and_scans_are_recorded(
+    create_basic_table: Tuple[Table, Workorder],
+):
+    table, item_schema = create_basic_table
+    registry = MetricsRegistry()
+    table = Table(
+        name=table.name,
+        backend=table.clients.backend,
+        schema=table.schema,
+        metrics=[registry],
+        batch_gets=True,
+    )
+
+    model = table.get_model(item_schema)
+    with table.transaction() as transaction:
+        for wo_id in range(2):
+            transaction.put(
+                model.create(
+                    org_id=123, workorder_id=wo_id, date_created=datetime.utcnow()
+                )
+            )
+    table.transact_get([(Workorder, ("#WORKORDER", "#ORG:123#WORKORDER:0"))])
+    model.get_by_key("#WORKORDER", "#ORG:123#WORKORDER:1")
+    assert model.count_scan().count == 2
+
+    assert registry.counter("items", operation="transact_write_items") == 2
+    assert registry.counter("items", operation="transact_get_items") == 1
+    assert registry.counter("items", operation="batch_get_item", model="") == 1
+    assert registry.counter("operations", operation="scan") == 1
@@ -1,7 +1,6 @@
 from datetime import datetime
 from typing import Tuple
 
-import boto3
 import pytest
 
 from dynamodb_monotable.table import Table
@@ -17,8 +16,8 @@ def test_can_put_item(create_basic_table: Tuple[Table, Workorder]):
     # persist the data into the database
     model.save()
 
-    # retrieve the data from the database using boto3
-    client = boto3.client("dynamodb")
+    # retrieve the data from the database with the low level client
+    client = table.clients.client(table.client_config)
     response = client.get_item(
         TableName=table.name,
         Key={
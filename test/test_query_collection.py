@@ -0,0 +1,100 @@
+from datetime import datetime
+from typing import Tuple
+
+import pytest
+
+from dynamodb_monotable.table import Table, TableSchema
+from .testing_models import Task, Workorder
+
+
+def test_can_query_collection(create_basic_table: Tuple[Table, Workorder]):
+    table, _ = create_basic_table
+    table = Table(
+        name=table.name,
+        backend=table.clients.backend,
+        schema=TableSchema(indexes=table.schema.indexes, models=[Workorder, Task]),
+    )
+
+    workorders = table.get_model(Workorder)
+    tasks = table.get_model(Task)
+    with table.batch_writer() as writer:
+        writer.put(
+            workorders.create(
+                org_id=123, workorder_id=1, date_created=datetime.utcnow()
+            )
+        )
+        for task_id in range(3):
+            writer.put(tasks.create(org_id=123, workorder_id=1, task_id=task_id))
+
+    results = list(
+        table.query_collection(
+            hash_key_value="#WORKORDER",
+            key_condition=workorders.sk.begins_with("#ORG:123#WORKORDER:1"),
+        )
+    )
+
+    assert [type(item) for item in results] == [Workorder, Task, Task, Task]
+    assert [item.task_id for item in results[1:]] == [0, 1, 2]
+
+    # rows that belong to no model are skipped, even when nested under one.
+    workorders._client().put_item(
+        TableName=table.name,
+        Item={"hk": {"S": "#WORKORDER"}, "sk": {"S": "#ORG:123#WORKORDER:1#NOTE:a"}},
+    )
+    results = list(
+        table.query_collection(
+            hash_key_value="#WORKORDER",
+            key_condition=workorders.sk.begins_with("#ORG:123#WORKORDER:1"),
+        )
+    )
+    assert [type(item) for item in results] == [Workorder, Task, Task, Task]
+
+
+def test_type_attribute_must_be_constant(create_basic_table: Tuple[Table, Workorder]):
+    table, _ = create_basic_table
+
+    with pytest.raises(ValueError, match="must define item_type"):
+        Table(
+            name=table.name,
+            backend=table.clients.backend,
+            schema=TableSchema(
+                indexes=table.schema.indexes,
+                models=[Workorder],
+                type_attribute="item_type",
+            ),
+        )
+
+
+def test_collection_pages_ignore_skipped_rows(
+    create_basic_table: Tuple[Table, Workorder],
+):
+    table, _ = create_basic_table
+    table = Table(
+        name=table.name,
+        backend=table.clients.backend,
+        schema=TableSchema(indexes=table.schema.indexes, models=[Workorder, Task]),
+    )
+    workorders = table.get_model(Workorder)
+    tasks = table.get_model(Task)
+    workorders.create(org_id=123, workorder_id=1, date_created=datetime.utcnow()).save()
+    for note in "abc":
+        workorders._client().put_item(
+            TableName=table.name,
+            Item={
+                "hk": {"S": "#WORKORDER"},
+                "sk": {"S": f"#ORG:123#WORKORDER:1#NOTE:{note}"},
+            },
+        )
+    for task_id in range(3):
+        tasks.create(org_id=123, workorder_id=1, task_id=task_id).save()
+
+    # the notes fill whole pages, but only returned items count to max_items.
+    for prefetch in (0, 1):
+        results = table.query_collection(
+            hash_key_value="#WORKORDER",
+            limit=2,
+            paginate=True,
+            max_items=3,
+            prefetch=prefetch,
+        )
+        assert [type(item) for item in results] == [Workorder, Task, Task]
@@ -1,10 +1,27 @@
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Tuple
+from unittest import mock
+import gc
+import time
 
 import pytest
 
-from dynamodb_monotable.table import Table
-from .testing_models import Workorder
+from dynamodb_monotable.attributes import Param, StringAttribute
+from dynamodb_monotable.core.prefetch import PagePrefetcher
+from dynamodb_monotable.models import QueryCount
+from dynamodb_monotable.table import Table, TableSchema
+from .testing_models import Task, Workorder
+
+
+@dataclass
+class TypedWorkorder(Workorder):
+    item_type: StringAttribute = StringAttribute(value="workorder")
+
+
+@dataclass
+class TypedTask(Task):
+    item_type: StringAttribute = StringAttribute(value="task")
 
 
 def test_can_query_item(create_basic_table: Tuple[Table, Workorder]):
@@ -26,3 +43,222 @@ def test_can_query_item(create_basic_table: Tuple[Table, Workorder]):
 
     if results.count != 3:
         pytest.fail("Wrong number of items found in the database for query.")
+
+
+def test_can_paginate_query(create_basic_table: Tuple[Table, Workorder]):
+    table, item_schema = create_basic_table
+
+    model = table.get_model(item_schema)
+    for wo_id in range(10):
+        model.create(
+            org_id=456, workorder_id=wo_id, date_created=datetime.utcnow()
+        ).save()
+
+    results = model.query(hash_key_value="#WORKORDER", limit=3, paginate=True)
+
+    workorder_ids = []
+    for item in results:
+        workorder_ids.append(item.workorder_id)
+        # only the current page is held in memory.
+        assert len(results._results) <= 3
+
+    assert sorted(workorder_ids) == list(range(10))
+    assert results.count == 10
+
+
+def test_query_stops_at_max_items(create_basic_table: Tuple[Table, Workorder]):
+    table, item_schema = create_basic_table
+
+    model = table.get_model(item_schema)
+    for wo_id in range(10):
+        model.create(
+            org_id=456, workorder_id=wo_id, date_created=datetime.utcnow()
+        ).save()
+
+    results = model.query(
+        hash_key_value="#WORKORDER", limit=3, paginate=True, max_items=5
+    )
+
+    assert len(list(results)) == 5
+    assert results.count == 5
+
+
+def test_can_prefetch_query_pages(create_basic_table: Tuple[Table, Workorder]):
+    table, item_schema = create_basic_table
+
+    model = table.get_model(item_schema)
+    for wo_id in range(10):
+        model.create(
+            org_id=456, workorder_id=wo_id, date_created=datetime.utcnow()
+        ).save()
+
+    results = model.query(
+        hash_key_value="#WORKORDER", limit=3, paginate=True, max_items=8, prefetch=2
+    )
+
+    assert results._prefetcher is not None
+    assert len(list(results)) == 8
+    assert results.count == 8
+
+
+def test_prefetch_is_bounded_by_depth():
+    page = {"Items": [], "Count": 1, "LastEvaluatedKey": {"pk": {"S": "a"}}}
+    query = mock.Mock(return_value=(page, []))
+
+    prefetcher = PagePrefetcher(query, {}, page["LastEvaluatedKey"], 1, depth=2)
+    deadline = time.monotonic() + 2
+    while not prefetcher._pages._pages.full() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.2)
+
+    # two pages wait on the queue and the third waits for room.
+    assert query.call_count == 3
+
+    prefetcher.close()
+    (thread,) = prefetcher._pages._threads
+    thread.join(1)
+    assert not thread.is_alive()
+    assert prefetcher.get() is None
+
+
+def test_prefetch_raises_query_errors():
+    page = {"Items": [], "Count": 1, "LastEvaluatedKey": {"pk": {"S": "a"}}}
+    query = mock.Mock(side_effect=[(page, []), RuntimeError("throttled")])
+
+    prefetcher = PagePrefetcher(query, {}, page["LastEvaluatedKey"], 1)
+    assert prefetcher.get() == (page, [])
+    with pytest.raises(RuntimeError, match="throttled"):
+        prefetcher.get()
+    assert prefetcher.get() is None
+
+
+def test_prefetch_stops_when_iteration_stops_early(
+    create_basic_table: Tuple[Table, Workorder],
+):
+    table, item_schema = create_basic_table
+
+    model = table.get_model(item_schema)
+    for wo_id in range(10):
+        model.create(
+            org_id=456, workorder_id=wo_id, date_created=datetime.utcnow()
+        ).save()
+
+    with model.query(
+        hash_key_value="#WORKORDER", limit=1, paginate=True, prefetch=1
+    ) as results:
+        assert next(results).workorder_id == 0
+        (thread,) = results._prefetcher._pages._threads
+    thread.join(1)
+    assert not thread.is_alive()
+
+    # dropping the results set without closing it also stops the thread.
+    results = model.query(
+        hash_key_value="#WORKORDER", limit=1, paginate=True, prefetch=1
+    )
+    for _ in results:
+        break
+    (thread,) = results._prefetcher._pages._threads
+    del results
+    gc.collect()
+    thread.join(1)
+    assert not thread.is_alive()
+
+
+def test_can_query_keys_only(create_basic_table: Tuple[Table, Workorder]):
+    table, item_schema = create_basic_table
+
+    model = table.get_model(item_schema)
+    for wo_id in range(3):
+        model.create(
+            org_id=456, workorder_id=wo_id, date_created=datetime.utcnow()
+        ).save()
+
+    results = list(model.query(hash_key_value="#WORKORDER", keys_only=True))
+
+    assert [item.workorder_id for item in results] == [0, 1, 2]
+    assert all(item.org_id == 456 for item in results)
+    # date_created isn't part of the key, so it is never read.
+    assert all("date_created" not in item.attribute_values for item in results)
+
+
+def test_prepared_query_binds_values(create_basic_table: Tuple[Table, Workorder]):
+    table, item_schema = create_basic_table
+
+    model = table.get_model(item_schema)
+    for org_id in (1, 2):
+        for wo_id in range(4):
+            model.create(
+                org_id=org_id, workorder_id=wo_id, date_created=datetime.utcnow()
+            ).save()
+
+    prepared = model.prepare_query(
+        key_condition=model.sk.begins_with(Param("prefix")),
+        filter_expression=Workorder.workorder_id.gt(Param("after")),
+    )
+    assert prepared.args["KeyConditionExpression"] == (
+        "#n0 = :v0 AND begins_with(#n1, :v1)"
+    )
+    assert prepared.args["FilterExpression"] == "#n2 > :v2"
+
+    results = prepared.execute("#WORKORDER", {"prefix": "#ORG:1#", "after": 1})
+    assert sorted(w.workorder_id for w in results) == [2, 3]
+
+    results = prepared.execute(
+        "#WORKORDER", {"prefix": "#ORG:2#", "after": 0}, paginate=True, max_items=2
+    )
+    assert [(w.org_id, w.workorder_id) for w in results] == [(2, 1), (2, 2)]
+
+    with pytest.raises(ValueError):
+        prepared.execute("#WORKORDER", {"prefix": "#ORG:1#"})
+
+
+def test_count_query(create_basic_table: Tuple[Table, Workorder]):
+    table, item_schema = create_basic_table
+
+    model = table.get_model(item_schema)
+    for wo_id in range(10):
+        model.create(
+            org_id=456, workorder_id=wo_id, date_created=datetime.utcnow()
+        ).save()
+
+    assert model.count("#WORKORDER") == QueryCount(count=10, scanned_count=10)
+    assert model.count(
+        "#WORKORDER",
+        key_condition=model.sk.begins_with("#ORG:456"),
+        filter_expression=Workorder.workorder_id.gte(7),
+    ) == QueryCount(count=3, scanned_count=10)
+
+
+@pytest.mark.parametrize(
+    "models,type_attribute",
+    [([Workorder, Task], None), ([TypedWorkorder, TypedTask], "item_type")],
+)
+def test_count_query_only_counts_the_model(
+    create_basic_table: Tuple[Table, Workorder], models, type_attribute
+):
+    table, _ = create_basic_table
+    table = Table(
+        name=table.name,
+        backend=table.clients.backend,
+        schema=TableSchema(
+            indexes=table.schema.indexes, models=models, type_attribute=type_attribute
+        ),
+    )
+
+    workorder_model, task_model = (table.get_model(model) for model in models)
+    for wo_id in range(4):
+        workorder_model.create(
+            org_id=456, workorder_id=wo_id, date_created=datetime.utcnow()
+        ).save()
+        for task_id in range(2):
+            task_model.create(org_id=456, workorder_id=wo_id, task_id=task_id).save()
+
+    # both models share the partition, each only counts its own rows.
+    assert workorder_model.count("#WORKORDER").count == 4
+    assert task_model.count("#WORKORDER").count == 8
+    assert (
+        task_model.count(
+            "#WORKORDER", filter_expression=models[1].workorder_id.lt(2)
+        ).count
+        == 4
+    )
@@ -0,0 +1,133 @@
+import time
+from datetime import datetime
+
+import pytest
+from botocore.exceptions import ClientError
+
+from dynamodb_monotable.core.memory import MemoryBackend
+from dynamodb_monotable.core.ratelimit import AdaptiveTokenBucket, RateLimiter
+from dynamodb_monotable.table import Table, TableSchema
+from .testing_models import Workorder
+
+
+def create_table(backend: MemoryBackend, rate_limiter: RateLimiter) -> Table:
+    table = Table(
+        name="limited",
+        schema=TableSchema(
+            **{
+                "indexes": {
+                    "primary": {
+                        "hash_key": {"name": "hk", "type": "S"},
+                        "sort_key": {"name": "sk", "type": "S"},
+                        "index_type": "primary",
+                    },
+                },
+                "models": [Workorder],
+            }
+        ),
+        backend=backend,
+        rate_limiter=rate_limiter,
+    )
+    table.create_table()
+    return table
+
+
+def throttle(backend: MemoryBackend, operation: str, times: int) -> list:
+    """Throttle the first `times` calls of an operation, returns every call."""
+    client = backend.client()
+    method = getattr(client, operation)
+    calls = []
+
+    def throttled(**kwargs):
+        calls.append(kwargs)
+        if len(calls) <= times:
+            code = "ProvisionedThroughputExceededException"
+            raise getattr(client.exceptions, code)(
+                {"Error": {"Code": code, "Message": "Slow down"}}, operation
+            )
+        return method(**kwargs)
+
+    setattr(client, operation, throttled)
+    return calls
+
+
+def test_buckets_back_off_and_recover():
+    bucket = AdaptiveTokenBucket(100, increase=1000)
+
+    bucket.throttled()
+    bucket.throttled()
+    assert bucket.rate == pytest.approx(25, rel=0.1)
+
+    for _ in range(10):
+        bucket.throttled()
+    assert bucket.rate == pytest.approx(5, rel=0.1)
+
+    time.sleep(0.05)
+    bucket.consume(0)
+    assert bucket.rate > 40
+
+
+def test_throttled_requests_are_retried_after_slowing_down():
+    backend = MemoryBackend()
+    limiter = RateLimiter(write_capacity=100, max_attempts=3)
+    table = create_table(backend, limiter)
+    workorders = table.get_model(Workorder)
+
+    calls = throttle(backend, "put_item", times=2)
+    workorders.create(org_id=1, workorder_id=1, date_created=datetime.utcnow()).save()
+
+    assert len(calls) == 3
+    assert limiter.bucket(kind="write").rate < 50
+    assert workorders.get_by_key("#WORKORDER", "#ORG:1#WORKORDER:1")
+
+    # once the attempts run out the throttle is raised.
+    throttle(backend, "put_item", times=3)
+    with pytest.raises(ClientError):
+        workorders.create(
+            org_id=1, workorder_id=2, date_created=datetime.utcnow()
+        ).save()
+
+
+def test_consumed_capacity_is_charged_to_the_bucket():
+    backend = MemoryBackend()
+    limiter = RateLimiter(read_capacity=10, write_capacity=1000)
+    table = create_table(backend, limiter)
+
+    client = table.clients.client(table.client_config)
+    for i in range(20):
+        client.put_item(
+            TableName="limited",
+            Item={"hk": {"S": "big"}, "sk": {"S": str(i)}, "body": {"S": "x" * 8000}},
+        )
+
+    # the page is estimated at 0.5 RCU but reads 160 KB, leaving the bucket in debt.
+    response = client.query(
+        TableName="limited",
+        KeyConditionExpression="hk = :hk",
+        ExpressionAttributeValues={":hk": {"S": "big"}},
+    )
+    assert response["ConsumedCapacity"]["CapacityUnits"] == 20
+    assert limiter.bucket(kind="read").tokens < -5
+
+
+def test_the_callers_return_consumed_capacity_is_kept():
+    backend = MemoryBackend()
+    limiter = RateLimiter(read_capacity=1000, write_capacity=1000)
+    table = create_table(backend, limiter)
+    calls = throttle(backend, "query", 0)
+
+    client = table.clients.client(table.client_config)
+    client.query(
+        TableName="limited",
+        KeyConditionExpression="hk = :hk",
+        ExpressionAttributeValues={":hk": {"S": "big"}},
+        ReturnConsumedCapacity="TOTAL",
+    )
+    assert calls[0]["ReturnConsumedCapacity"] == "TOTAL"
+
+    client.query(
+        TableName="limited",
+        KeyConditionExpression="hk = :hk",
+        ExpressionAttributeValues={":hk": {"S": "big"}},
+    )
+    assert calls[1]["ReturnConsumedCapacity"] == "INDEXES"
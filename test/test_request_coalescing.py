@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Tuple
+from unittest import mock
+
+from dynamodb_monotable.core.metrics import CallbackSink
+from dynamodb_monotable.core.singleflight import SingleFlight
+from dynamodb_monotable.table import Table
+from .testing_models import Workorder
+
+
+def test_concurrent_calls_share_one_request():
+    single_flight = SingleFlight()
+    calls = []
+
+    def request():
+        calls.append(threading.get_ident())
+        time.sleep(0.2)
+        return {"Item": {}}
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(
+            executor.map(lambda _: single_flight.do("key", request), range(8))
+        )
+
+    assert len(calls) == 1
+    assert all(result is results[0][0] for result, _ in results)
+    # only the caller that sent the request didn't share it.
+    assert sorted(shared for _, shared in results) == [False] + [True] * 7
+
+    # once the request has completed the next call makes a new one.
+    assert single_flight.do("key", request) == ({"Item": {}}, False)
+    assert len(calls) == 2
+
+
+def test_concurrent_async_calls_share_one_request():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def request():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"Item": {}}
+
+    async def main():
+        return await asyncio.gather(
+            *[single_flight.ado("key", request) for _ in range(8)]
+        )
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert all(result is results[0][0] for result, _ in results)
+    assert sorted(shared for _, shared in results) == [False] + [True] * 7
+
+
+def test_concurrent_gets_are_coalesced(create_basic_table: Tuple[Table, Workorder]):
+    table, item_schema = create_basic_table
+    records = []
+    table = Table(
+        name=table.name,
+        backend=table.clients.backend,
+        schema=table.schema,
+        coalesce_reads=True,
+        metrics=[CallbackSink(records.append)],
+    )
+
+    model = table.get_model(item_schema)
+    model.create(org_id=123, workorder_id=456, date_created=datetime.utcnow()).save()
+
+    get_item = model._table().get_item
+    requests = []
+
+    def slow_get_item(**kwargs):
+        requests.append(kwargs)
+        time.sleep(0.2)
+        return get_item(**kwargs)
+
+    fake_table = mock.Mock(get_item=slow_get_item)
+    with mock.patch.object(Workorder, "_table", return_value=fake_table):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            items = list(
+                executor.map(
+                    lambda _: model.get_by_key("#WORKORDER", "#ORG:123#WORKORDER:456"),
+                    range(8),
+                )
+            )
+
+    assert len(requests) == 1
+    assert all(item.org_id == 123 for item in items)
+    # every caller gets its own item.
+    assert len({id(item) for item in items}) == 8
+
+    # every caller records its own get, but only one of them read the item.
+    gets = [record for record in records if record.operation == "get_item"]
+    assert len(gets) == 8
+    assert all(record.duration > 0 for record in gets)
+    assert sum(record.items for record in gets) == 1
+    assert sum(record.consumed_capacity > 0 for record in gets) == 1
@@ -0,0 +1,53 @@
+from dataclasses import dataclass
+
+import pytest
+
+from dynamodb_monotable.models import Item
+from dynamodb_monotable.attributes import StringAttribute, IntAttribute
+from dynamodb_monotable.resolvers import TemplatePlan
+
+
+def test_templates_resolve_in_dependency_order():
+    @dataclass
+    class Nested(Item):
+        pk: StringAttribute = StringAttribute(value="#ORG:${org_id}#WO:${wo_id}")
+        wo_id: StringAttribute = StringAttribute(value="${id}-12323")
+        org_id: IntAttribute = IntAttribute(required=True)
+        id: IntAttribute = IntAttribute(required=True)
+
+    assert Nested._meta.templates == ("wo_id", "pk")
+
+    values = Nested._meta.template_plan.resolve({"org_id": 123, "id": 5453})
+    assert values["pk"] == "#ORG:123#WO:5453-12323"
+
+
+def test_template_cycles_fail_at_class_definition():
+    with pytest.raises(ValueError, match="a -> b -> a"):
+
+        @dataclass
+        class Cyclic(Item):
+            a: StringAttribute = StringAttribute(value="#A:${b}")
+            b: StringAttribute = StringAttribute(value="#B:${a}")
+
+
+def test_provided_values_are_not_resolved():
+    plan = TemplatePlan({"sk": StringAttribute(value="#ORG:${org_id}")})
+
+    assert plan.resolve({"sk": "#CUSTOM"}) == {"sk": "#CUSTOM"}
+    assert plan.resolve({}) == {"sk": "#ORG:${org_id}"}
+
+
+def test_can_parse_values_out_of_templates():
+    plan = TemplatePlan(
+        {
+            "pk": StringAttribute(value="#ORG:${org_id}#WO:${wo_id}"),
+            "wo_id": StringAttribute(value="${id}-12323"),
+        }
+    )
+
+    assert plan.parse({"pk": "#ORG:123#WO:5453-12323"}) == {
+        "org_id": "123",
+        "wo_id": "5453-12323",
+        "id": "5453",
+    }
+    assert plan.parse({"pk": "#SOMETHING:ELSE"}) == {}
@@ -0,0 +1,131 @@
+import asyncio
+import gc
+import zlib
+from datetime import datetime
+from typing import Tuple
+from unittest import mock
+
+from dynamodb_monotable.models import QueryCount
+from dynamodb_monotable.table import Table, TableSchema
+from .testing_models import Task, Workorder
+
+
+def in_segment(args, response):
+    """moto ignores `Segment`, so split the rows into segments like dynamodb."""
+    segment, total_segments = args["Segment"], args["TotalSegments"]
+    response["Items"] = [
+        item
+        for item in response["Items"]
+        if zlib.crc32(item["sk"]["S"].encode()) % total_segments == segment
+    ]
+    return response
+
+
+class SegmentedClient:
+    def __init__(self, client):
+        self.client = client
+
+    def scan(self, Segment, TotalSegments, **args):
+        return in_segment(
+            {"Segment": Segment, "TotalSegments": TotalSegments},
+            self.client.scan(**args),
+        )
+
+
+class AsyncSegmentedClient(SegmentedClient):
+    async def scan(self, Segment, TotalSegments, **args):
+        return in_segment(
+            {"Segment": Segment, "TotalSegments": TotalSegments},
+            await self.client.scan(**args),
+        )
+
+
+def test_parallel_scan(create_basic_table: Tuple[Table, Workorder]):
+    table, _ = create_basic_table
+    table = Table(
+        name=table.name,
+        backend=table.clients.backend,
+        schema=TableSchema(indexes=table.schema.indexes, models=[Workorder, Task]),
+    )
+
+    model = table.get_model(Workorder)
+    task_model = table.get_model(Task)
+    for wo_id in range(40):
+        model.create(
+            org_id=123, workorder_id=wo_id, date_created=datetime.utcnow()
+        ).save()
+        task_model.create(org_id=123, workorder_id=wo_id, task_id=1).save()
+
+    client = SegmentedClient(model._client())
+    with mock.patch.object(Workorder, "_client", return_value=client):
+        # rows of the Task model are skipped.
+        items = list(model.scan(segments=4, workers=2, limit=5))
+        assert sorted(item.workorder_id for item in items) == list(range(40))
+
+        items = list(
+            model.scan(filter_expression=model.workorder_id.lt(10), segments=3)
+        )
+        assert sorted(item.workorder_id for item in items) == list(range(10))
+
+        results = model.scan(segments=4, limit=1, queue_size=1)
+        assert next(results).org_id == 123
+        results.close()
+
+        # dropping the results without closing them also stops the workers.
+        results = model.scan(segments=4, workers=2, limit=1, queue_size=1)
+        assert next(results).org_id == 123
+        threads = results._scan._pages._threads
+        del results
+        gc.collect()
+        for thread in threads:
+            thread.join(1)
+            assert not thread.is_alive()
+
+
+def test_count_scan(create_basic_table: Tuple[Table, Workorder]):
+    table, _ = create_basic_table
+    table = Table(
+        name=table.name,
+        backend=table.clients.backend,
+        schema=TableSchema(indexes=table.schema.indexes, models=[Workorder, Task]),
+    )
+
+    model = table.get_model(Workorder)
+    task_model = table.get_model(Task)
+    for wo_id in range(10):
+        model.create(
+            org_id=123, workorder_id=wo_id, date_created=datetime.utcnow()
+        ).save()
+        task_model.create(org_id=123, workorder_id=wo_id, task_id=1).save()
+
+    # without a type attribute the rows are told apart by their sort keys.
+    assert model.count_scan() == QueryCount(count=10, scanned_count=20)
+    assert task_model.count_scan(
+        filter_expression=Task.workorder_id.lt(4)
+    ) == QueryCount(count=4, scanned_count=20)
+
+
+def test_async_parallel_scan(create_server_table: Tuple[Table, Workorder]):
+    table, item_schema = create_server_table
+
+    async def main():
+        model = table.get_model(item_schema)
+        async with table.abatch_writer() as writer:
+            for wo_id in range(30):
+                await writer.put(
+                    model.create(
+                        org_id=123, workorder_id=wo_id, date_created=datetime.utcnow()
+                    )
+                )
+
+        client = AsyncSegmentedClient(await model._aclient())
+        with mock.patch.object(Workorder, "_aclient", return_value=client):
+            results = model.ascan(segments=4, workers=2, limit=4)
+            items = [item async for item in results]
+
+        await table.aclose()
+        return items
+
+    items = asyncio.run(main())
+
+    assert sorted(item.workorder_id for item in items) == list(range(30))
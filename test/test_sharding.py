@@ -0,0 +1,128 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Tuple
+
+import pytest
+
+from dynamodb_monotable.attributes import IntAttribute, Param, StringAttribute
+from dynamodb_monotable.models import Item
+from dynamodb_monotable.table import Table, TableSchema
+from .testing_models import ShardedWorkorder, Workorder
+
+
+@dataclass
+class ShardedOrgWorkorder(Item):
+    hk: StringAttribute = StringAttribute(
+        value="ORG#${org_id}", shards=4, shard_by=["workorder_id"]
+    )
+    sk: StringAttribute = StringAttribute(value="#WORKORDER:${workorder_id}")
+    org_id: IntAttribute = IntAttribute(required=True)
+    workorder_id: IntAttribute = IntAttribute(required=True)
+
+
+def sharded_table(table: Table, model=ShardedWorkorder) -> Table:
+    return Table(
+        name=table.name,
+        backend=table.clients.backend,
+        schema=TableSchema(indexes=table.schema.indexes, models=[model]),
+        client_config=table.client_config,
+    )
+
+
+def test_items_are_spread_over_shards(create_basic_table: Tuple[Table, Workorder]):
+    table = sharded_table(create_basic_table[0])
+    model = table.get_model(ShardedWorkorder)
+
+    items = [model.create(org_id=1, workorder_id=wo_id) for wo_id in range(40)]
+    for item in items:
+        item.save()
+
+    assert {item.hk for item in items} == {f"#SHARDED#{shard}" for shard in range(4)}
+    # the shard only depends on the item, so it is the same every time.
+    assert model.create(org_id=1, workorder_id=7).hk == items[7].hk
+
+    fetched = model.get_by_key("#SHARDED", "#ORG:1#WORKORDER:7")
+    assert fetched.workorder_id == 7
+    assert fetched.get().workorder_id == 7
+    assert (
+        table.batch_get(ShardedWorkorder, [("#SHARDED", "#ORG:1#WORKORDER:9")])[
+            0
+        ].workorder_id
+        == 9
+    )
+
+
+def test_hash_keys_ending_like_a_shard_get_their_shard(
+    create_basic_table: Tuple[Table, Workorder],
+):
+    table = sharded_table(create_basic_table[0], ShardedOrgWorkorder)
+    model = table.get_model(ShardedOrgWorkorder)
+
+    # "ORG#3" looks like it already has a shard, the items in shard 3 included.
+    items = [model.create(org_id=3, workorder_id=wo_id) for wo_id in range(20)]
+    for item in items:
+        item.save()
+    assert "ORG#3#3" in {item.hk for item in items}
+
+    for item in items:
+        fetched = model.get_by_key("ORG#3", item.sk)
+        assert fetched.hk == item.hk
+        assert item.get().workorder_id == item.workorder_id
+    assert [
+        found.workorder_id
+        for found in table.batch_get(
+            ShardedOrgWorkorder, [("ORG#3", item.sk) for item in items]
+        )
+    ] == list(range(20))
+
+
+def test_query_merges_shards_in_sort_key_order(
+    create_basic_table: Tuple[Table, Workorder],
+):
+    table = sharded_table(create_basic_table[0])
+    model = table.get_model(ShardedWorkorder)
+    for wo_id in range(30):
+        model.create(org_id=1, workorder_id=wo_id).save()
+
+    results = model.query(
+        hash_key_value="#SHARDED",
+        key_condition=model.sk.begins_with("#ORG:1"),
+        paginate=True,
+    )
+    sort_keys = [item.sk for item in results]
+    assert sort_keys == sorted(f"#ORG:1#WORKORDER:{wo_id}" for wo_id in range(30))
+
+    results = model.query(
+        hash_key_value="#SHARDED",
+        scan_index_forward=False,
+        paginate=True,
+        max_items=5,
+    )
+    assert [item.sk for item in results] == sorted(sort_keys, reverse=True)[:5]
+
+    # prepared queries are sent to every shard too.
+    prepared = model.prepare_query(key_condition=model.sk.begins_with(Param("org")))
+    results = prepared.execute("#SHARDED", {"org": "#ORG:1"}, paginate=True)
+    assert [item.sk for item in results] == sort_keys
+
+    with pytest.raises(ValueError):
+        model.query(hash_key_value="#SHARDED", exclusive_start_key={"hk": "x"})
+
+
+def test_async_query_merges_shards(create_server_table: Tuple[Table, Workorder]):
+    table = sharded_table(create_server_table[0])
+
+    async def main():
+        model = table.get_model(ShardedWorkorder)
+        for wo_id in range(12):
+            await model.create(org_id=1, workorder_id=wo_id).asave()
+
+        results = model.aquery(hash_key_value="#SHARDED", paginate=True)
+        items = [item async for item in results]
+        await table.aclose()
+        return items
+
+    items = asyncio.run(main())
+
+    sort_keys = [item.sk for item in items]
+    assert sort_keys == sorted(f"#ORG:1#WORKORDER:{wo_id}" for wo_id in range(12))
@@ -0,0 +1,87 @@
+from datetime import datetime
+from typing import Tuple
+
+import pytest
+from botocore.exceptions import ClientError
+
+from dynamodb_monotable.attributes import Condition
+from dynamodb_monotable.table import Table, TableSchema
+from .testing_models import Task, Workorder
+
+
+def collection_table(table: Table) -> Table:
+    return Table(
+        name=table.name,
+        backend=table.clients.backend,
+        schema=TableSchema(indexes=table.schema.indexes, models=[Workorder, Task]),
+    )
+
+
+def test_transaction_writes_and_reads_many_models(
+    create_basic_table: Tuple[Table, Workorder],
+):
+    table = collection_table(create_basic_table[0])
+    workorders = table.get_model(Workorder)
+    tasks = table.get_model(Task)
+
+    workorder = workorders.create(
+        org_id=1, workorder_id=2, date_created=datetime.utcnow()
+    )
+    with table.transaction() as transaction:
+        transaction.put(workorder)
+        for task_id in range(3):
+            transaction.put(tasks.create(org_id=1, workorder_id=2, task_id=task_id))
+
+    workorder.date_created = datetime(2020, 1, 1)
+    with table.transaction() as transaction:
+        transaction.update(workorder)
+        transaction.delete(tasks.create(org_id=1, workorder_id=2, task_id=0))
+        transaction.condition_check(
+            tasks.create(org_id=1, workorder_id=2, task_id=1),
+            Condition("attribute_exists(sk)"),
+        )
+
+    items = table.transact_get(
+        [
+            (Workorder, ("#WORKORDER", "#ORG:1#WORKORDER:2")),
+            (Task, ("#WORKORDER", "#ORG:1#WORKORDER:2#TASK:0")),
+            (Task, ("#WORKORDER", "#ORG:1#WORKORDER:2#TASK:1")),
+        ]
+    )
+
+    assert isinstance(items[0], Workorder) and items[0].workorder_id == 2
+    assert items[0].date_created == datetime(2020, 1, 1)
+    assert items[1] is None
+    assert isinstance(items[2], Task) and items[2].task_id == 1
+
+
+def test_failed_condition_cancels_the_transaction(
+    create_basic_table: Tuple[Table, Workorder],
+):
+    table = collection_table(create_basic_table[0])
+    tasks = table.get_model(Task)
+
+    with pytest.raises(ClientError):
+        with table.transaction() as transaction:
+            transaction.put(tasks.create(org_id=1, workorder_id=2, task_id=1))
+            transaction.condition_check(
+                tasks.create(org_id=1, workorder_id=2, task_id=2),
+                Condition("attribute_exists(sk)"),
+            )
+
+    assert tasks.query(hash_key_value="#WORKORDER").count == 0
+
+
+def test_transaction_limits(create_basic_table: Tuple[Table, Workorder]):
+    table = collection_table(create_basic_table[0])
+    tasks = table.get_model(Task)
+
+    transaction = table.transaction()
+    transaction.put(tasks.create(org_id=1, workorder_id=2, task_id=1))
+    with pytest.raises(ValueError):
+        transaction.delete(tasks.create(org_id=1, workorder_id=2, task_id=1))
+
+    for task_id in range(2, 101):
+        transaction.put(tasks.create(org_id=1, workorder_id=2, task_id=task_id))
+    with pytest.raises(ValueError):
+        transaction.put(tasks.create(org_id=1, workorder_id=2, task_id=101))
@@ -0,0 +1,144 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Tuple
+from unittest import mock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from dynamodb_monotable.attributes import IntAttribute, StringAttribute
+from dynamodb_monotable.core.memory import MemoryBackend
+from dynamodb_monotable.exceptions import NoResultsFound
+from dynamodb_monotable.models import Item
+from dynamodb_monotable.table import Table, TableSchema
+from .testing_models import Workorder
+
+
+@dataclass
+class Ticket(Item):
+    hk: StringAttribute = StringAttribute(value="#TICKET")
+    sk: StringAttribute = StringAttribute(value="#TICKET:${ticket_id}")
+    ticket_id: IntAttribute = IntAttribute(required=True)
+    status: StringAttribute = StringAttribute(default="open")
+    status_key: StringAttribute = StringAttribute(value="#STATUS:${status}")
+    notes: StringAttribute = StringAttribute()
+    views: IntAttribute = IntAttribute(default=0)
+
+
+def ticket_model(table: Table) -> Ticket:
+    table = Table(
+        name=table.name,
+        backend=table.clients.backend,
+        schema=TableSchema(indexes=table.schema.indexes, models=[Ticket]),
+    )
+    return table.get_model(Ticket)
+
+
+def test_save_only_updates_changed_attributes(
+    create_basic_table: Tuple[Table, Workorder],
+):
+    model = ticket_model(create_basic_table[0])
+    model.create(ticket_id=1, notes="a note").save()
+
+    ticket = model.get_by_key("#TICKET", "#TICKET:1")
+    ticket.status = "closed"
+    ticket.notes = None
+
+    client = model._client()
+    with mock.patch.object(
+        client, "update_item", wraps=client.update_item
+    ) as update_item, mock.patch.object(Ticket, "_client", return_value=client):
+        ticket.save()
+        # nothing changed, so nothing is sent.
+        ticket.save()
+
+    assert update_item.call_count == 1
+    request = update_item.call_args.kwargs
+    names = request["ExpressionAttributeNames"]
+    assert set(names.values()) == {"status", "status_key", "notes"}
+    assert request["UpdateExpression"] == (
+        "SET #upd1 = :upd1, #upd2 = :upd2 REMOVE #upd0"
+    )
+    assert names["#upd0"] == "notes"
+
+    fetched = model.get_by_key("#TICKET", "#TICKET:1")
+    assert fetched.status == "closed"
+    assert fetched.status_key == "#STATUS:closed"
+    assert "notes" not in fetched.attribute_values
+    assert fetched.views == 0
+
+
+def test_increments_are_atomic(create_basic_table: Tuple[Table, Workorder]):
+    model = ticket_model(create_basic_table[0])
+    model.create(ticket_id=1).save()
+
+    first = model.get_by_key("#TICKET", "#TICKET:1")
+    second = model.get_by_key("#TICKET", "#TICKET:1")
+
+    first.increment("views")
+    first.save()
+    second.increment("views", 5)
+    second.save()
+
+    # the value is refreshed from the table, including the other increment.
+    assert second.views == 6
+    assert model.get_by_key("#TICKET", "#TICKET:1").views == 6
+
+
+def test_save_refuses_to_move_an_item(create_basic_table: Tuple[Table, Workorder]):
+    model = ticket_model(create_basic_table[0])
+    model.create(ticket_id=1).save()
+
+    ticket = model.get_by_key("#TICKET", "#TICKET:1")
+    # setting a key input to the value it already has changes nothing.
+    ticket.ticket_id = 1
+    ticket.notes = "same key"
+    ticket.save()
+
+    ticket.ticket_id = 2
+    with pytest.raises(ValueError, match="move the item to a new sk"):
+        ticket.save()
+
+    assert model.get_by_key("#TICKET", "#TICKET:1").notes == "same key"
+    with pytest.raises(NoResultsFound):
+        model.get_by_key("#TICKET", "#TICKET:2")
+
+
+# the values of the keyword arguments are in the resource format for every write.
+NOT_CLOSED = {
+    "ConditionExpression": "attribute_not_exists(#status) OR #status <> :closed",
+    "ExpressionAttributeNames": {"#status": "status"},
+    "ExpressionAttributeValues": {":closed": "closed"},
+}
+
+
+def test_save_conditions_apply_to_puts_and_updates(
+    create_basic_table: Tuple[Table, Workorder],
+):
+    model = ticket_model(create_basic_table[0])
+    ticket = model.create(ticket_id=1)
+    ticket.save(**NOT_CLOSED)
+
+    ticket.status = "closed"
+    ticket.save(**NOT_CLOSED)
+
+    ticket.notes = "reopened?"
+    with pytest.raises(ClientError, match="ConditionalCheckFailed"):
+        ticket.save(**NOT_CLOSED)
+
+    async def main():
+        table = Table(
+            name="async",
+            schema=TableSchema(indexes=model.table_config["indexes"], models=[Ticket]),
+            backend=MemoryBackend(),
+        )
+        table.create_table()
+        ticket = table.get_model(Ticket).create(ticket_id=1)
+        await ticket.asave(**NOT_CLOSED)
+
+        ticket.status = "closed"
+        await ticket.asave(**NOT_CLOSED)
+        with pytest.raises(ClientError, match="ConditionalCheckFailed"):
+            await ticket.adelete(**NOT_CLOSED)
+
+    asyncio.run(main())
@@ -17,3 +17,24 @@ class Workorder(Item):
     org_id: IntAttribute = IntAttribute(required=True)
     workorder_id: IntAttribute = IntAttribute(required=True)
     date_created: UTCDateTimeAttribute = UTCDateTimeAttribute(required=True)
+
+
+@dataclass
+class Task(Item):
+    hk: StringAttribute = StringAttribute(value="#WORKORDER")
+    sk: StringAttribute = StringAttribute(
+        value="#ORG:${org_id}#WORKORDER:${workorder_id}#TASK:${task_id}"
+    )
+    org_id: IntAttribute = IntAttribute(required=True)
+    workorder_id: IntAttribute = IntAttribute(required=True)
+    task_id: IntAttribute = IntAttribute(required=True)
+
+
+@dataclass
+class ShardedWorkorder(Item):
+    hk: StringAttribute = StringAttribute(value="#SHARDED", shards=4)
+    sk: StringAttribute = StringAttribute(
+        value="#ORG:${org_id}#WORKORDER:${workorder_id}"
+    )
+    org_id: IntAttribute = IntAttribute(required=True)
+    workorder_id: IntAttribute = IntAttribute(required=True)